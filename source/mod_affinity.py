@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import os
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# ------------------------------------------------------------------------------------------------------------
+
+# CPU affinity and thread scheduling are only available on Linux
+SCHED_SUPPORTED = hasattr(os, "sched_setaffinity") and os.path.isdir("/proc/self/task")
+
+# CPUs we were allowed to run on at startup, before any pinning
+ALL_CPUS = frozenset(os.sched_getaffinity(0)) if SCHED_SUPPORTED else frozenset()
+
+# ------------------------------------------------------------------------------------------------------------
+# CPU lists, in the same format as taskset and /sys: "0-1,3"
+
+# Returns a set of CPUs, empty for an empty list and None if @a text is not valid
+def parseCpuList(text):
+    cpus = set()
+
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+
+        try:
+            if "-" in part:
+                first, last = part.split("-", 1)
+                first, last = int(first), int(last)
+            else:
+                first = last = int(part)
+        except ValueError:
+            return None
+
+        if first < 0 or last < first:
+            return None
+
+        cpus.update(range(first, last + 1))
+
+    return cpus
+
+def formatCpuList(cpus):
+    ranges = []
+
+    for cpu in sorted(cpus):
+        if len(ranges) > 0 and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+
+    return ",".join(str(first) if first == last else "%i-%i" % (first, last) for first, last in ranges) or "-"
+
+# ------------------------------------------------------------------------------------------------------------
+# Limits for unprivileged processes
+
+def isPrivileged():
+    return hasattr(os, "geteuid") and os.geteuid() == 0
+
+# Highest realtime priority we may use, 0 if none
+def getRealtimeLimit():
+    if isPrivileged():
+        return 99
+    if resource is None or not hasattr(resource, "RLIMIT_RTPRIO"):
+        return 0
+
+    limit = resource.getrlimit(resource.RLIMIT_RTPRIO)[0]
+    return 99 if limit == resource.RLIM_INFINITY else min(limit, 99)
+
+# Lowest nice level we may set
+def getNiceLimit():
+    if isPrivileged():
+        return -20
+
+    current = os.getpriority(os.PRIO_PROCESS, 0)
+
+    if resource is None or not hasattr(resource, "RLIMIT_NICE"):
+        return current
+
+    limit = resource.getrlimit(resource.RLIMIT_NICE)[0]
+    if limit == resource.RLIM_INFINITY:
+        return -20
+
+    # RLIMIT_NICE is 20 - nice, and lowering below the current level is never allowed without it
+    return min(max(20 - limit, -20), current)
+
+# ------------------------------------------------------------------------------------------------------------
+
+def getThreadIds(pid):
+    try:
+        return [int(tid) for tid in os.listdir("/proc/%i/task" % pid)]
+    except (OSError, ValueError):
+        return []
+
+def getThreadName(tid):
+    try:
+        with open("/proc/%i/comm" % tid, 'r') as fh:
+            return fh.read().strip()
+    except (IOError, OSError):
+        return str(tid)
+
+def isRealtimeThread(tid):
+    try:
+        return os.sched_getscheduler(tid) in (os.SCHED_FIFO, os.SCHED_RR)
+    except OSError:
+        return False
+
+# Priority JACK gave each of its realtime threads, by (pid, tid), so it can be restored when rtprio is turned off
+_jackPriorities = {}
+
+# ------------------------------------------------------------------------------------------------------------
+# Apply CPU affinity, nice level and realtime scheduling to every thread of process @a pid.
+# Threads created afterwards inherit the affinity and nice level from the thread that creates them.
+#   cpus    set of CPUs, empty to leave the affinity alone
+#   nice    nice level, None to leave it alone
+#   rtprio  realtime priority for the audio threads, that is the ones JACK already runs in realtime,
+#           0 for the priority JACK gave them. All other threads stay on SCHED_OTHER, with the nice level:
+#           as realtime threads they could preempt or tie with the audio threads and cause xruns.
+# Values beyond the limits are clamped. Returns (ok, list of report lines).
+
+def applyScheduling(pid, cpus, nice, rtprio):
+    if not SCHED_SUPPORTED:
+        return (len(cpus) == 0 and not nice and rtprio == 0, ["not supported on this system"])
+
+    lines  = []
+    failed = set()
+
+    if len(cpus) > 0 and not cpus.issubset(ALL_CPUS):
+        lines.append("CPUs %s are not available, using %s" % (formatCpuList(cpus - ALL_CPUS),
+                                                               formatCpuList(cpus & ALL_CPUS) if cpus & ALL_CPUS else "all"))
+        cpus = cpus & ALL_CPUS
+
+    if nice is not None and nice < getNiceLimit():
+        lines.append("nice level %i is not allowed, using %i (RLIMIT_NICE)" % (nice, getNiceLimit()))
+        nice = getNiceLimit()
+
+    if rtprio > getRealtimeLimit():
+        lines.append("realtime priority %i is not allowed, using %i (RLIMIT_RTPRIO)" % (rtprio, getRealtimeLimit()))
+        rtprio = getRealtimeLimit()
+
+    threads = getThreadIds(pid)
+
+    # forget threads that are gone
+    for key in [key for key in _jackPriorities if key[0] == pid and key[1] not in threads]:
+        del _jackPriorities[key]
+
+    for tid in threads:
+        try:
+            if len(cpus) > 0:
+                os.sched_setaffinity(tid, cpus)
+        except OSError:
+            failed.add("affinity")
+
+        try:
+            if nice is not None:
+                os.setpriority(os.PRIO_PROCESS, tid, nice)
+        except OSError:
+            failed.add("nice level")
+
+        try:
+            if isRealtimeThread(tid):
+                current  = os.sched_getparam(tid).sched_priority
+                priority = _jackPriorities.setdefault((pid, tid), current)
+
+                if rtprio > 0:
+                    priority = rtprio
+
+                if priority != current:
+                    os.sched_setscheduler(tid, os.sched_getscheduler(tid), os.sched_param(priority))
+        except OSError:
+            failed.add("realtime priority")
+
+    for what in sorted(failed):
+        lines.append("could not set %s" % what)
+
+    return (len(lines) == 0, lines)
+
+# Check what process @a pid actually runs with, against what applyScheduling() was asked for.
+# Returns (ok, list of report lines), the first line being a summary.
+
+def verifyScheduling(pid, cpus, nice, rtprio):
+    if not SCHED_SUPPORTED:
+        return (True, [])
+
+    threads   = getThreadIds(pid)
+    unpinned  = []
+    realtime  = []
+    affinity  = set()
+
+    if len(threads) == 0:
+        return (False, ["process %i is gone" % pid])
+
+    for tid in threads:
+        try:
+            threadCpus = os.sched_getaffinity(tid)
+        except OSError:
+            continue
+
+        affinity.update(threadCpus)
+
+        if len(cpus) > 0 and not threadCpus.issubset(cpus):
+            unpinned.append(getThreadName(tid))
+
+        if isRealtimeThread(tid):
+            realtime.append("%s:%i" % (getThreadName(tid), os.sched_getparam(tid).sched_priority))
+
+    try:
+        actualNice = os.getpriority(os.PRIO_PROCESS, pid)
+    except OSError:
+        actualNice = 0
+
+    lines = ["%i threads on CPUs %s, nice %i, realtime: %s" % (len(threads), formatCpuList(affinity), actualNice,
+                                                              ", ".join(realtime) or "none")]
+
+    if len(unpinned) > 0:
+        lines.append("not pinned: %s" % ", ".join(unpinned))
+    if nice is not None and actualNice != max(nice, getNiceLimit()):
+        lines.append("nice level is %i instead of %i" % (actualNice, nice))
+    if rtprio > 0 and getRealtimeLimit() > 0 and len(realtime) == 0:
+        lines.append("no realtime audio threads, is JACK running in realtime mode?")
+
+    return (len(lines) == 1, lines)
+
+# ------------------------------------------------------------------------------------------------------------
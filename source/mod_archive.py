@@ -0,0 +1,625 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import hashlib
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
+
+# ------------------------------------------------------------------------------------------------------------
+
+# size of the chunks files are copied and hashed in, nothing bigger is ever held in memory
+ARCHIVE_CHUNK_SIZE = 256 * 1024
+
+# bundles (or archives) processed at the same time, hashing and compression release the GIL
+ARCHIVE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# Archive layout, same for zip and tar: the files of each bundle under "<name>.pedalboard/", followed by
+# "<name>.pedalboard.sha256" in sha256sum format, so an extracted archive can also be checked with "sha256sum -c"
+ARCHIVE_CHECKSUM_SUFFIX = ".sha256"
+
+# by file extension, zip or the tarfile mode for writing
+ARCHIVE_FORMATS = (
+    (".zip",     "zip"),
+    (".tar.gz",  "w:gz"),
+    (".tgz",     "w:gz"),
+    (".tar.bz2", "w:bz2"),
+    (".tar.xz",  "w:xz"),
+    (".tar",     "w"),
+)
+
+# zip can't store times before 1980
+ZIP_MIN_TIME = 315619200
+
+# results, per bundle
+ARCHIVE_EXPORTED   = "exported"
+ARCHIVE_IMPORTED   = "imported"
+ARCHIVE_UNVERIFIED = "unverified" # no checksums in the archive, imported anyway
+ARCHIVE_CORRUPT    = "corrupt"
+ARCHIVE_FAILED     = "failed"
+
+# picking a free bundle name and moving the bundle there must not race with another import
+_installLock = Lock()
+
+# ------------------------------------------------------------------------------------------------------------
+# Raised from ArchiveProgress.add() once the operation was aborted
+
+class ArchiveAborted(Exception):
+    pass
+
+# ------------------------------------------------------------------------------------------------------------
+# Archive Progress
+# Bytes done out of a total, shared by all workers of an operation and read from the GUI thread.
+# For exports bytes are those of the bundle files, for imports those of the archives.
+
+class ArchiveProgress(object):
+    def __init__(self):
+        self.fLock    = Lock()
+        self.fTotal   = 0
+        self.fDone    = 0
+        self.fAborted = False
+        self.fStart   = perf_counter()
+        self.fEnd     = None
+
+    def addTotal(self, size):
+        with self.fLock:
+            self.fTotal += size
+
+    def add(self, size):
+        with self.fLock:
+            self.fDone += size
+
+        if self.fAborted:
+            raise ArchiveAborted()
+
+    def abort(self):
+        self.fAborted = True
+
+    def isAborted(self):
+        return self.fAborted
+
+    def finish(self):
+        self.fEnd = perf_counter()
+
+    # (bytes done, bytes total, seconds elapsed, bytes per second)
+    def getStats(self):
+        with self.fLock:
+            done, total = self.fDone, self.fTotal
+
+        elapsed = (self.fEnd or perf_counter()) - self.fStart
+        return (done, total, elapsed, done / elapsed if elapsed > 0 else 0.0)
+
+# ------------------------------------------------------------------------------------------------------------
+# File wrappers that hash and count what goes through them
+
+class HashingReader(object):
+    def __init__(self, fileobj, progress=None):
+        self.fFile     = fileobj
+        self.fHash     = hashlib.sha256()
+        self.fSize     = 0
+        self.fProgress = progress
+
+    def read(self, size=-1):
+        data = self.fFile.read(size)
+        self.fHash.update(data)
+        self.fSize += len(data)
+
+        if self.fProgress is not None:
+            self.fProgress.add(len(data))
+
+        return data
+
+    def getSize(self):
+        return self.fSize
+
+    def hexdigest(self):
+        return self.fHash.hexdigest()
+
+class CountingReader(object):
+    def __init__(self, fileobj, progress):
+        self.fFile     = fileobj
+        self.fProgress = progress
+
+    def read(self, size=-1):
+        data = self.fFile.read(size)
+        self.fProgress.add(len(data))
+        return data
+
+# ------------------------------------------------------------------------------------------------------------
+
+def getArchiveFormat(filename):
+    lower = filename.lower()
+
+    for extension, fmt in ARCHIVE_FORMATS:
+        if lower.endswith(extension):
+            return fmt
+
+    return None
+
+def isArchiveFile(filename):
+    return getArchiveFormat(filename) is not None
+
+# Regular files of a bundle as (path inside the bundle, full path, size, mtime), in a stable order
+def listBundleFiles(bundle):
+    files = []
+
+    for root, dirs, names in os.walk(bundle):
+        dirs.sort()
+
+        for name in sorted(names):
+            path = os.path.join(root, name)
+
+            # leftovers from atomic writes (see writeFileAtomically)
+            if name.endswith(".tmp"):
+                continue
+
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+
+            if not os.path.isfile(path):
+                continue
+
+            files.append((os.path.relpath(path, bundle).replace(os.sep, "/"), path, st.st_size, st.st_mtime))
+
+    return files
+
+def formatChecksums(bundleName, checksums):
+    return "".join("%s  %s/%s\n" % (checksum, bundleName, name) for name, checksum in checksums)
+
+def parseChecksums(bundleName, data):
+    prefix    = bundleName + "/"
+    checksums = {}
+
+    for line in data.decode("utf-8", errors="replace").splitlines():
+        checksum, sep, name = line.partition("  ")
+
+        if not sep or len(checksum) != 64:
+            continue
+
+        # sha256sum marks binary mode with a '*'
+        name = name.lstrip("*")
+
+        if name.startswith(prefix):
+            checksums[name[len(prefix):]] = checksum.lower()
+
+    return checksums
+
+# ------------------------------------------------------------------------------------------------------------
+# Archive Writer
+# Writes bundles into a zip or tar archive, streaming each file in chunks and hashing it on the way. The archive
+# is written next to its final name and only moved there once complete.
+
+class ArchiveWriter(object):
+    def __init__(self, filename):
+        fmt = getArchiveFormat(filename)
+
+        if fmt is None:
+            raise ValueError("unsupported archive type: %s" % os.path.basename(filename))
+
+        self.fFilename = filename
+        self.fTmpFile  = filename + ".part"
+
+        if fmt == "zip":
+            self.fZip = zipfile.ZipFile(self.fTmpFile, 'w', zipfile.ZIP_DEFLATED)
+            self.fTar = None
+        else:
+            self.fZip = None
+            self.fTar = tarfile.open(self.fTmpFile, fmt)
+
+    # Add the file at @a path as @a name, returns its SHA-256
+    def addFile(self, name, path, size, mtime, progress):
+        with open(path, 'rb') as fh:
+            reader = HashingReader(fh, progress)
+
+            if self.fZip is not None:
+                info = zipfile.ZipInfo(name, time.localtime(max(mtime, ZIP_MIN_TIME))[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+
+                with self.fZip.open(info, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT) as out:
+                    shutil.copyfileobj(reader, out, ARCHIVE_CHUNK_SIZE)
+
+            else:
+                info = tarfile.TarInfo(name)
+                info.size  = size
+                info.mtime = mtime
+                info.mode  = 0o644
+                self.fTar.addfile(info, reader)
+
+        if reader.getSize() != size:
+            raise IOError("%s changed while being archived" % path)
+
+        return reader.hexdigest()
+
+    def addData(self, name, data):
+        if self.fZip is not None:
+            info = zipfile.ZipInfo(name, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            self.fZip.writestr(info, data)
+
+        else:
+            info = tarfile.TarInfo(name)
+            info.size  = len(data)
+            info.mtime = time.time()
+            info.mode  = 0o644
+            self.fTar.addfile(info, io.BytesIO(data))
+
+    # Add a whole bundle with its checksums, returns (number of files, bytes)
+    def addBundle(self, bundle, progress, files=None):
+        bundleName = os.path.basename(os.path.normpath(bundle))
+        checksums  = []
+        size       = 0
+
+        if files is None:
+            files = listBundleFiles(bundle)
+
+        for name, path, fileSize, mtime in files:
+            checksums.append((name, self.addFile(bundleName + "/" + name, path, fileSize, mtime, progress)))
+            size += fileSize
+
+        self.addData(bundleName + ARCHIVE_CHECKSUM_SUFFIX, formatChecksums(bundleName, checksums).encode("utf-8"))
+
+        return (len(files), size)
+
+    def close(self):
+        (self.fZip or self.fTar).close()
+        os.replace(self.fTmpFile, self.fFilename)
+
+    def abort(self):
+        try:
+            (self.fZip or self.fTar).close()
+        except Exception:
+            pass
+
+        try:
+            os.remove(self.fTmpFile)
+        except OSError:
+            pass
+
+# ------------------------------------------------------------------------------------------------------------
+# Export
+
+def exportResult(bundle, status, files=0, size=0, error=""):
+    return {
+        'name':   os.path.basename(os.path.normpath(bundle)),
+        'bundle': bundle,
+        'status': status,
+        'files':  files,
+        'bytes':  size,
+        'error':  error,
+    }
+
+# Write @a bundles into a single archive, returns a result per bundle.
+# Only the archive itself can fail as a whole, unreadable bundles are reported and left out.
+def exportBundles(bundles, filename, progress):
+    listed = []
+
+    for bundle in bundles:
+        files = listBundleFiles(bundle)
+        progress.addTotal(sum(f[2] for f in files))
+        listed.append((bundle, files))
+
+    writer  = ArchiveWriter(filename)
+    results = []
+
+    try:
+        for bundle, files in listed:
+            if len(files) == 0:
+                results.append(exportResult(bundle, ARCHIVE_FAILED, error="empty or unreadable bundle"))
+                continue
+
+            try:
+                nfiles, size = writer.addBundle(bundle, progress, files)
+            except (IOError, OSError, tarfile.TarError) as e:
+                # the archive can't be rewound, a partial bundle would fail its checksums on import
+                raise IOError("%s: %s" % (os.path.basename(bundle), e))
+
+            results.append(exportResult(bundle, ARCHIVE_EXPORTED, nfiles, size))
+
+        writer.close()
+
+    except:
+        writer.abort()
+        raise
+
+    return results
+
+# Write each bundle into an archive of its own in @a directory, @a workers at a time, returns a result per bundle
+def exportBundlesToDirectory(bundles, directory, extension, progress, workers=ARCHIVE_WORKERS):
+    os.makedirs(directory, exist_ok=True)
+
+    listed = []
+
+    for bundle in bundles:
+        files = listBundleFiles(bundle)
+        progress.addTotal(sum(f[2] for f in files))
+        listed.append((bundle, files))
+
+    def export(item):
+        bundle, files = item
+
+        if len(files) == 0:
+            return exportResult(bundle, ARCHIVE_FAILED, error="empty or unreadable bundle")
+
+        writer = ArchiveWriter(os.path.join(directory, os.path.basename(os.path.normpath(bundle)) + extension))
+
+        try:
+            nfiles, size = writer.addBundle(bundle, progress, files)
+            writer.close()
+        except ArchiveAborted:
+            writer.abort()
+            raise
+        except (IOError, OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+            writer.abort()
+            return exportResult(bundle, ARCHIVE_FAILED, error=str(e))
+
+        return exportResult(bundle, ARCHIVE_EXPORTED, nfiles, size)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(export, item) for item in listed]
+
+        try:
+            return [future.result() for future in futures]
+        except ArchiveAborted:
+            for future in futures:
+                future.cancel()
+            raise
+
+# ------------------------------------------------------------------------------------------------------------
+# Import
+
+# Entries of a zip or tar archive as (name, file object or None for anything but regular files), in archive order
+def iterArchiveEntries(filename, progress):
+    if getArchiveFormat(filename) == "zip":
+        counted = 0
+
+        with zipfile.ZipFile(filename, 'r') as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    # zipfile checks the CRC of each member as it's read
+                    with zf.open(info, 'r') as fh:
+                        yield (info.filename, fh)
+
+                progress.add(info.compress_size)
+                counted += info.compress_size
+
+        # headers and the central directory
+        progress.add(max(0, os.path.getsize(filename) - counted))
+
+    else:
+        with open(filename, 'rb') as raw:
+            # stream mode, members are read in order and never seeked back to
+            with tarfile.open(fileobj=CountingReader(raw, progress), mode="r|*") as tf:
+                for member in tf:
+                    if member.isdir():
+                        continue
+
+                    yield (member.name, tf.extractfile(member) if member.isfile() else None)
+
+# A name in the archive as (bundle name, path inside the bundle), None if it's not part of a pedalboard bundle
+def splitArchiveName(name):
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+
+    if len(parts) < 2 or name.startswith("/") or ".." in parts or not parts[0].endswith(".pedalboard"):
+        return None
+
+    return (parts[0], "/".join(parts[1:]))
+
+def getFreeBundlePath(directory, bundleName):
+    stem = bundleName[:-len(".pedalboard")]
+    path = os.path.join(directory, bundleName)
+    num  = 2
+
+    while os.path.exists(path):
+        path = os.path.join(directory, "%s-%i.pedalboard" % (stem, num))
+        num += 1
+
+    return path
+
+# Extract the pedalboard bundles in the archive @a filename into @a directory, returns a result per bundle.
+# Bundles are extracted into a staging directory and checked against their checksums as soon as those come
+# in, only complete and matching bundles are moved into place. Only an archive without any checksums has its
+# bundles imported unverified. Existing bundles are never replaced, an imported one with the same name gets a
+# numbered name instead.
+def importArchive(filename, directory, progress):
+    os.makedirs(directory, exist_ok=True)
+
+    staging = tempfile.mkdtemp(prefix=".import-", dir=directory)
+    bundles = {}
+    results = []
+
+    def getBundle(bundleName):
+        if bundleName not in bundles:
+            bundles[bundleName] = {
+                'checksums': {},   # computed, by path inside the bundle
+                'expected':  None, # from the archive
+                'bytes':     0,
+                'error':     "",
+                'done':      False,
+            }
+        return bundles[bundleName]
+
+    def finish(bundleName):
+        state = bundles[bundleName]
+        state['done'] = True
+
+        path   = os.path.join(staging, bundleName)
+        result = {
+            'name':   bundleName,
+            'bundle': "",
+            'status': ARCHIVE_IMPORTED,
+            'files':  len(state['checksums']),
+            'bytes':  state['bytes'],
+            'error':  state['error'],
+        }
+
+        if state['error']:
+            result['status'] = ARCHIVE_FAILED
+
+        elif state['expected'] is None:
+            result['status'] = ARCHIVE_UNVERIFIED
+
+        elif state['expected'] != state['checksums']:
+            names = set(state['expected']) | set(state['checksums'])
+            bad   = sorted(name for name in names if state['expected'].get(name) != state['checksums'].get(name))
+
+            result['status'] = ARCHIVE_CORRUPT
+            result['error']  = "checksum mismatch: %s" % ", ".join(bad)
+
+        if result['status'] in (ARCHIVE_IMPORTED, ARCHIVE_UNVERIFIED) and os.path.isdir(path):
+            with _installLock:
+                result['bundle'] = getFreeBundlePath(directory, bundleName)
+                os.rename(path, result['bundle'])
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+
+            if not result['error']:
+                result['status'] = ARCHIVE_FAILED
+                result['error']  = "no files"
+
+        results.append(result)
+
+    streamError  = ""
+    hasChecksums = False
+
+    try:
+        try:
+            for name, fh in iterArchiveEntries(filename, progress):
+                # checksums of a whole bundle
+                if "/" not in name and name.endswith(".pedalboard" + ARCHIVE_CHECKSUM_SUFFIX) and fh is not None:
+                    bundleName   = name[:-len(ARCHIVE_CHECKSUM_SUFFIX)]
+                    state        = getBundle(bundleName)
+                    hasChecksums = True
+
+                    if state['done']:
+                        continue
+
+                    state['expected'] = parseChecksums(bundleName, fh.read())
+
+                    # checksums usually come after the files, otherwise this is checked at the end
+                    if set(state['expected']) == set(state['checksums']):
+                        finish(bundleName)
+                    continue
+
+                split = splitArchiveName(name)
+
+                if split is None:
+                    continue
+
+                bundleName, path = split
+                state = getBundle(bundleName)
+
+                if state['done'] or state['error']:
+                    continue
+
+                if fh is None:
+                    state['error'] = "unsupported entry: %s" % path
+                    continue
+
+                target = os.path.join(staging, bundleName, *path.split("/"))
+
+                try:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+                    reader = HashingReader(fh)
+
+                    with open(target, 'wb') as out:
+                        shutil.copyfileobj(reader, out, ARCHIVE_CHUNK_SIZE)
+
+                except (IOError, OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as e:
+                    state['error'] = "%s: %s" % (path, e)
+                    continue
+
+                state['checksums'][path] = reader.hexdigest()
+                state['bytes'] += reader.getSize()
+
+        except (IOError, OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as e:
+            if len(bundles) == 0:
+                raise
+
+            # damaged or cut short, bundles that were complete and verified before that are kept
+            streamError = "damaged archive: %s" % (e or type(e).__name__)
+
+        for bundleName in sorted(bundles):
+            state = bundles[bundleName]
+
+            if state['done']:
+                continue
+
+            # still open when the archive ended, only an archive without any checksums may have those
+            if not state['error']:
+                if streamError:
+                    state['error'] = streamError
+                elif state['expected'] is None and hasChecksums:
+                    state['error'] = "incomplete, no checksums for this bundle"
+
+            finish(bundleName)
+
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    return results
+
+# Import several archives, @a workers at a time, returns the results of all bundles in them.
+# An archive that can't be read at all gives a single failed result named after it.
+def importArchives(filenames, directory, progress, workers=ARCHIVE_WORKERS):
+    for filename in filenames:
+        progress.addTotal(os.path.getsize(filename))
+
+    def run(filename):
+        try:
+            return importArchive(filename, directory, progress)
+        except (IOError, OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as e:
+            return [{
+                'name':   os.path.basename(filename),
+                'bundle': "",
+                'status': ARCHIVE_FAILED,
+                'files':  0,
+                'bytes':  0,
+                'error':  str(e),
+            }]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run, filename) for filename in filenames]
+        results = []
+
+        try:
+            for future in futures:
+                results.extend(future.result())
+        except ArchiveAborted:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return results
+
+# ------------------------------------------------------------------------------------------------------------
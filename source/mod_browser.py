@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import os
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QPoint, QSize, QSortFilterProxyModel, QVariant
+from PyQt5.QtGui import QImageReader, QPainter, QPixmap, QPixmapCache
+
+# ------------------------------------------------------------------------------------------------------------
+
+# rows are handed to the view in batches of this many, as it scrolls
+BROWSER_FETCH_SIZE = 200
+
+# sort orders, see PedalboardListModel.sort()
+BROWSER_SORT_MATCH = -1
+BROWSER_SORT_TITLE = 0
+
+# extra item data roles
+BROWSER_URI_ROLE    = Qt.UserRole
+BROWSER_BUNDLE_ROLE = Qt.UserRole + 1
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard List Model
+# Flat list model over pedalboard dicts (as returned by PedalboardSearchIndex.search), for a pedalboard browser.
+# Nothing is created per row: the model only keeps a reference to the list, rows are handed to the view in batches
+# as it scrolls (canFetchMore/fetchMore), and thumbnails are read when a row is first painted, scaled to the icon
+# size while decoding, and kept in QPixmapCache. So opening and searching cost the same for any library size.
+
+class PedalboardListModel(QAbstractListModel):
+    def __init__(self, parent, iconSize=QSize(350, 157)):
+        QAbstractListModel.__init__(self, parent)
+
+        self.fIconSize    = QSize(iconSize)
+        self.fPedalboards = []
+        self.fOriginal    = []
+        self.fFetched     = 0
+        self.fSortColumn  = BROWSER_SORT_MATCH
+        self.fSortOrder   = Qt.AscendingOrder
+        self.fPlaceholder = None
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Show @a pedalboards, kept in the current sort order
+    def setPedalboards(self, pedalboards):
+        self.beginResetModel()
+        self.fOriginal    = pedalboards
+        self.fPedalboards = self.sortedPedalboards(pedalboards)
+        self.fFetched     = min(len(self.fPedalboards), BROWSER_FETCH_SIZE)
+        self.endResetModel()
+
+    def getPedalboards(self):
+        return self.fPedalboards
+
+    def getPedalboard(self, row):
+        if row < 0 or row >= self.fFetched:
+            return None
+        return self.fPedalboards[row]
+
+    def setIconSize(self, iconSize):
+        if iconSize == self.fIconSize:
+            return
+
+        self.beginResetModel()
+        self.fIconSize    = QSize(iconSize)
+        self.fPlaceholder = None
+        self.endResetModel()
+
+    # --------------------------------------------------------------------------------------------------------
+    # Sorting is done here over all pedalboards, not by a proxy over the rows fetched so far, so the view shows
+    # them in order from the first batch on. BROWSER_SORT_MATCH is the order they were given in.
+
+    def sortedPedalboards(self, pedalboards):
+        if self.fSortColumn == BROWSER_SORT_TITLE:
+            return sorted(pedalboards, key=lambda pedalboard: pedalboard.get('title', "").lower(),
+                          reverse=self.fSortOrder == Qt.DescendingOrder)
+
+        if self.fSortOrder == Qt.DescendingOrder:
+            return pedalboards[::-1]
+
+        return pedalboards
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column == self.fSortColumn and order == self.fSortOrder:
+            return
+
+        self.fSortColumn = column
+        self.fSortOrder  = order
+
+        self.layoutAboutToBeChanged.emit()
+        oldIndexes = self.persistentIndexList()
+        oldRows    = [self.fPedalboards[index.row()] for index in oldIndexes]
+
+        self.fPedalboards = self.sortedPedalboards(self.fOriginal)
+
+        # persistent indexes (like the current one) follow their pedalboard, if it has been fetched in the new order
+        if oldIndexes:
+            rows = dict((id(pedalboard), row) for row, pedalboard in enumerate(self.fPedalboards[:self.fFetched]))
+            self.changePersistentIndexList(oldIndexes, [self.index(rows[id(pedalboard)], 0)
+                                                        if id(pedalboard) in rows else QModelIndex()
+                                                        for pedalboard in oldRows])
+
+        self.layoutChanged.emit()
+
+    def getSortColumn(self):
+        return self.fSortColumn
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.fFetched
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.fFetched < len(self.fPedalboards)
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+
+        count = min(len(self.fPedalboards) - self.fFetched, BROWSER_FETCH_SIZE)
+
+        if count <= 0:
+            return
+
+        self.beginInsertRows(QModelIndex(), self.fFetched, self.fFetched + count - 1)
+        self.fFetched += count
+        self.endInsertRows()
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemNeverHasChildren
+
+    def data(self, index, role=Qt.DisplayRole):
+        pedalboard = self.getPedalboard(index.row()) if index.isValid() else None
+
+        if pedalboard is None:
+            return QVariant()
+
+        if role == Qt.DisplayRole:
+            return pedalboard.get('title', "")
+        if role == Qt.DecorationRole:
+            return self.getThumbnail(pedalboard.get('bundle', ""))
+        if role == Qt.ToolTipRole:
+            return pedalboard.get('bundle', "")
+        if role == BROWSER_URI_ROLE:
+            return pedalboard.get('uri', "")
+        if role == BROWSER_BUNDLE_ROLE:
+            return pedalboard.get('bundle', "")
+
+        return QVariant()
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Thumbnail of @a bundle at exactly the icon size, centered, so all items have the same size.
+    # Cached by modification time too, so a thumbnail written again is read again.
+    def getThumbnail(self, bundle):
+        filename = os.path.join(bundle, "thumbnail.png")
+
+        try:
+            mtime = os.stat(filename).st_mtime_ns
+        except OSError:
+            return self.getPlaceholder()
+
+        key    = "browser:%ix%i:%i:%s" % (self.fIconSize.width(), self.fIconSize.height(), mtime, filename)
+        pixmap = QPixmapCache.find(key)
+
+        if pixmap is not None and not pixmap.isNull():
+            return pixmap
+
+        reader = QImageReader(filename)
+        size   = reader.size()
+
+        if not size.isValid():
+            return self.getPlaceholder()
+
+        # decoding at the final size is much cheaper than decoding at full size and scaling afterwards
+        size = size.scaled(self.fIconSize, Qt.KeepAspectRatio)
+        reader.setScaledSize(size)
+        image = reader.read()
+
+        if image.isNull():
+            return self.getPlaceholder()
+
+        pixmap = QPixmap(self.fIconSize)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.drawImage(QPoint((self.fIconSize.width() - size.width()) // 2,
+                                 (self.fIconSize.height() - size.height()) // 2), image)
+        painter.end()
+
+        QPixmapCache.insert(key, pixmap)
+        return pixmap
+
+    def getPlaceholder(self):
+        if self.fPlaceholder is None:
+            self.fPlaceholder = QPixmap(self.fIconSize)
+            self.fPlaceholder.fill(Qt.transparent)
+
+        return self.fPlaceholder
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard Filter Proxy
+# Hides pedalboards whose bundle is in a given set, like the ones that could not be read. Fetching goes through
+# to the source model, so the view still gets rows lazily.
+
+class PedalboardFilterProxy(QSortFilterProxyModel):
+    def __init__(self, parent):
+        QSortFilterProxyModel.__init__(self, parent)
+
+        self.fHiddenBundles = frozenset()
+
+        # sorting is done by the source model, see PedalboardListModel.sort()
+        self.setDynamicSortFilter(False)
+
+    def setHiddenBundles(self, bundles):
+        self.fHiddenBundles = frozenset(bundles)
+        self.invalidateFilter()
+
+    def getHiddenBundles(self):
+        return self.fHiddenBundles
+
+    def filterAcceptsRow(self, sourceRow, sourceParent):
+        if not self.fHiddenBundles:
+            return True
+
+        pedalboard = self.sourceModel().getPedalboard(sourceRow)
+        return pedalboard is None or pedalboard.get('bundle', "") not in self.fHiddenBundles
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+# ------------------------------------------------------------------------------------------------------------
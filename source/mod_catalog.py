@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import json
+import os
+import re
+
+from heapq import nsmallest
+from threading import Lock
+from time import perf_counter
+
+# ------------------------------------------------------------------------------------------------------------
+
+# maximum number of results returned for a non-empty query
+SEARCH_LIMIT = 500
+
+# time a single search may take, in seconds (less than one frame at 60Hz)
+SEARCH_BUDGET = 0.012
+
+# number of recently used pedalboards that are remembered
+RECENT_MAX = 50
+
+# match quality, lower is better
+MATCH_TITLE_PREFIX = 0
+MATCH_WORD_PREFIX  = 1
+MATCH_SUBSTRING    = 2
+MATCH_FUZZY        = 3
+
+_tokenSplitter = re.compile(r"[^a-z0-9]+")
+
+# ------------------------------------------------------------------------------------------------------------
+# Get plugin URIs from a pedalboard, mod-ui can give us a list of URIs or a list of plugin dicts
+
+def getPedalboardPluginURIs(pedalboard):
+    uris = []
+
+    for plugin in pedalboard.get('plugins', []):
+        if isinstance(plugin, dict):
+            plugin = plugin.get('uri', "")
+        if plugin:
+            uris.append(plugin)
+
+    return uris
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard Search Index
+# In-memory index over title, bundle name and plugin URIs of all pedalboards.
+# Each pedalboard has one pre-lowered string for substring matching and one of space-separated words for prefix
+# matching, so both run as plain string searches. Fuzzy (subsequence) matches on titles are only used when there
+# are few other matches. When a query extends the previous one only the previous matches are searched again,
+# which keeps typing fast, and a search never takes longer than its time budget.
+
+class PedalboardSearchIndex(object):
+    def __init__(self, pedalboards=[], recent=[]):
+        self.fEntries   = []
+        self.fHaystacks = []
+        self.fWords     = []
+        self.fTitles    = []
+        self.fRanks     = []
+        self.fRecent    = []
+        self.fRecentPos = {}
+
+        # narrowing state, query and matching entries of the last complete search
+        # (fuzzy matches are None when they weren't needed and so not looked for)
+        self.fLastQuery   = None
+        self.fLastMatches = None
+        self.fLastFuzzy   = None
+
+        self.setRecent(recent)
+        self.setPedalboards(pedalboards)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def setPedalboards(self, pedalboards):
+        self.fEntries   = list(pedalboards)
+        self.fHaystacks = []
+        self.fWords     = []
+        self.fTitles    = []
+
+        for pedalboard in self.fEntries:
+            title  = pedalboard.get('title', "").lower()
+            bundle = os.path.basename(pedalboard.get('bundle', "").rstrip(os.sep)).lower()
+            uris   = [uri.lower() for uri in getPedalboardPluginURIs(pedalboard)]
+
+            words = _tokenSplitter.split(title) + _tokenSplitter.split(bundle)
+
+            for uri in uris:
+                words += _tokenSplitter.split(uri.split("://", 1)[-1])
+
+            self.fTitles.append(title)
+            self.fHaystacks.append("\n".join([title, bundle] + uris))
+
+            # every word is preceded by a space, so " " + term finds word prefixes
+            self.fWords.append(" " + " ".join(w for w in words if w))
+
+        self.updateRanks()
+
+    def setPluginURIs(self, uri, plugins):
+        for pedalboard in self.fEntries:
+            if pedalboard.get('uri') == uri:
+                pedalboard['plugins'] = list(plugins)
+                break
+        else:
+            return
+
+        self.setPedalboards(self.fEntries)
+
+    def getPedalboards(self):
+        return self.fEntries
+
+    # --------------------------------------------------------------------------------------------------------
+    # Recently used pedalboards, most recent first
+
+    def setRecent(self, recent):
+        self.fRecent    = list(recent)[:RECENT_MAX]
+        self.fRecentPos = dict((uri, pos) for pos, uri in enumerate(self.fRecent))
+        self.updateRanks()
+
+    def getRecent(self):
+        return list(self.fRecent)
+
+    # Move @a uri to the top of the recent list, returns the new list (to be saved by the caller)
+    def markUsed(self, uri):
+        self.setRecent([uri] + [u for u in self.fRecent if u != uri])
+        return self.getRecent()
+
+    # Position of each entry when all match equally well, recent first and then by title
+    def updateRanks(self):
+        order = sorted(range(len(self.fEntries)),
+                       key=lambda i: (self.fRecentPos.get(self.fEntries[i].get('uri'), RECENT_MAX), self.fTitles[i]))
+
+        self.fRanks = [0] * len(order)
+
+        for rank, index in enumerate(order):
+            self.fRanks[index] = rank
+
+        self.resetNarrowing()
+
+    def resetNarrowing(self):
+        self.fLastQuery   = None
+        self.fLastMatches = None
+        self.fLastFuzzy   = None
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Returns (results, complete), results being pedalboard dicts sorted by match quality and recent use.
+    # If the time budget ran out, complete is False and results hold whatever was found until then.
+    def search(self, query, limit=SEARCH_LIMIT, budget=SEARCH_BUDGET):
+        query = " ".join(query.lower().split())
+        count = len(self.fEntries)
+
+        if not query:
+            order = sorted(range(count), key=self.fRanks.__getitem__)
+            return [self.fEntries[i] for i in order], True
+
+        deadline = perf_counter() + budget
+        terms    = query.split(" ")
+        prefixes = [" " + term for term in terms]
+        complete = True
+
+        # anything matching this query also matched the previous one, if this one extends it
+        narrowing = self.fLastQuery is not None and query.startswith(self.fLastQuery)
+
+        haystacks = self.fHaystacks
+        words     = self.fWords
+        titles    = self.fTitles
+        ranks     = self.fRanks
+
+        # sort keys are plain ints: quality, then fuzzy match span, then rank
+        span    = count + 1
+        scored  = {}
+        fuzzies = None
+
+        for num, index in enumerate(self.fLastMatches if narrowing else range(count)):
+            if num & 255 == 255 and perf_counter() > deadline:
+                complete = False
+                break
+
+            haystack = haystacks[index]
+
+            for term in terms:
+                if term not in haystack:
+                    break
+            else:
+                if titles[index].startswith(query):
+                    quality = MATCH_TITLE_PREFIX
+                elif all(prefix in words[index] for prefix in prefixes):
+                    quality = MATCH_WORD_PREFIX
+                else:
+                    quality = MATCH_SUBSTRING
+
+                scored[index] = quality * span * 256 + ranks[index]
+
+        matches = sorted(scored)
+
+        # fuzzy matches only fill up the list when there's not enough of the good ones
+        if complete and len(scored) < limit:
+            fuzzies = []
+            pattern = re.compile(".*?".join(re.escape(c) for c in query.replace(" ", "")))
+
+            # a fuzzy match now was a fuzzy or a plain match for the previous query
+            if narrowing and self.fLastFuzzy is not None:
+                candidates = sorted(set(self.fLastMatches).union(self.fLastFuzzy))
+            else:
+                candidates = range(count)
+
+            for num, index in enumerate(candidates):
+                if num & 255 == 255 and perf_counter() > deadline:
+                    complete = False
+                    break
+                if index in scored:
+                    continue
+
+                match = pattern.search(titles[index])
+
+                if match is not None:
+                    fuzzies.append(index)
+                    scored[index] = (MATCH_FUZZY * 256 + min(255, match.end() - match.start())) * span + ranks[index]
+
+        if complete:
+            self.fLastQuery   = query
+            self.fLastMatches = matches
+            self.fLastFuzzy   = fuzzies
+        else:
+            self.resetNarrowing()
+
+        order = nsmallest(limit, scored, key=scored.__getitem__)
+
+        return [self.fEntries[i] for i in order], complete
+
+# ------------------------------------------------------------------------------------------------------------
+# Last modification time of a pedalboard bundle
+# Saving a pedalboard rewrites its ttl files, and adding or removing files changes the directory itself.
+
+def getBundleModificationTime(bundle):
+    mtime = os.stat(bundle).st_mtime
+
+    for entry in os.scandir(bundle):
+        if entry.name.endswith(".ttl"):
+            mtime = max(mtime, entry.stat().st_mtime)
+
+    return mtime
+
+# ------------------------------------------------------------------------------------------------------------
+# Plugin Usage Index
+# Reverse index from plugin URI to the pedalboard bundles using it, kept in a JSON cache file.
+# Updates only re-read bundles that changed since the last time, so after the first run they are cheap.
+# Safe to update from a background thread while the GUI thread reads it.
+
+class PluginUsageIndex(object):
+    CACHE_VERSION = 1
+
+    def __init__(self, cacheFile):
+        self.fCacheFile = cacheFile
+        self.fLock      = Lock()
+
+        # bundle -> (mtime, plugin URIs or None if the bundle can't be read)
+        self.fBundles = {}
+
+        # plugin URI -> set of bundles
+        self.fUsers = {}
+
+        # the cache is read on first use, and can be dropped again with unload()
+        self.fLoaded = False
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def load(self):
+        with self.fLock:
+            self.loadLocked()
+
+    def isLoaded(self):
+        return self.fLoaded
+
+    def ensureLoaded(self):
+        # the flag is set last, so when it is seen set the index is complete
+        if self.fLoaded:
+            return
+
+        with self.fLock:
+            if not self.fLoaded:
+                self.loadLocked()
+
+    # Read the cache file, the lock must be held
+    def loadLocked(self):
+        try:
+            with open(self.fCacheFile, 'r') as fh:
+                data = json.load(fh)
+        except (IOError, OSError, ValueError):
+            data = {}
+
+        if data.get('version') == self.CACHE_VERSION:
+            for bundle, (mtime, uris) in data.get('bundles', {}).items():
+                self.setBundle(bundle, mtime, uris)
+
+        self.fLoaded = True
+
+    # Free the in-memory index, the cache file still has it
+    def unload(self):
+        with self.fLock:
+            self.fBundles = {}
+            self.fUsers   = {}
+            self.fLoaded  = False
+
+    def save(self):
+        with self.fLock:
+            data = {
+                'version': self.CACHE_VERSION,
+                'bundles': self.fBundles,
+            }
+
+        tmpFile = self.fCacheFile + ".tmp"
+
+        try:
+            os.makedirs(os.path.dirname(self.fCacheFile), exist_ok=True)
+
+            with open(tmpFile, 'w') as fh:
+                json.dump(data, fh)
+
+            os.replace(tmpFile, self.fCacheFile)
+
+        except (IOError, OSError) as e:
+            print("failed to save plugin usage cache:", e)
+
+    # Must be called with the lock held
+    def setBundle(self, bundle, mtime, uris):
+        old = self.fBundles.pop(bundle, None)
+
+        if old is not None and old[1] is not None:
+            for uri in old[1]:
+                users = self.fUsers.get(uri)
+                if users is None:
+                    continue
+                users.discard(bundle)
+                if len(users) == 0:
+                    del self.fUsers[uri]
+
+        if mtime is None:
+            return
+
+        self.fBundles[bundle] = (mtime, uris)
+
+        if uris is None:
+            return
+
+        for uri in uris:
+            self.fUsers.setdefault(uri, set()).add(bundle)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Bring the index up to date with @a bundles, calling @a getPluginURIs(bundle) for new and modified ones.
+    # @a abort is checked between bundles, returns the number of bundles that were (re)read or removed.
+    def update(self, bundles, getPluginURIs, abort=None):
+        self.ensureLoaded()
+        changes = 0
+
+        with self.fLock:
+            removed = set(self.fBundles) - set(bundles)
+
+            for bundle in removed:
+                self.setBundle(bundle, None, None)
+
+        changes += len(removed)
+
+        for bundle in bundles:
+            if abort is not None and abort():
+                break
+
+            try:
+                mtime = getBundleModificationTime(bundle)
+            except OSError:
+                mtime = None
+
+            with self.fLock:
+                cached = self.fBundles.get(bundle)
+
+            if mtime is not None and cached is not None and cached[0] == mtime:
+                continue
+
+            uris = None
+
+            if mtime is not None:
+                try:
+                    uris = sorted(set(getPluginURIs(bundle)))
+                except Exception as e:
+                    print("failed to read pedalboard %s: %s" % (bundle, e))
+
+            with self.fLock:
+                self.setBundle(bundle, mtime, uris)
+
+            changes += 1
+
+        if changes > 0:
+            self.save()
+
+        return changes
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def getPluginURIs(self, bundle):
+        self.ensureLoaded()
+
+        with self.fLock:
+            cached = self.fBundles.get(bundle)
+
+        if cached is None or cached[1] is None:
+            return []
+
+        return list(cached[1])
+
+    def getPedalboardsUsing(self, uri):
+        self.ensureLoaded()
+
+        with self.fLock:
+            return sorted(self.fUsers.get(uri, ()))
+
+    def getUnreadablePedalboards(self):
+        self.ensureLoaded()
+
+        with self.fLock:
+            return sorted(bundle for bundle, (mtime, uris) in self.fBundles.items() if uris is None)
+
+    # Returns a dict of bundle -> list of plugin URIs it needs that are not in @a installedURIs
+    def getMissingPlugins(self, installedURIs):
+        installed = set(installedURIs)
+        self.ensureLoaded()
+
+        with self.fLock:
+            missing = set(self.fUsers) - installed
+            report  = {}
+
+            for uri in missing:
+                for bundle in self.fUsers[uri]:
+                    report.setdefault(bundle, []).append(uri)
+
+        for uris in report.values():
+            uris.sort()
+
+        return report
+
+# ------------------------------------------------------------------------------------------------------------
@@ -45,9 +45,15 @@ import os
 import sys
 
 if using_Qt4:
-    from PyQt4.QtCore import QDir, QSettings
+    from PyQt4.QtCore import QDir
+    from PyQt4.QtGui import QDesktopServices
 else:
-    from PyQt5.QtCore import QDir, QSettings
+    from PyQt5.QtCore import QDir, QStandardPaths
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Custom)
+
+from mod_memory import isLowMemorySystem
 
 # ------------------------------------------------------------------------------------------------------------
 # Check if using live ISO
@@ -111,6 +117,12 @@ else:
 
 DATA_DIR = os.path.expanduser("~/.local/share/mod-data/")
 
+# Cache location for MOD-App and MOD-Remote, each app uses its own sub-directory
+if using_Qt4:
+    CACHE_DIR = os.path.join(QDesktopServices.storageLocation(QDesktopServices.CacheLocation), "MOD")
+else:
+    CACHE_DIR = os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation), "MOD")
+
 os.environ['MOD_DEV_HMI']         = "1"
 os.environ['MOD_DEV_HOST']        = "0"
 os.environ['MOD_DEV_ENVIRONMENT'] = "0"
@@ -133,15 +145,32 @@ if not SKIP_INTEGRATION:
 # Main
 MOD_KEY_MAIN_PROJECT_FOLDER      = "Main/ProjectFolder"    # str
 MOD_KEY_MAIN_REFRESH_INTERVAL    = "Main/RefreshInterval"  # int
+MOD_KEY_MAIN_AUTOSAVE_DELAY      = "Main/AutosaveDelay"    # int (seconds, 0 is off)
+MOD_KEY_MAIN_LOW_MEMORY          = "Main/LowMemory"        # bool
 
 # Host
 MOD_KEY_HOST_VERBOSE             = "Host/Verbose"          # bool
 MOD_KEY_HOST_PATH                = "Host/Path2"            # str
+MOD_KEY_HOST_CPUS                = "Host/CPUs"             # str (CPU list like "2-3", empty for all)
+MOD_KEY_HOST_NICE                = "Host/Nice"             # int
+MOD_KEY_HOST_REALTIME_PRIORITY   = "Host/RealtimePriority" # int (0 keeps the JACK priority)
+MOD_KEY_HOST_ISOLATE_GUI         = "Host/IsolateGUI"       # bool (keep the GUI off the backend CPUs)
+MOD_KEY_HOST_WEBSERVER_PROCESS   = "Host/WebServerProcess" # bool (run the webserver in a child process)
+MOD_KEY_HOST_WEBSERVER_INTEGRATED = "Host/WebServerIntegrated" # bool (run the webserver in the GUI event loop)
 
 # WebView
 MOD_KEY_WEBVIEW_INSPECTOR        = "WebView/Inspector"     # bool
 MOD_KEY_WEBVIEW_VERBOSE          = "WebView/Verbose"       # bool
 MOD_KEY_WEBVIEW_SHOW_INSPECTOR   = "WebView/ShowInspector" # bool
+MOD_KEY_WEBVIEW_DISK_CACHE       = "WebView/DiskCache"     # int (MiB)
+MOD_KEY_WEBVIEW_MEMORY_CACHE     = "WebView/MemoryCache"   # int (MiB)
+
+# Remote
+MOD_KEY_REMOTE_AUTO_RECONNECT    = "Remote/AutoReconnect"  # bool
+
+# Pedalboards
+MOD_KEY_PEDALBOARD_RECENT        = "Pedalboard/Recent"     # list (of URIs, most recent first)
+MOD_KEY_PEDALBOARD_DEDUPLICATE   = "Pedalboard/Deduplicate" # bool (share identical files between bundles)
 
 # ------------------------------------------------------------------------------------------------------------
 # Settings defaults
@@ -149,6 +178,8 @@ MOD_KEY_WEBVIEW_SHOW_INSPECTOR   = "WebView/ShowInspector" # bool
 # Main
 MOD_DEFAULT_MAIN_REFRESH_INTERVAL = 30
 MOD_DEFAULT_MAIN_PROJECT_FOLDER   = QDir.toNativeSeparators(QDir.homePath())
+MOD_DEFAULT_MAIN_AUTOSAVE_DELAY   = 0
+MOD_DEFAULT_MAIN_LOW_MEMORY       = USING_LIVE_ISO or isLowMemorySystem()
 
 # Host
 MOD_DEFAULT_HOST_VERBOSE          = False
@@ -157,10 +188,32 @@ MOD_DEFAULT_HOST_PATH             = os.path.join(os.path.dirname(__file__), "mod
 if not os.path.exists(MOD_DEFAULT_HOST_PATH):
     MOD_DEFAULT_HOST_PATH = "/usr/bin/mod-host"
 
+MOD_DEFAULT_HOST_CPUS              = ""
+MOD_DEFAULT_HOST_NICE              = 0
+MOD_DEFAULT_HOST_REALTIME_PRIORITY = 0
+MOD_DEFAULT_HOST_ISOLATE_GUI       = True
+MOD_DEFAULT_HOST_WEBSERVER_PROCESS = False
+MOD_DEFAULT_HOST_WEBSERVER_INTEGRATED = False
+
+# Overrides the host path setting, used to run with a stand-in backend (see tests/fakehost.py)
+MOD_APP_HOST_PATH = os.getenv("MOD_APP_HOST_PATH", "")
+
+# Command line of a JACK server to start before the backend if none is running, e.g. "jackd -d dummy"
+MOD_APP_JACKD = os.getenv("MOD_APP_JACKD", "")
+
 # WebView
 MOD_DEFAULT_WEBVIEW_INSPECTOR       = False
 MOD_DEFAULT_WEBVIEW_VERBOSE         = False
 MOD_DEFAULT_WEBVIEW_SHOW_INSPECTOR  = False
+MOD_DEFAULT_WEBVIEW_DISK_CACHE      = 64
+MOD_DEFAULT_WEBVIEW_MEMORY_CACHE    = 32
+
+# Remote
+MOD_DEFAULT_REMOTE_AUTO_RECONNECT   = True
+
+# Pedalboards
+MOD_DEFAULT_PEDALBOARD_RECENT       = []
+MOD_DEFAULT_PEDALBOARD_DEDUPLICATE  = False
 
 # ------------------------------------------------------------------------------------------------------------
 # Set initial settings
@@ -170,17 +223,23 @@ def setInitialSettings():
         webviewVerbose = False
 
     else:
-        qsettings = QSettings("MOD", "MOD-App")
-        webviewVerbose = qsettings.value(MOD_KEY_WEBVIEW_VERBOSE, MOD_DEFAULT_WEBVIEW_VERBOSE, type=bool)
-        del qsettings
+        from mod_config import getSettingsStore
+        webviewVerbose = getSettingsStore().value(MOD_KEY_WEBVIEW_VERBOSE)
 
     os.environ['MOD_LIVE_ISO'] = "1" if USING_LIVE_ISO else "0"
-    os.environ['MOD_LOG']      = "1" if webviewVerbose else "0"
 
-    from mod import settings
-    settings.LOG = webviewVerbose
+    setWebServerVerbose(webviewVerbose)
 
     # cleanup
     del webviewVerbose
 
 # ------------------------------------------------------------------------------------------------------------
+# Set webserver verbose mode, can be changed while running
+
+def setWebServerVerbose(verbose):
+    os.environ['MOD_LOG'] = "1" if verbose else "0"
+
+    from mod import settings
+    settings.LOG = verbose
+
+# ------------------------------------------------------------------------------------------------------------
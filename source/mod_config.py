@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Custom)
+
+from mod_common import *
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+if using_Qt4:
+    from PyQt4.QtCore import pyqtSignal, QObject, QSettings, QTimer
+else:
+    from PyQt5.QtCore import pyqtSignal, QObject, QSettings, QTimer
+
+# ------------------------------------------------------------------------------------------------------------
+# Settings schema, key -> (type, default)
+
+SETTINGS_SCHEMA = {
+    # Main
+    MOD_KEY_MAIN_PROJECT_FOLDER:    (str,  MOD_DEFAULT_MAIN_PROJECT_FOLDER),
+    MOD_KEY_MAIN_REFRESH_INTERVAL:  (int,  MOD_DEFAULT_MAIN_REFRESH_INTERVAL),
+    MOD_KEY_MAIN_AUTOSAVE_DELAY:    (int,  MOD_DEFAULT_MAIN_AUTOSAVE_DELAY),
+    MOD_KEY_MAIN_LOW_MEMORY:        (bool, MOD_DEFAULT_MAIN_LOW_MEMORY),
+    # Host
+    MOD_KEY_HOST_VERBOSE:           (bool, MOD_DEFAULT_HOST_VERBOSE),
+    MOD_KEY_HOST_PATH:              (str,  MOD_DEFAULT_HOST_PATH),
+    MOD_KEY_HOST_CPUS:              (str,  MOD_DEFAULT_HOST_CPUS),
+    MOD_KEY_HOST_NICE:              (int,  MOD_DEFAULT_HOST_NICE),
+    MOD_KEY_HOST_REALTIME_PRIORITY: (int,  MOD_DEFAULT_HOST_REALTIME_PRIORITY),
+    MOD_KEY_HOST_ISOLATE_GUI:       (bool, MOD_DEFAULT_HOST_ISOLATE_GUI),
+    MOD_KEY_HOST_WEBSERVER_PROCESS: (bool, MOD_DEFAULT_HOST_WEBSERVER_PROCESS),
+    MOD_KEY_HOST_WEBSERVER_INTEGRATED: (bool, MOD_DEFAULT_HOST_WEBSERVER_INTEGRATED),
+    # WebView
+    MOD_KEY_WEBVIEW_INSPECTOR:      (bool, MOD_DEFAULT_WEBVIEW_INSPECTOR),
+    MOD_KEY_WEBVIEW_VERBOSE:        (bool, MOD_DEFAULT_WEBVIEW_VERBOSE),
+    MOD_KEY_WEBVIEW_SHOW_INSPECTOR: (bool, MOD_DEFAULT_WEBVIEW_SHOW_INSPECTOR),
+    MOD_KEY_WEBVIEW_DISK_CACHE:     (int,  MOD_DEFAULT_WEBVIEW_DISK_CACHE),
+    MOD_KEY_WEBVIEW_MEMORY_CACHE:   (int,  MOD_DEFAULT_WEBVIEW_MEMORY_CACHE),
+    # Remote
+    MOD_KEY_REMOTE_AUTO_RECONNECT:  (bool, MOD_DEFAULT_REMOTE_AUTO_RECONNECT),
+    # Pedalboards
+    MOD_KEY_PEDALBOARD_RECENT:      (list, MOD_DEFAULT_PEDALBOARD_RECENT),
+    MOD_KEY_PEDALBOARD_DEDUPLICATE: (bool, MOD_DEFAULT_PEDALBOARD_DEDUPLICATE),
+}
+
+# time to wait for more changes before writing them to disk, in ms
+SETTINGS_FLUSH_DELAY = 500
+
+# ------------------------------------------------------------------------------------------------------------
+# Settings Store
+# Typed, in-memory copy of all settings in SETTINGS_SCHEMA, loaded once per application.
+# Changes are announced through valueChanged right away and written to the backing QSettings in batches.
+
+class SettingsStore(QObject):
+    # signals
+    valueChanged = pyqtSignal(str, object)
+
+    def __init__(self, organization, application):
+        QObject.__init__(self)
+
+        self.fSettings = QSettings(organization, application)
+        self.fValues   = {}
+        self.fDirty    = set()
+
+        for key, (vtype, default) in SETTINGS_SCHEMA.items():
+            self.fValues[key] = self.fSettings.value(key, default, type=vtype)
+
+        self.fFlushTimer = QTimer(self)
+        self.fFlushTimer.setSingleShot(True)
+        self.fFlushTimer.setInterval(SETTINGS_FLUSH_DELAY)
+        self.fFlushTimer.timeout.connect(self.flush)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def value(self, key):
+        return self.fValues[key]
+
+    def setValue(self, key, value):
+        value = SETTINGS_SCHEMA[key][0](value)
+
+        if self.fValues[key] == value:
+            return
+
+        self.fValues[key] = value
+        self.fDirty.add(key)
+        self.fFlushTimer.start()
+        self.valueChanged.emit(key, value)
+
+    def setValues(self, values):
+        for key, value in values.items():
+            self.setValue(key, value)
+
+    def resetValue(self, key):
+        self.setValue(key, SETTINGS_SCHEMA[key][1])
+
+    def flush(self):
+        self.fFlushTimer.stop()
+
+        if len(self.fDirty) == 0:
+            return
+
+        for key in self.fDirty:
+            self.fSettings.setValue(key, self.fValues[key])
+
+        self.fDirty.clear()
+        self.fSettings.sync()
+
+# ------------------------------------------------------------------------------------------------------------
+# Get the settings store for @a application, created on first use
+
+_stores = {}
+
+def getSettingsStore(application="MOD-App"):
+    store = _stores.get(application)
+
+    if store is None:
+        store = SettingsStore("MOD", application)
+        _stores[application] = store
+
+    return store
+
+# ------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Custom)
+
+from mod_memory import formatSize
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import errno
+import filecmp
+import hashlib
+import os
+import shutil
+import stat
+import time
+
+# ------------------------------------------------------------------------------------------------------------
+
+# files smaller than this are left alone, not worth a hash and a link
+DEDUP_MIN_SIZE = 256
+
+# files modified less than this long ago may still be being written, they are left for the next time (in s)
+DEDUP_SETTLE_TIME = 60
+
+# size of the chunks files are hashed in
+DEDUP_CHUNK_SIZE = 256 * 1024
+
+# ------------------------------------------------------------------------------------------------------------
+
+def hashFile(path):
+    sha256 = hashlib.sha256()
+
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(DEDUP_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+# Disk space used by a file, which can be less or more than its size
+def getDiskUsage(st):
+    blocks = getattr(st, "st_blocks", None)
+    return blocks * 512 if blocks is not None else st.st_size
+
+# Regular files of a bundle as (full path, stat result)
+def iterBundleFiles(bundle):
+    for root, dirs, names in os.walk(bundle):
+        for name in names:
+            path = os.path.join(root, name)
+
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+
+            if stat.S_ISREG(st.st_mode):
+                yield (path, st)
+
+# Give each file of @a bundle that is shared with other bundles a copy of its own, so it can be written in place
+# without changing the others. Returns the number of files copied.
+def unshareBundle(bundle):
+    count = 0
+
+    for path, st in iterBundleFiles(bundle):
+        if st.st_nlink <= 1:
+            continue
+
+        tmpFile = path + ".unshare"
+
+        try:
+            shutil.copy2(path, tmpFile)
+            os.replace(tmpFile, path)
+        except (IOError, OSError) as e:
+            print("failed to unshare %s: %s" % (path, e))
+
+            try:
+                os.remove(tmpFile)
+            except OSError:
+                pass
+            continue
+
+        count += 1
+
+    return count
+
+# ------------------------------------------------------------------------------------------------------------
+# Content Store
+# Deduplicates identical files across pedalboard bundles. Each distinct file content is kept once in the store, at
+# "<sha256[:2]>/<sha256[2:]>", and bundle files with that content are made hardlinks to it, so bundles keep their
+# usual layout and load unchanged.
+#
+# A shared file must never be written in place, which would change it in every bundle. Files written by the app
+# are always replaced (see writeFileAtomically), and bundles are unshared before mod-ui saves them (see
+# unshareBundle). Objects no bundle links to anymore are removed on compaction.
+
+class ContentStore(object):
+    def __init__(self, storeDir):
+        self.fStoreDir = storeDir
+
+    def getStoreDir(self):
+        return self.fStoreDir
+
+    def getObjectPath(self, checksum):
+        return os.path.join(self.fStoreDir, checksum[:2], checksum[2:])
+
+    # Objects in the store as (path, stat result)
+    def iterObjects(self):
+        try:
+            prefixes = sorted(os.listdir(self.fStoreDir))
+        except OSError:
+            return
+
+        for prefix in prefixes:
+            try:
+                names = os.listdir(os.path.join(self.fStoreDir, prefix))
+            except OSError:
+                continue
+
+            for name in names:
+                path = os.path.join(self.fStoreDir, prefix, name)
+
+                try:
+                    yield (path, os.lstat(path))
+                except OSError:
+                    continue
+
+    # Number of objects, and the disk space they use
+    def getStats(self):
+        objects = 0
+        size    = 0
+
+        for path, st in self.iterObjects():
+            objects += 1
+            size    += getDiskUsage(st)
+
+        return (objects, size)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Deduplicate the files of @a bundles, except those in @a exclude (like the pedalboard being edited), then
+    # remove unused objects. Like fdupes only files with the same size are hashed, and only content found more than
+    # once goes into the store. @a isAborted is called between steps. Returns a report, see formatReport()
+    def compact(self, bundles, exclude=(), isAborted=None):
+        report = {
+            'bundles':   0,
+            'files':     0,     # files looked at
+            'bytes':     0,     # their total size
+            'hashed':    0,     # files that had to be hashed
+            'linked':    0,     # files that became links to the store in this run
+            'reclaimed': 0,     # disk space freed by that, and by removing unused objects
+            'removed':   0,     # unused objects removed
+            'objects':   0,     # objects in the store afterwards
+            'stored':    0,     # disk space used by them
+            'errors':    [],
+            'seconds':   0.0,
+            'aborted':   False,
+        }
+
+        startTime = time.monotonic()
+        now       = time.time()
+        exclude   = set(os.path.realpath(bundle) for bundle in exclude if bundle)
+
+        def aborted():
+            if isAborted is not None and isAborted():
+                report['aborted'] = True
+            return report['aborted']
+
+        # returns True if nothing else can be linked either
+        def failed(path, e):
+            report['errors'].append("%s: %s" % (path, e.strerror or e))
+
+            if e.errno != errno.EXDEV:
+                return False
+
+            report['errors'].append("the store at %s must be on the same filesystem as the pedalboards"
+                                    % self.fStoreDir)
+            return True
+
+        # files that already are links to an object are done, files of sizes no object or other file has are unique
+        objects     = list(self.iterObjects())
+        inodes      = set((st.st_dev, st.st_ino) for path, st in objects)
+        objectSizes = set(st.st_size for path, st in objects)
+        candidates  = []
+        sizes       = {}
+
+        for bundle in bundles:
+            if aborted():
+                break
+
+            if os.path.realpath(bundle) in exclude:
+                continue
+
+            report['bundles'] += 1
+
+            for path, st in iterBundleFiles(bundle):
+                if st.st_size < DEDUP_MIN_SIZE or path.endswith((".tmp", ".unshare", ".dedup")):
+                    continue
+
+                report['files'] += 1
+                report['bytes'] += st.st_size
+
+                if (st.st_dev, st.st_ino) in inodes or now - st.st_mtime < DEDUP_SETTLE_TIME:
+                    continue
+
+                candidates.append((path, st))
+                sizes.setdefault(st.st_size, set()).add((st.st_dev, st.st_ino))
+
+        groups = {}
+
+        for path, st in candidates:
+            if st.st_size not in objectSizes and len(sizes[st.st_size]) < 2:
+                continue
+            if aborted():
+                break
+
+            try:
+                checksum = hashFile(path)
+            except (IOError, OSError) as e:
+                failed(path, e)
+                continue
+
+            report['hashed'] += 1
+            groups.setdefault(checksum, []).append((path, st))
+
+        for checksum, files in groups.items():
+            if aborted():
+                break
+
+            obj = self.getObjectPath(checksum)
+
+            if not os.path.exists(obj):
+                if len(set((st.st_dev, st.st_ino) for path, st in files)) < 2:
+                    continue
+
+                # the newest file becomes the object, all links share its mtime
+                files.sort(key=lambda f: f[1].st_mtime_ns, reverse=True)
+                path, st = files.pop(0)
+
+                try:
+                    os.makedirs(os.path.dirname(obj), exist_ok=True)
+                    os.link(path, obj)
+                except OSError as e:
+                    if failed(path, e):
+                        break
+                    continue
+
+                files = [f for f in files if (f[1].st_dev, f[1].st_ino) != (st.st_dev, st.st_ino)]
+
+            for path, st in files:
+                try:
+                    report['reclaimed'] += self.linkFile(obj, path, st)
+                except (IOError, OSError) as e:
+                    if failed(path, e):
+                        break
+                    continue
+
+                report['linked'] += 1
+
+            else:
+                continue
+            break
+
+        removed, reclaimed = self.collectGarbage()
+
+        report['removed']    = removed
+        report['reclaimed'] += reclaimed
+        report['objects'], report['stored'] = self.getStats()
+        report['seconds']    = time.monotonic() - startTime
+
+        return report
+
+    # Replace the file at @a path with a link to the object @a obj, returns the disk space freed
+    def linkFile(self, obj, path, st):
+        objStat = os.stat(obj)
+
+        # the hash says they're the same, but an object changed in place would spread to every new link
+        if objStat.st_size != st.st_size or not filecmp.cmp(obj, path, shallow=False):
+            raise IOError(errno.EIO, "content differs from its store object %s" % obj)
+
+        tmpFile = path + ".dedup"
+
+        try:
+            os.link(obj, tmpFile)
+            os.replace(tmpFile, path)
+        except OSError:
+            try:
+                os.remove(tmpFile)
+            except OSError:
+                pass
+            raise
+
+        # keep the newest mtime, so nothing looks outdated (see needsThumbnail)
+        if st.st_mtime_ns > objStat.st_mtime_ns:
+            os.utime(obj, ns=(objStat.st_atime_ns, st.st_mtime_ns))
+
+        # the old file is only gone if nothing else linked to it
+        return getDiskUsage(st) if st.st_nlink == 1 else 0
+
+    # Remove objects that no bundle links to anymore, returns (number removed, disk space freed)
+    def collectGarbage(self):
+        removed   = 0
+        reclaimed = 0
+
+        for path, st in self.iterObjects():
+            if st.st_nlink > 1:
+                continue
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            removed   += 1
+            reclaimed += getDiskUsage(st)
+
+        return (removed, reclaimed)
+
+# ------------------------------------------------------------------------------------------------------------
+
+def formatReport(report):
+    lines = [
+        "%i files in %i pedalboards, %s" % (report['files'], report['bundles'], formatSize(report['bytes'])),
+        "%i files hashed, %i deduplicated, %i unused objects removed" % (report['hashed'], report['linked'],
+                                                                          report['removed']),
+        "%s reclaimed in %.1f s" % (formatSize(report['reclaimed']), report['seconds']),
+        "store: %i objects, %s" % (report['objects'], formatSize(report['stored'])),
+    ]
+
+    if report['aborted']:
+        lines.append("stopped before going through all pedalboards")
+
+    return lines
+
+# ------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import time
+
+from collections import deque
+from ctypes import CDLL, CFUNCTYPE, POINTER, c_char_p, c_float, c_int, c_uint32, c_void_p
+from ctypes.util import find_library
+
+from PyQt5.QtCore import pyqtSignal, QObject
+
+# ------------------------------------------------------------------------------------------------------------
+# libjack, through ctypes so there's nothing to build or install. None if JACK is not installed
+
+JackNoStartServer = 0x01
+
+JackXRunCallback     = CFUNCTYPE(c_int, c_void_p)
+JackShutdownCallback = CFUNCTYPE(None, c_void_p)
+
+def loadJackLibrary():
+    name = find_library("jack")
+
+    if name is None:
+        return None
+
+    try:
+        lib = CDLL(name)
+    except OSError:
+        return None
+
+    lib.jack_client_open.argtypes = [c_char_p, c_int, POINTER(c_int)]
+    lib.jack_client_open.restype  = c_void_p
+    lib.jack_client_close.argtypes = [c_void_p]
+    lib.jack_activate.argtypes = [c_void_p]
+    lib.jack_deactivate.argtypes = [c_void_p]
+    lib.jack_cpu_load.argtypes = [c_void_p]
+    lib.jack_cpu_load.restype  = c_float
+    lib.jack_get_sample_rate.argtypes = [c_void_p]
+    lib.jack_get_sample_rate.restype  = c_uint32
+    lib.jack_get_buffer_size.argtypes = [c_void_p]
+    lib.jack_get_buffer_size.restype  = c_uint32
+    lib.jack_set_xrun_callback.argtypes = [c_void_p, JackXRunCallback, c_void_p]
+    lib.jack_on_shutdown.argtypes = [c_void_p, JackShutdownCallback, c_void_p]
+
+    return lib
+
+libjack = loadJackLibrary()
+
+# ------------------------------------------------------------------------------------------------------------
+
+# time between samples (in ms), and how many are kept (2 minutes)
+DSP_SAMPLE_INTERVAL = 500
+DSP_HISTORY_SIZE    = 240
+
+# xruns up to this long after a pedalboard switch are blamed on it (in s)
+DSP_SWITCH_WINDOW = 3.0
+
+# load above this is shown as a warning (in %)
+DSP_LOAD_WARNING = 80.0
+
+# ------------------------------------------------------------------------------------------------------------
+# DSP Monitor
+# A JACK client without ports that samples the server's DSP load and counts xruns. The xrun callback runs in
+# JACK's notification thread and only bumps a counter, everything else happens in sample(), which is meant to be
+# called periodically from the GUI thread. Samples go into a fixed-size buffer of (time, load %, new xruns).
+
+class DspMonitor(QObject):
+    # signals
+    updated     = pyqtSignal()
+    switchXruns = pyqtSignal(int) # xruns caused by the last pedalboard switch
+
+    def __init__(self, parent, clientName="mod-app-monitor"):
+        QObject.__init__(self, parent)
+
+        self.fClientName = clientName
+        self.fClient     = None
+        self.fHistory    = deque(maxlen=DSP_HISTORY_SIZE)
+        self.fXruns      = 0
+        self.fLastXruns  = 0
+        self.fShutdown   = False
+        self.fSwitches   = []
+
+        # keep references, ctypes callbacks must outlive the client
+        self.fXrunCallback     = JackXRunCallback(self.jackXrun)
+        self.fShutdownCallback = JackShutdownCallback(self.jackShutdown)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def isAvailable(self):
+        return libjack is not None
+
+    def isRunning(self):
+        return self.fClient is not None
+
+    # Connect to the running JACK server, never starts one
+    def start(self):
+        if libjack is None or self.fClient is not None:
+            return False
+
+        status = c_int(0)
+        client = libjack.jack_client_open(self.fClientName.encode("utf-8"), JackNoStartServer, status)
+
+        if not client:
+            print("DSP monitor: could not connect to JACK, status 0x%x" % status.value)
+            return False
+
+        libjack.jack_set_xrun_callback(client, self.fXrunCallback, None)
+        libjack.jack_on_shutdown(client, self.fShutdownCallback, None)
+
+        if libjack.jack_activate(client) != 0:
+            libjack.jack_client_close(client)
+            return False
+
+        self.fClient    = client
+        self.fShutdown  = False
+        self.fLastXruns = self.fXruns
+        return True
+
+    def stop(self):
+        if self.fClient is None:
+            return
+
+        # after a shutdown there's nothing to deactivate, but the client still needs to be closed to be freed
+        if not self.fShutdown:
+            libjack.jack_deactivate(self.fClient)
+
+        libjack.jack_client_close(self.fClient)
+
+        self.fClient = None
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def jackXrun(self, arg):
+        self.fXruns += 1
+        return 0
+
+    def jackShutdown(self, arg):
+        self.fShutdown = True
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Take a sample, called periodically
+    def sample(self):
+        if self.fClient is None:
+            return
+
+        if self.fShutdown:
+            print("DSP monitor: JACK server went away")
+            self.stop()
+            self.updated.emit()
+            return
+
+        now    = time.time()
+        xruns  = self.fXruns
+        load   = libjack.jack_cpu_load(self.fClient)
+        change = xruns - self.fLastXruns
+
+        self.fLastXruns = xruns
+        self.fHistory.append((now, load, change))
+
+        # pedalboard switches whose window is over
+        while len(self.fSwitches) > 0 and now - self.fSwitches[0][0] >= DSP_SWITCH_WINDOW:
+            switchTime, switchXruns = self.fSwitches.pop(0)
+            if xruns > switchXruns:
+                self.switchXruns.emit(xruns - switchXruns)
+
+        self.updated.emit()
+
+    # A pedalboard switch starts now, xruns in the next DSP_SWITCH_WINDOW seconds are reported for it
+    def markSwitch(self):
+        if self.fClient is not None:
+            self.fSwitches.append((time.time(), self.fXruns))
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def getHistory(self):
+        return list(self.fHistory)
+
+    def getLoad(self):
+        return self.fHistory[-1][1] if len(self.fHistory) > 0 else 0.0
+
+    def getPeakLoad(self):
+        return max(sample[1] for sample in self.fHistory) if len(self.fHistory) > 0 else 0.0
+
+    def getXrunCount(self):
+        return self.fXruns
+
+    # xruns within the kept history
+    def getRecentXrunCount(self):
+        return sum(sample[2] for sample in self.fHistory)
+
+    def getEngineInfo(self):
+        if self.fClient is None:
+            return None
+
+        return (libjack.jack_get_sample_rate(self.fClient), libjack.jack_get_buffer_size(self.fClient))
+
+# ------------------------------------------------------------------------------------------------------------
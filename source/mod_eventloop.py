@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import asyncio
+import heapq
+import math
+import selectors
+import threading
+
+from PyQt5.QtCore import pyqtSlot, QObject, QSocketNotifier, QTimer
+
+# ------------------------------------------------------------------------------------------------------------
+
+# Driving asyncio from Qt needs a selector that is itself a file descriptor Qt can watch (epoll, kqueue),
+# which becomes readable whenever any of the sockets in it does
+ASYNCIO_DRIVER_SUPPORTED = hasattr(selectors.DefaultSelector, "fileno")
+
+# ------------------------------------------------------------------------------------------------------------
+# Selector that never blocks, waiting is done by Qt (except in AsyncioDriver.runUntilComplete)
+
+class NonBlockingSelector(selectors.DefaultSelector):
+    def __init__(self):
+        selectors.DefaultSelector.__init__(self)
+        self.fWait = False
+
+    def select(self, timeout=None):
+        return selectors.DefaultSelector.select(self, timeout if self.fWait else 0)
+
+# ------------------------------------------------------------------------------------------------------------
+# Driven Event Loop
+# Selector event loop that tells its driver when something is scheduled on it, through its public call_soon and
+# call_at (which call_later goes through too). @a wakeup is called with None for a callback that is ready, or
+# with the loop time of a timer; only in the thread the loop was created in, call_soon_threadsafe from other
+# threads wakes up the selector instead. stop() is remembered, so the driver knows to stop too.
+
+class DrivenEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, selector, wakeup):
+        self.fWakeup        = wakeup
+        self.fThreadId      = threading.get_ident()
+        self.fStopRequested = False
+
+        asyncio.SelectorEventLoop.__init__(self, selector)
+
+    def call_soon(self, callback, *args, **kwargs):
+        handle = asyncio.SelectorEventLoop.call_soon(self, callback, *args, **kwargs)
+        if threading.get_ident() == self.fThreadId:
+            self.fWakeup(None)
+        return handle
+
+    def call_at(self, when, callback, *args, **kwargs):
+        handle = asyncio.SelectorEventLoop.call_at(self, when, callback, *args, **kwargs)
+        if threading.get_ident() == self.fThreadId:
+            self.fWakeup(when)
+        return handle
+
+    def stop(self):
+        self.fStopRequested = True
+        asyncio.SelectorEventLoop.stop(self)
+
+    # Ends run_forever() after its current iteration, without counting as a stop request
+    def endStep(self):
+        asyncio.SelectorEventLoop.stop(self)
+
+    def takeStopRequest(self):
+        requested = self.fStopRequested
+        self.fStopRequested = False
+        return requested
+
+# ------------------------------------------------------------------------------------------------------------
+# Asyncio Driver
+# Runs an asyncio event loop from the Qt event loop, in the GUI thread: a socket notifier on the loop's selector
+# wakes it up for I/O (including call_soon_threadsafe, which writes to the loop's self-pipe), and a single-shot
+# timer for its next scheduled callback. Each wakeup runs one iteration of the loop, as run_forever() with a stop
+# queued behind what is ready, so nothing else waits on it and there are no thread hops between the GUI and code
+# running in the loop. The loop itself reports what gets scheduled on it (see DrivenEventLoop).
+#
+# The loop is set as the thread's event loop, so tornado's IOLoop.current() picks it up. While stopped, callbacks
+# are kept and run once started again.
+
+class AsyncioDriver(QObject):
+    def __init__(self, parent):
+        QObject.__init__(self, parent)
+
+        self.fSelector = NonBlockingSelector()
+        self.fLoop     = DrivenEventLoop(self.fSelector, self.wakeup)
+        self.fActive   = False
+        self.fStepping = False
+        self.fReady    = False
+        self.fTimers   = [] # heap of loop times, of timers that may still be pending
+        self.fSteps    = 0
+
+        asyncio.set_event_loop(self.fLoop)
+
+        self.fNotifier = QSocketNotifier(self.fSelector.fileno(), QSocketNotifier.Read, self)
+        self.fNotifier.setEnabled(False)
+        self.fNotifier.activated.connect(self.slot_step)
+
+        self.fTimer = QTimer(self)
+        self.fTimer.setSingleShot(True)
+        self.fTimer.timeout.connect(self.slot_step)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def getLoop(self):
+        return self.fLoop
+
+    def isActive(self):
+        return self.fActive
+
+    # Number of loop iterations run so far
+    def getStepCount(self):
+        return self.fSteps
+
+    def start(self):
+        if self.fActive:
+            return
+
+        self.fActive = True
+        self.fNotifier.setEnabled(True)
+        self.fTimer.start(0)
+
+    def stop(self):
+        if not self.fActive:
+            return
+
+        self.fActive = False
+        self.fNotifier.setEnabled(False)
+        self.fTimer.stop()
+
+    # Run the loop until @a coroutine is done, blocking the GUI thread for at most @a timeout seconds.
+    # Returns False if it timed out.
+    def runUntilComplete(self, coroutine, timeout):
+        self.fStepping = True
+        self.fSelector.fWait = True
+
+        try:
+            self.fLoop.run_until_complete(asyncio.wait_for(coroutine, timeout))
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.fSelector.fWait = False
+            self.fStepping = False
+            self.rearm()
+
+        return True
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Called by the loop when something is scheduled on it, see DrivenEventLoop
+    def wakeup(self, when):
+        if when is None:
+            self.fReady = True
+        else:
+            heapq.heappush(self.fTimers, when)
+
+        if not self.fStepping:
+            self.rearm()
+
+    def rearm(self):
+        if not self.fActive:
+            return
+
+        if self.fReady:
+            self.fTimer.start(0)
+        elif self.fTimers:
+            self.fTimer.start(int(math.ceil(max(0.0, self.fTimers[0] - self.fLoop.time()) * 1000)))
+        else:
+            self.fTimer.stop()
+
+    @pyqtSlot()
+    def slot_step(self):
+        if not self.fActive:
+            return
+
+        loop  = self.fLoop
+        start = loop.time()
+        self.fSteps += 1
+
+        # one iteration: runs what is ready, including timers due by now, then the end marker
+        self.fStepping = True
+        loop.call_soon(loop.endStep)
+        self.fReady = False
+
+        try:
+            loop.run_forever()
+        finally:
+            self.fStepping = False
+
+        # anything scheduled during the iteration has set fReady again, or pushed its timer
+        while self.fTimers and self.fTimers[0] <= start:
+            heapq.heappop(self.fTimers)
+
+        # loop.stop() was called, same as run_forever() returning
+        if loop.takeStopRequest():
+            self.stop()
+            return
+
+        self.rearm()
+
+# ------------------------------------------------------------------------------------------------------------
@@ -20,22 +20,51 @@
 # Imports (Custom)
 
 from mod_settings import *
+from mod_affinity import ALL_CPUS, SCHED_SUPPORTED, applyScheduling, parseCpuList, verifyScheduling
+from mod_archive import ARCHIVE_CORRUPT, ARCHIVE_FAILED, ARCHIVE_UNVERIFIED, ArchiveAborted, ArchiveProgress
+from mod_archive import exportBundles, exportBundlesToDirectory, importArchives, isArchiveFile
+from mod_browser import BROWSER_SORT_MATCH, BROWSER_SORT_TITLE, BROWSER_URI_ROLE, PedalboardFilterProxy
+from mod_browser import PedalboardListModel
+from mod_catalog import PedalboardSearchIndex, PluginUsageIndex, getPedalboardPluginURIs
+from mod_dedup import ContentStore, formatReport, unshareBundle
+from mod_dsp import DSP_LOAD_WARNING, DSP_SAMPLE_INTERVAL, DspMonitor
+from mod_eventloop import ASYNCIO_DRIVER_SUPPORTED, AsyncioDriver
+from mod_jack import JackManager
+from mod_journal import PedalboardJournal, parseRequest
+from mod_lag import LagMonitor
+from mod_memory import LOW_MEMORY_WEB_CACHE, formatSize, getProcessRSS, getRSSBreakdown, isMemoryUnderPressure
+from mod_network import CachingNetworkAccessManager, StaticAssetCache, setWebMemoryCacheSize
+from mod_saving import SAVE_URL_PATH, PedalboardSaver
+from mod_scheduler import IdleScheduler
+from mod_thumbnails import ThumbnailQueue, findPedalboardBundles
+from mod_ttl import getPedalboardInfo
+from mod_visibility import VisibilityThrottler
+from mod_webserver import WEBSERVER_PROCESS_SUPPORTED, WEBSERVER_STOP_TIMEOUT, WebServerProcess
 
 # ------------------------------------------------------------------------------------------------------------
 # Imports (Global)
 
+import gc
+import json
+import shlex
+import threading
+
+from urllib.parse import urlsplit
+
 if using_Qt4:
-    from PyQt4.QtCore import pyqtSignal, pyqtSlot, qCritical, qWarning, Qt, QFileInfo, QProcess, QSettings, QSize, QThread, QTimer, QUrl
-    from PyQt4.QtGui import QDesktopServices, QImage, QPainter, QPixmap
-    from PyQt4.QtGui import QAction, QApplication, QDialog, QFileDialog, QInputDialog, QLineEdit, QListWidgetItem
-    from PyQt4.QtGui import QMainWindow, QMessageBox, QPlainTextEdit, QVBoxLayout
+    from PyQt4.QtCore import pyqtSignal, pyqtSlot, qCritical, qWarning, Qt, QElapsedTimer, QEvent, QFileInfo, QObject, QProcess, QSettings, QSize, QThread, QTimer, QUrl
+    from PyQt4.QtGui import QDesktopServices, QImage, QPainter, QPixmap, QPixmapCache
+    from PyQt4.QtGui import QAction, QApplication, QDialog, QFileDialog, QInputDialog, QLineEdit
+    from PyQt4.QtGui import QMainWindow, QMessageBox, QPlainTextEdit, QProgressBar, QProgressDialog, QVBoxLayout
+    from PyQt4.QtNetwork import QNetworkReply
     from PyQt4.QtWebKit import QWebSettings
     from PyQt4.QtWebKit import QWebInspector, QWebPage, QWebView
 else:
-    from PyQt5.QtCore import pyqtSignal, pyqtSlot, qCritical, qWarning, Qt, QFileInfo, QProcess, QSettings, QSize, QThread, QTimer, QUrl
-    from PyQt5.QtGui import QDesktopServices, QImage, QPainter, QPixmap
-    from PyQt5.QtWidgets import QAction, QApplication, QDialog, QFileDialog, QInputDialog, QLineEdit, QListWidgetItem
-    from PyQt5.QtWidgets import QMainWindow, QMessageBox, QPlainTextEdit, QVBoxLayout
+    from PyQt5.QtCore import pyqtSignal, pyqtSlot, qCritical, qWarning, Qt, QElapsedTimer, QEvent, QFileInfo, QObject, QProcess, QSettings, QSize, QThread, QTimer, QUrl
+    from PyQt5.QtGui import QDesktopServices, QImage, QPainter, QPixmap, QPixmapCache
+    from PyQt5.QtWidgets import QAction, QApplication, QDialog, QFileDialog, QInputDialog, QLineEdit
+    from PyQt5.QtWidgets import QMainWindow, QMessageBox, QPlainTextEdit, QProgressBar, QProgressDialog, QVBoxLayout
+    from PyQt5.QtNetwork import QNetworkReply
     from PyQt5.QtWebKit import QWebSettings
     from PyQt5.QtWebKitWidgets import QWebInspector, QWebPage, QWebView
 
@@ -56,7 +85,7 @@ setInitialSettings()
 
 from mod import webserver
 from mod.session import SESSION
-from modtools.utils import get_bundle_dirname, get_all_pedalboards, get_pedalboard_info
+from modtools.utils import get_bundle_dirname, get_all_pedalboards, get_all_plugins, get_pedalboard_info
 
 # ------------------------------------------------------------------------------------------------------------
 # Imports (asyncio)
@@ -77,9 +106,10 @@ class WebServerThread(QThread):
     # globals
     prepareWasCalled = False
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, lagMonitor=None):
         QThread.__init__(self, parent)
-        self.eventLoop = None
+        self.eventLoop  = None
+        self.lagMonitor = lagMonitor
 
     def checkReady(self):
         if not SESSION.host.connected:
@@ -98,15 +128,379 @@ class WebServerThread(QThread):
             self.prepareWasCalled = True
             webserver.prepare(True)
 
+        if self.lagMonitor is not None:
+            self.lagMonitor.addLoop("tornado", IOLoop.instance().add_callback, threading.get_ident())
+
         self.checkReady()
         webserver.start()
 
+        if self.lagMonitor is not None:
+            self.lagMonitor.removeLoop("tornado")
+
     def stopWait(self):
+        # stopping is not a stall
+        if self.lagMonitor is not None:
+            self.lagMonitor.removeLoop("tornado")
+
         webserver.stop()
         if self.eventLoop is not None:
             self.eventLoop.call_soon_threadsafe(self.eventLoop.stop)
         return self.wait(5000)
 
+    def closeJack(self):
+        SESSION.host.close_jack()
+
+# ------------------------------------------------------------------------------------------------------------
+# WebServer Integrated
+# Runs the webserver in the GUI thread, with its asyncio loop driven by the Qt one (see AsyncioDriver).
+# Same interface as WebServerThread. Created at startup only, tornado stays bound to the loop it was prepared on.
+# Stopping closes the webserver's listening socket and connections and stops its loop, starting again listens anew.
+
+class WebServerIntegrated(QObject):
+    # signals
+    running  = pyqtSignal()
+    finished = pyqtSignal()
+
+    def __init__(self, parent):
+        QObject.__init__(self, parent)
+
+        self.fDriver   = AsyncioDriver(self)
+        self.fPrepared = False
+        self.fListen   = None
+        self.fServer   = None
+
+    def checkReady(self):
+        if not self.fDriver.isActive():
+            return
+        if not SESSION.host.connected:
+            IOLoop.instance().call_later(0.25, self.checkReady)
+            return
+        self.running.emit()
+
+    def start(self):
+        if self.fDriver.isActive():
+            return
+
+        self.fDriver.start()
+
+        SESSION.host.init_host()
+
+        if not self.fPrepared:
+            self.fPrepared = True
+            self.prepare()
+        elif self.fServer is None and self.fListen is not None:
+            self.fServer = self.fListen()
+
+        self.checkReady()
+
+    # Prepare the webserver, keeping the server it listens with so stopWait() can close it
+    def prepare(self):
+        application = getattr(webserver, "application", None)
+
+        if application is None:
+            webserver.prepare(True)
+            return
+
+        listen = application.listen
+
+        def captureListen(*args, **kwargs):
+            self.fListen = lambda: listen(*args, **kwargs)
+            self.fServer = self.fListen()
+            return self.fServer
+
+        application.listen = captureListen
+
+        try:
+            webserver.prepare(True)
+        finally:
+            del application.listen
+
+    def isRunning(self):
+        return self.fDriver.isActive()
+
+    def stopWait(self):
+        if not self.fDriver.isActive():
+            return True
+
+        ok = True
+
+        # no new connections, and the open ones are closed
+        if self.fServer is not None:
+            self.fServer.stop()
+            if hasattr(self.fServer, "close_all_connections"):
+                ok = self.fDriver.runUntilComplete(self.fServer.close_all_connections(),
+                                                   WEBSERVER_STOP_TIMEOUT / 1000)
+            self.fServer = None
+
+        # same as the threaded webserver, its loop is stopped, which stops the driver after one more iteration
+        webserver.stop()
+        self.fDriver.slot_step()
+        self.fDriver.stop()
+
+        self.finished.emit()
+        return ok
+
+    def terminate(self):
+        if not self.fDriver.isActive():
+            return
+
+        self.fServer = None
+        self.fDriver.stop()
+        self.finished.emit()
+
+    def closeJack(self):
+        SESSION.host.close_jack()
+
+# ------------------------------------------------------------------------------------------------------------
+# Lag Pinger
+# Runs the lag monitor's pings in the GUI thread, they're emitted from the monitor's own thread.
+# User input tells the monitor the GUI is busy, so it pings often while it's used and backs off when idle.
+
+class LagPinger(QObject):
+    # signals
+    ping = pyqtSignal(object)
+
+    def __init__(self, parent, monitor):
+        QObject.__init__(self, parent)
+        self.fMonitor = monitor
+        self.ping.connect(self.slot_ping, Qt.QueuedConnection)
+
+        QApplication.instance().installEventFilter(self)
+
+    @pyqtSlot(object)
+    def slot_ping(self, callback):
+        callback()
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QEvent.KeyPress, QEvent.MouseButtonPress, QEvent.Wheel):
+            self.fMonitor.noteActivity("qt")
+
+        return False
+
+# ------------------------------------------------------------------------------------------------------------
+# Plugin Usage Thread
+# Brings the plugin usage index up to date in the background, reading only new and modified pedalboards.
+
+class PluginUsageThread(QThread):
+    def __init__(self, parent, index):
+        QThread.__init__(self, parent)
+        self.fIndex   = index
+        self.fBundles = []
+        self.fAbort   = False
+
+    def setBundles(self, bundles):
+        self.fBundles = list(bundles)
+
+    def run(self):
+        self.fAbort = False
+        changes = self.fIndex.update(self.fBundles, self.getPluginURIs, self.isAborted)
+        print("plugin usage index updated, %i pedalboards read" % changes)
+
+    def getPluginURIs(self, bundle):
+        return getPedalboardPluginURIs(getPedalboardInfo(bundle, get_pedalboard_info))
+
+    def isAborted(self):
+        return self.fAbort
+
+    def stopWait(self):
+        self.fAbort = True
+        return self.wait(5000)
+
+# ------------------------------------------------------------------------------------------------------------
+# Archive Thread
+# Runs a pedalboard export or import (see mod_archive.py) in the background, one at a time.
+
+ARCHIVE_FILTER = "Pedalboard archives (*.zip *.tar *.tar.gz *.tgz *.tar.bz2 *.tar.xz)"
+
+class ArchiveThread(QThread):
+    def __init__(self, parent):
+        QThread.__init__(self, parent)
+        self.fJob      = None
+        self.fTitle    = ""
+        self.fProgress = ArchiveProgress()
+        self.fResults  = []
+        self.fError    = ""
+
+    # Run @a job with @a args, plus a new progress
+    def startJob(self, title, job, *args):
+        self.fJob      = (job, args)
+        self.fTitle    = title
+        self.fProgress = ArchiveProgress()
+        self.fResults  = []
+        self.fError    = ""
+        self.start(QThread.LowPriority)
+
+    def run(self):
+        job, args = self.fJob
+
+        try:
+            self.fResults = job(*args, progress=self.fProgress)
+        except ArchiveAborted:
+            self.fError = "Cancelled"
+        except Exception as e:
+            self.fError = str(e) or type(e).__name__
+        finally:
+            self.fProgress.finish()
+
+    def getJob(self):
+        return self.fJob[0] if self.fJob is not None else None
+
+    def getTitle(self):
+        return self.fTitle
+
+    def getProgress(self):
+        return self.fProgress
+
+    def getResults(self):
+        return self.fResults
+
+    def getError(self):
+        return self.fError
+
+    def abort(self):
+        self.fProgress.abort()
+
+    def stopWait(self):
+        self.abort()
+        return self.wait(5000)
+
+# ------------------------------------------------------------------------------------------------------------
+# Dedup Thread
+# Compacts the pedalboard library into the content store (see mod_dedup.py) in the background.
+
+class DedupThread(QThread):
+    def __init__(self, parent, store):
+        QThread.__init__(self, parent)
+        self.fStore   = store
+        self.fBundles = []
+        self.fExclude = []
+        self.fReport  = None
+        self.fAbort   = False
+
+    def setBundles(self, bundles, exclude):
+        self.fBundles = list(bundles)
+        self.fExclude = list(exclude)
+
+    def run(self):
+        self.fAbort  = False
+        self.fReport = self.fStore.compact(self.fBundles, self.fExclude, self.isAborted)
+
+    def getReport(self):
+        return self.fReport
+
+    def isAborted(self):
+        return self.fAbort
+
+    def stopWait(self):
+        self.fAbort = True
+        return self.wait(5000)
+
+# ------------------------------------------------------------------------------------------------------------
+# Journal Bridge
+# Reports the page's requests and websocket messages to the pedalboard journal, and the responses to its saves to
+# the pedalboard saver. JS_JOURNAL_HOOK wraps the browser APIs mod-ui uses, it runs each time the window object is
+# cleared so it's in place before any page script.
+
+JS_JOURNAL_HOOK = """
+(function() {
+    var journal = window.modAppJournal;
+    var xhrOpen = XMLHttpRequest.prototype.open;
+    var xhrSend = XMLHttpRequest.prototype.send;
+    var OrigWebSocket = window.WebSocket;
+    var wsSend = OrigWebSocket.prototype.send;
+
+    XMLHttpRequest.prototype.open = function(method, url) {
+        this.modAppRequest = [String(method), String(url)];
+        return xhrOpen.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.send = function(body) {
+        if (this.modAppRequest) {
+            journal.request(this.modAppRequest[0], this.modAppRequest[1], typeof body === "string" ? body : "");
+
+            var link = document.createElement("a");
+            link.href = this.modAppRequest[1];
+            if (link.pathname.replace(/\/+$/, "") === "%s") {
+                this.addEventListener("loadend", function() {
+                    journal.saveResponse(this.status, this.responseText || "");
+                });
+            }
+        }
+        return xhrSend.apply(this, arguments);
+    };
+
+    OrigWebSocket.prototype.send = function(data) {
+        if (typeof data === "string")
+            journal.message(data);
+        return wsSend.apply(this, arguments);
+    };
+    window.WebSocket = function(url, protocols) {
+        var ws = (protocols === undefined) ? new OrigWebSocket(url) : new OrigWebSocket(url, protocols);
+        window.modAppSocket = ws;
+        return ws;
+    };
+    window.WebSocket.prototype = OrigWebSocket.prototype;
+})();
+""" % SAVE_URL_PATH
+
+# runs a list of journal replay steps, in order, each request is sent once the previous one is answered.
+# Requests are asynchronous, the webserver may be running in the GUI thread (see WebServerIntegrated).
+JS_JOURNAL_REPLAY = """
+(function(replay) {
+    var i = 0;
+    function next() {
+        while (i < replay.length) {
+            var step = replay[i++];
+            if (step[0] === "request") {
+                var xhr = new XMLHttpRequest();
+                xhr.onloadend = next;
+                xhr.open(step[1], step[2], true);
+                xhr.send(step[3] || null);
+                return;
+            }
+            if (window.modAppSocket)
+                window.modAppSocket.send(step[1]);
+        }
+    }
+    next();
+})(%s);
+"""
+
+class JournalBridge(QObject):
+    # signals, sent before the request goes out so the bundle can be prepared for it
+    pedalboardLoading = pyqtSignal(str) # bundle
+    pedalboardSaving  = pyqtSignal()
+    pedalboardSaved   = pyqtSignal(int, str) # http status (0 if none), response body
+
+    def __init__(self, parent, journal):
+        QObject.__init__(self, parent)
+        self.fJournal = journal
+        self.fEnabled = False
+
+    def setEnabled(self, enabled):
+        self.fEnabled = enabled
+
+    @pyqtSlot(str, str, str)
+    def request(self, method, url, body):
+        if urlsplit(url).path.rstrip("/") == SAVE_URL_PATH:
+            self.pedalboardSaving.emit()
+        else:
+            edit = parseRequest(method, url, body)
+
+            if edit is not None and edit[0] == "load":
+                self.pedalboardLoading.emit(edit[1])
+
+        if self.fEnabled:
+            self.fJournal.recordRequest(method, url, body)
+
+    @pyqtSlot(str)
+    def message(self, message):
+        if self.fEnabled:
+            self.fJournal.recordMessage(message)
+
+    @pyqtSlot(int, str)
+    def saveResponse(self, status, body):
+        self.pedalboardSaved.emit(status, body)
+
 # ------------------------------------------------------------------------------------------------------------
 # Host WebPage
 
@@ -147,36 +541,77 @@ class HostWebPage(QWebPage):
 # Open Pedalboard Window
 
 class OpenPedalboardWindow(QDialog):
-    def __init__(self, parent, pedalboards):
+    def __init__(self, parent, index, unreadable=()):
         QDialog.__init__(self)
         self.ui = Ui_PedalboardOpen()
         self.ui.setupUi(self)
 
+        self.fIndex = index
         self.fSelectedURI = ""
+        self.fUnreadable = frozenset(unreadable)
+
+        # rows are fetched as the view scrolls, and unreadable bundles are hidden unless asked for
+        self.fModel = PedalboardListModel(self, self.ui.listView.iconSize())
+        self.fProxy = PedalboardFilterProxy(self)
+        self.fProxy.setSourceModel(self.fModel)
+        self.fProxy.setHiddenBundles(unreadable)
+        self.ui.listView.setModel(self.fProxy)
 
-        for pedalboard in pedalboards:
-            item = QListWidgetItem(self.ui.listWidget)
-            item.setData(Qt.UserRole, pedalboard['uri'])
-            item.setIcon(QIcon(os.path.join(pedalboard['bundle'], "thumbnail.png")))
-            item.setText(pedalboard['title'])
-            self.ui.listWidget.addItem(item)
+        self.ui.cb_unreadable.setEnabled(len(unreadable) > 0)
 
-        self.ui.listWidget.setCurrentRow(0)
+        self.slot_updateList("")
 
         self.accepted.connect(self.slot_setSelectedURI)
-        self.ui.listWidget.doubleClicked.connect(self.accept)
+        self.ui.le_search.textChanged.connect(self.slot_updateList)
+        self.ui.le_search.returnPressed.connect(self.accept)
+        self.ui.listView.doubleClicked.connect(self.accept)
+        self.ui.cb_sort.currentIndexChanged.connect(self.slot_sortChanged)
+        self.ui.cb_unreadable.toggled.connect(self.slot_showUnreadable)
+
+        self.ui.le_search.setFocus()
+
+    @pyqtSlot(str)
+    def slot_updateList(self, text):
+        pedalboards, complete = self.fIndex.search(text)
+        self.setPedalboardList(pedalboards)
+
+        # search ran out of time and stopped early, finish it once idle
+        if not complete:
+            QTimer.singleShot(0, self.slot_finishSearch)
+
+    @pyqtSlot()
+    def slot_finishSearch(self):
+        pedalboards, complete = self.fIndex.search(self.ui.le_search.text(), budget=1.0)
+        self.setPedalboardList(pedalboards)
+
+    @pyqtSlot(int)
+    def slot_sortChanged(self, index):
+        self.fProxy.sort(BROWSER_SORT_TITLE if index == 1 else BROWSER_SORT_MATCH)
+        self.ui.listView.scrollToTop()
+
+    @pyqtSlot(bool)
+    def slot_showUnreadable(self, show):
+        self.fProxy.setHiddenBundles(() if show else self.fUnreadable)
+        self.selectFirst()
+
+    def setPedalboardList(self, pedalboards):
+        self.fModel.setPedalboards(pedalboards)
+        self.selectFirst()
+
+    def selectFirst(self):
+        self.ui.listView.setCurrentIndex(self.fProxy.index(0, 0))
 
     def getSelectedURI(self):
         return self.fSelectedURI
 
     @pyqtSlot()
     def slot_setSelectedURI(self):
-        item = self.ui.listWidget.currentItem()
+        index = self.ui.listView.currentIndex()
 
-        if item is None:
+        if not index.isValid():
             return
 
-        self.fSelectedURI = item.data(Qt.UserRole)
+        self.fSelectedURI = index.data(BROWSER_URI_ROLE)
 
     def done(self, r):
         QDialog.done(self, r)
@@ -213,29 +648,98 @@ class HostWindow(QMainWindow):
         # need to call session reconnect after connecting the 1st time
         self.fNeedsSessionReconnect = False
 
-        # Qt idle timer
-        self.fIdleTimerId = 0
+        # Periodic tasks, only wakes up when one of them is due
+        self.fScheduler = IdleScheduler(self, MOD_DEFAULT_MAIN_REFRESH_INTERVAL)
+        self.fScheduler.addTask("memory", 10000, self.checkMemoryPressure)
 
         # Qt web frame, used for evaluating javascript
         self.fWebFrame = None
 
-        # to be filled with key-value pairs of current settings
-        self.fSavedSettings = {}
+        # Current settings, changes are applied as they happen
+        self.fSettings = getSettingsStore()
+
+        # Smaller caches and no background jobs, see slot_settingChanged
+        self.fLowMemory = self.fSettings.value(MOD_KEY_MAIN_LOW_MEMORY)
+
+        # List of pedalboards, read when first needed (see getPedalboards)
+        self.fPedalboards = None
+
+        # Search index for the pedalboards, sorted by recent use
+        self.fPedalboardIndex = PedalboardSearchIndex([], self.fSettings.value(MOD_KEY_PEDALBOARD_RECENT))
 
-        # List of pedalboards
-        self.fPedalboards = get_all_pedalboards()
+        # Which pedalboards use which plugins, updated in the background once the UI is loaded
+        self.fPluginUsage = PluginUsageIndex(os.path.join(CACHE_DIR, "MOD-App", "plugin-usage.json"))
+        self.fPluginUsageThread = PluginUsageThread(self, self.fPluginUsage)
+
+        # Identical files of several pedalboards are shared through this store (see MOD_KEY_PEDALBOARD_DEDUPLICATE)
+        self.fContentStore     = ContentStore(os.path.join(DATA_DIR, "objects"))
+        self.fDedupThread      = DedupThread(self, self.fContentStore)
+        self.fDedupInteractive = False
+
+        # Pedalboard exports and imports, with a progress dialog while one runs
+        self.fArchiveThread = ArchiveThread(self)
+        self.fArchiveDialog = None
+
+        # Edits to the current pedalboard since it was loaded or saved, what's left after a crash can be restored
+        self.fJournal        = PedalboardJournal(os.path.join(DATA_DIR, "pedalboard-journal.jsonl"))
+        self.fJournalRecover = self.fJournal.load()
+        self.fJournalBridge  = JournalBridge(self, self.fJournal)
+        self.fJournalReplay  = None
+        self.fScheduler.addTask("journal", 60000, self.fJournal.compactIfDirty)
 
         # List of current-pedalboard presets
         self.fPresetMenuList = []
 
+        # JACK server and internal clients, made ready before the backend on the live ISO
+        self.fJack = JackManager(self)
+
+        if MOD_APP_JACKD:
+            self.fJack.setServerCommand(shlex.split(MOD_APP_JACKD))
+
+        # Lag of the Qt and webserver event loops, with the stacks of all threads whenever one of them stalls
+        self.fLagMonitor = LagMonitor(os.path.join(CACHE_DIR, "MOD-App", "stalls.txt"))
+        self.fLagPinger  = LagPinger(self, self.fLagMonitor)
+        self.fLagMonitor.addLoop("qt", self.fLagPinger.ping.emit, threading.get_ident())
+        self.fLagMonitor.start()
+
         # Process that runs the backend
         self.fProccessBackend = QProcess(self)
         self.fProccessBackend.setProcessChannelMode(QProcess.MergedChannels)
         self.fProccessBackend.setReadChannel(QProcess.StandardOutput)
         self.fStoppingBackend = False
 
-        # Thread for managing the webserver
-        self.fWebServerThread = WebServerThread(self)
+        # Thread for managing the webserver, or a separate process for it (see MOD_KEY_HOST_WEBSERVER_PROCESS).
+        # fWebServer is the one in use, picked on each backend start.
+        self.fWebServerThread  = WebServerThread(self, self.fLagMonitor)
+        self.fWebServerProcess = WebServerProcess(self)
+        self.fWebServer        = self.fWebServerThread
+
+        # Or in the GUI thread, which can only be decided at startup (see MOD_KEY_HOST_WEBSERVER_INTEGRATED)
+        if self.fSettings.value(MOD_KEY_HOST_WEBSERVER_INTEGRATED) and ASYNCIO_DRIVER_SUPPORTED and not USING_LIVE_ISO:
+            self.fWebServerIntegrated = WebServerIntegrated(self)
+        else:
+            self.fWebServerIntegrated = None
+
+        # Static mod-ui files, served from memory instead of going through the webserver
+        self.fStaticAssetCache = StaticAssetCache(os.environ['MOD_HTML_DIR'], 0)
+
+        # Measures how long the UI takes to (re)load, a refresh only reloads the page (see slot_fileRefresh)
+        self.fLoadTimer  = QElapsedTimer()
+        self.fRefreshing = False
+
+        # DSP load and xruns while the backend runs, and the pedalboard switches that caused xruns as (title, xruns)
+        self.fDspMonitor  = DspMonitor(self)
+        self.fDspSwitches = []
+
+        # What the backend and GUI threads run with, see applyBackendScheduling() and applyGuiScheduling()
+        self.fSchedulingReport = { 'backend': ["-"], 'interface': ["-"] }
+
+        # Last time memory was released because of memory pressure
+        self.fMemoryReleaseTimer = QElapsedTimer()
+
+        # Backend lifecycle timing, list of (phase, ms since the backend was started)
+        self.fLifecycleTimer  = QElapsedTimer()
+        self.fLifecycleEvents = []
 
         # ----------------------------------------------------------------------------------------------------
         # Set up GUI
@@ -248,10 +752,34 @@ class HostWindow(QMainWindow):
         self.ui.webpage.setViewportSize(QSize(980, 600))
         self.ui.webview.setPage(self.ui.webpage)
 
-        self.ui.webinspector = QWebInspector(None)
-        self.ui.webinspector.resize(800, 600)
-        self.ui.webinspector.setPage(self.ui.webpage)
-        self.ui.webinspector.setVisible(False)
+        self.ui.webnetwork = CachingNetworkAccessManager(self, os.path.join(CACHE_DIR, "MOD-App", "webcache"))
+        self.ui.webnetwork.setStaticAssetCache(config["addr"], self.fStaticAssetCache)
+        self.ui.webpage.setNetworkAccessManager(self.ui.webnetwork)
+
+        # throttle the web view while we're not visible
+        self.fVisibilityThrottler = VisibilityThrottler(self, self.ui.webview, self.fScheduler)
+
+        # render missing and outdated pedalboard images while idle, started once the UI is loaded
+        self.fThumbnailQueue = ThumbnailQueue(self, self.fScheduler, config["addr"], self.ui.webnetwork)
+
+        # saves with a result, and autosave
+        self.fSaver = PedalboardSaver(self, self.ui.webnetwork, self.fScheduler)
+
+        # pedalboards that got their first thumbnail are picked up by a (delayed) rescan
+        self.fPedalboardRescanTimer = QTimer(self)
+        self.fPedalboardRescanTimer.setSingleShot(True)
+        self.fPedalboardRescanTimer.setInterval(30000)
+
+        # compact DSP meter, shown while the monitor runs
+        self.ui.dspmeter = QProgressBar(self)
+        self.ui.dspmeter.setRange(0, 100)
+        self.ui.dspmeter.setFixedWidth(160)
+        self.ui.dspmeter.setMaximumHeight(16)
+        self.ui.dspmeter.hide()
+        self.statusBar().addPermanentWidget(self.ui.dspmeter)
+
+        # created when first shown, see getWebInspector()
+        self.ui.webinspector = None
 
         self.ui.act_file_connect.setEnabled(False)
         self.ui.act_file_connect.setVisible(False)
@@ -319,6 +847,12 @@ class HostWindow(QMainWindow):
         self.SIGUSR1.connect(self.slot_handleSIGUSR1)
         self.SIGTERM.connect(self.slot_handleSIGTERM)
 
+        self.fSettings.valueChanged.connect(self.slot_settingChanged)
+
+        self.fJack.progress.connect(self.ui.label_progress.setText)
+        self.fJack.ready.connect(self.slot_jackReady)
+        self.fJack.failed.connect(self.slot_jackFailed)
+
         self.fProccessBackend.error.connect(self.slot_backendError)
         self.fProccessBackend.started.connect(self.slot_backendStarted)
         self.fProccessBackend.finished.connect(self.slot_backendFinished)
@@ -326,6 +860,13 @@ class HostWindow(QMainWindow):
 
         self.fWebServerThread.running.connect(self.slot_webServerRunning)
         self.fWebServerThread.finished.connect(self.slot_webServerFinished)
+        self.fWebServerProcess.running.connect(self.slot_webServerRunning)
+        self.fWebServerProcess.finished.connect(self.slot_webServerFinished)
+        self.fWebServerProcess.pedalChanged.connect(self._pedal_changed_callback)
+
+        if self.fWebServerIntegrated is not None:
+            self.fWebServerIntegrated.running.connect(self.slot_webServerRunning)
+            self.fWebServerIntegrated.finished.connect(self.slot_webServerFinished)
 
         self.ui.menu_Pedalboard.aboutToShow.connect(self.slot_pedalboardCheckOnline)
 
@@ -333,6 +874,22 @@ class HostWindow(QMainWindow):
         self.ui.act_file_inspect.triggered.connect(self.slot_fileInspect)
 
         self.ui.act_backend_information.triggered.connect(self.slot_backendInformation)
+        self.ui.act_backend_missing_plugins.triggered.connect(self.slot_backendMissingPlugins)
+        self.ui.act_backend_stalls.triggered.connect(self.slot_backendStalls)
+        self.fPluginUsageThread.finished.connect(self.slot_pluginUsageUpdated)
+        self.fArchiveThread.finished.connect(self.slot_archiveFinished)
+        self.fDedupThread.finished.connect(self.slot_compactionFinished)
+        self.fJournalBridge.pedalboardLoading.connect(self.slot_unshareBundle)
+        self.fJournalBridge.pedalboardSaving.connect(self.slot_unsharePedalboard)
+        self.fSaver.saveStarted.connect(self.slot_unsharePedalboard)
+        self.fThumbnailQueue.thumbnailUpdated.connect(self.slot_thumbnailUpdated)
+        self.fSaver.saveFinished.connect(self.slot_pedalboardSaveFinished)
+        self.fJournalBridge.pedalboardSaved.connect(self.fSaver.slot_saveResponse)
+        self.fDspMonitor.updated.connect(self.slot_dspUpdated)
+        self.fDspMonitor.switchXruns.connect(self.slot_dspSwitchXruns)
+        self.ui.webnetwork.requestCreated.connect(self.slot_webRequestCreated)
+        self.ui.webpage.mainFrame().javaScriptWindowObjectCleared.connect(self.slot_webviewWindowObjectCleared)
+        self.fPedalboardRescanTimer.timeout.connect(self.slot_pedalboardRescan)
         self.ui.act_backend_start.triggered.connect(self.slot_backendStart)
         self.ui.act_backend_stop.triggered.connect(self.slot_backendStop)
         self.ui.act_backend_restart.triggered.connect(self.slot_backendRestart)
@@ -341,6 +898,10 @@ class HostWindow(QMainWindow):
         self.ui.act_pedalboard_open.triggered.connect(self.slot_pedalboardOpen)
         self.ui.act_pedalboard_save.triggered.connect(self.slot_pedalboardSave)
         self.ui.act_pedalboard_save_as.triggered.connect(self.slot_pedalboardSaveAs)
+        self.ui.act_pedalboard_import.triggered.connect(self.slot_pedalboardImport)
+        self.ui.act_pedalboard_export.triggered.connect(self.slot_pedalboardExport)
+        self.ui.act_pedalboard_export_library.triggered.connect(self.slot_pedalboardExportLibrary)
+        self.ui.act_pedalboard_compact.triggered.connect(self.slot_pedalboardCompact)
         self.ui.act_pedalboard_share.triggered.connect(self.slot_pedalboardShare)
 
         self.ui.act_settings_configure.triggered.connect(self.slot_configure)
@@ -364,6 +925,9 @@ class HostWindow(QMainWindow):
         self.setProperWindowTitle()
         SESSION.setupApp(self._pedal_changed_callback)
 
+        # the webserver takes a while to start, have the static files ready by then
+        self.fStaticAssetCache.warm()
+
         if not "--no-autostart" in sys.argv:
             QTimer.singleShot(0, self.slot_backendStart)
 
@@ -384,16 +948,31 @@ class HostWindow(QMainWindow):
 
     @pyqtSlot()
     def slot_fileRefresh(self):
-        if self.fWebFrame is None:
+        if self.fWebFrame is None or self.fRefreshing:
             return
 
+        # not a new load, the backend, journal and background jobs are left as they are
+        self.fRefreshing = True
+        self.ui.webview.loadFinished.connect(self.slot_webviewRefreshFinished)
+
         self.ui.label_progress.setText(self.tr("Refreshing UI..."))
         self.ui.stackedwidget.setCurrentIndex(0)
+
+        # soft refresh, static files come from the asset cache so only dynamic resources hit the webserver
+        self.fLoadTimer.start()
         QTimer.singleShot(0, self.ui.webview.reload)
 
     @pyqtSlot()
     def slot_fileInspect(self):
-        self.ui.webinspector.show()
+        self.getWebInspector().show()
+
+    def getWebInspector(self):
+        if self.ui.webinspector is None:
+            self.ui.webinspector = QWebInspector(None)
+            self.ui.webinspector.resize(800, 600)
+            self.ui.webinspector.setPage(self.ui.webpage)
+
+        return self.ui.webinspector
 
     # --------------------------------------------------------------------------------------------------------
     # Pedalboard (menu actions)
@@ -413,15 +992,17 @@ class HostWindow(QMainWindow):
             return
 
         self.fWebFrame.evaluateJavaScript("desktop.reset()")
+        self.fJournal.reset()
 
     # --------------------------------------------------------------------------------------------------------
 
     @pyqtSlot()
     def slot_pedalboardOpen(self):
-        if len(self.fPedalboards) == 0:
+        if len(self.getPedalboards()) == 0:
             return QMessageBox.information(self, self.tr("information"), "No pedalboards found")
 
-        dialog = OpenPedalboardWindow(self, self.fPedalboards)
+        unreadable = self.fPluginUsage.getUnreadablePedalboards() if self.fPluginUsage.isLoaded() else ()
+        dialog = OpenPedalboardWindow(self, self.fPedalboardIndex, unreadable)
 
         if not dialog.exec_():
             return
@@ -439,12 +1020,13 @@ class HostWindow(QMainWindow):
         if self.fWebFrame is None:
             return
 
+        self.fSettings.setValue(MOD_KEY_PEDALBOARD_RECENT, self.fPedalboardIndex.markUsed(pedalboard))
         self.fWebFrame.evaluateJavaScript("desktop.loadPedalboard(\"%s\")" % bundle)
 
     def openPedalboardLater(self, filename):
         try:
             self.fNextBundle   = QFileInfo(filename).absoluteFilePath()
-            self.fCurrentTitle = get_pedalboard_info(self.fNextBundle)['name']
+            self.fCurrentTitle = getPedalboardInfo(self.fNextBundle, get_pedalboard_info)['name']
         except:
             self.fNextBundle   = ""
             self.fCurrentTitle = ""
@@ -456,7 +1038,16 @@ class HostWindow(QMainWindow):
         if self.fWebFrame is None:
             return
 
-        self.fWebFrame.evaluateJavaScript("desktop.saveCurrentPedalboard(%s)" % ("true" if saveAs else "false"))
+        if not self.fSaver.save(saveAs):
+            self.statusBar().showMessage(self.tr("Still saving the pedalboard, please wait"), 3000)
+
+    @pyqtSlot(bool, int, str)
+    def slot_pedalboardSaveFinished(self, ok, duration, message):
+        if ok:
+            self.statusBar().showMessage(self.tr("Pedalboard saved (%i ms)") % duration, 5000)
+            self.fJournal.reset(message or self.fJournal.getBundle())
+        else:
+            self.statusBar().showMessage(self.tr("Saving the pedalboard failed: %s") % message, 10000)
 
     @pyqtSlot()
     def slot_pedalboardSaveAs(self):
@@ -471,6 +1062,184 @@ class HostWindow(QMainWindow):
 
         self.fWebFrame.evaluateJavaScript("desktop.shareCurrentPedalboard()")
 
+    # --------------------------------------------------------------------------------------------------------
+
+    @pyqtSlot()
+    def slot_pedalboardImport(self):
+        filenames, ok = QFileDialog.getOpenFileNames(self, self.tr("Import Pedalboards"),
+                                                     self.fSettings.value(MOD_KEY_MAIN_PROJECT_FOLDER),
+                                                     self.tr(ARCHIVE_FILTER))
+        if not filenames:
+            return
+
+        self.startArchiveJob(self.tr("Import Pedalboards"), importArchives, filenames,
+                             os.path.expanduser("~/.pedalboards"))
+
+    @pyqtSlot()
+    def slot_pedalboardExport(self):
+        bundle = self.fJournal.getBundle()
+
+        if not bundle or not os.path.isdir(bundle):
+            return QMessageBox.information(self, self.tr("information"),
+                                           self.tr("The pedalboard needs to be saved before it can be exported"))
+
+        name = os.path.basename(os.path.normpath(bundle)).replace(".pedalboard", ".zip")
+
+        filename, ok = QFileDialog.getSaveFileName(self, self.tr("Export Pedalboard"),
+                                                   os.path.join(self.fSettings.value(MOD_KEY_MAIN_PROJECT_FOLDER), name),
+                                                   self.tr(ARCHIVE_FILTER))
+        if not filename:
+            return
+
+        if not isArchiveFile(filename):
+            filename += ".zip"
+
+        # as last saved
+        self.startArchiveJob(self.tr("Export Pedalboard"), exportBundles, [bundle], filename)
+
+    @pyqtSlot()
+    def slot_pedalboardExportLibrary(self):
+        bundles = [pedalboard['bundle'] for pedalboard in self.getPedalboards()]
+
+        if len(bundles) == 0:
+            return QMessageBox.information(self, self.tr("information"), "No pedalboards found")
+
+        directory = QFileDialog.getExistingDirectory(self, self.tr("Export Pedalboard Library"),
+                                                     self.fSettings.value(MOD_KEY_MAIN_PROJECT_FOLDER),
+                                                     QFileDialog.ShowDirsOnly)
+        if not directory:
+            return
+
+        # an archive per pedalboard, written in parallel
+        self.startArchiveJob(self.tr("Export Pedalboard Library"), exportBundlesToDirectory, bundles, directory, ".zip")
+
+    def startArchiveJob(self, title, job, *args):
+        if self.fArchiveThread.isRunning():
+            self.statusBar().showMessage(self.tr("Another export or import is still running"), 3000)
+            return
+
+        self.fArchiveDialog = QProgressDialog(title + "...", self.tr("Cancel"), 0, 1000, self)
+        self.fArchiveDialog.setWindowTitle(title)
+        self.fArchiveDialog.setWindowModality(Qt.WindowModal)
+        self.fArchiveDialog.setAutoClose(False)
+        self.fArchiveDialog.setAutoReset(False)
+        self.fArchiveDialog.setMinimumDuration(500)
+        self.fArchiveDialog.canceled.connect(self.fArchiveThread.abort)
+
+        self.fArchiveThread.startJob(title, job, *args)
+        self.fScheduler.addTask("archive", 200, self.updateArchiveProgress)
+        self.fVisibilityThrottler.addForegroundTask("archive")
+
+    def updateArchiveProgress(self):
+        if self.fArchiveDialog is None:
+            return
+
+        done, total, elapsed, rate = self.fArchiveThread.getProgress().getStats()
+
+        self.fArchiveDialog.setValue(int(done * 1000 / total) if total > 0 else 0)
+        self.fArchiveDialog.setLabelText(self.tr("%s of %s (%s/s)") % (formatSize(done), formatSize(total), formatSize(rate)))
+
+    @pyqtSlot()
+    def slot_archiveFinished(self):
+        self.fScheduler.removeTask("archive")
+
+        if self.fArchiveDialog is not None:
+            self.fArchiveDialog.close()
+            self.fArchiveDialog.deleteLater()
+            self.fArchiveDialog = None
+
+        results = self.fArchiveThread.getResults()
+        error   = self.fArchiveThread.getError()
+        failed  = [result for result in results if result['status'] in (ARCHIVE_CORRUPT, ARCHIVE_FAILED)]
+        checked = [result for result in results if result['status'] == ARCHIVE_UNVERIFIED]
+
+        done, total, elapsed, rate = self.fArchiveThread.getProgress().getStats()
+
+        lines = [self.tr("%i of %i pedalboards done, %s in %.1f s (%s/s).") % (len(results) - len(failed), len(results),
+                                                                            formatSize(done), elapsed, formatSize(rate))]
+
+        if len(checked) > 0:
+            lines.append(self.tr("%i had no checksums to verify.") % len(checked))
+        if len(failed) > 0:
+            lines.append(self.tr("%i failed.") % len(failed))
+        if error:
+            lines.append(error)
+
+        icon = QMessageBox.Warning if failed or error else QMessageBox.Information
+        box  = QMessageBox(icon, self.fArchiveThread.getTitle(), "\n".join(lines), QMessageBox.Ok, self)
+        if len(failed) > 0:
+            box.setDetailedText("\n".join("%s: %s, %s" % (result['name'], result['status'], result['error'])
+                                          for result in failed))
+        box.exec_()
+
+        # new pedalboards show up in the lists
+        if len(results) > len(failed) and self.fArchiveThread.getJob() is importArchives:
+            self.slot_pedalboardRescan()
+
+    # --------------------------------------------------------------------------------------------------------
+
+    @pyqtSlot()
+    def slot_pedalboardCompact(self):
+        self.startCompaction(True)
+
+    def startCompaction(self, interactive):
+        if self.fDedupThread.isRunning():
+            # report once done
+            self.fDedupInteractive = self.fDedupInteractive or interactive
+            return
+
+        bundles = [pedalboard['bundle'] for pedalboard in self.getPedalboards()]
+        bundles = bundles + [bundle for bundle in findPedalboardBundles() if bundle not in bundles]
+
+        # mod-ui may write to the current pedalboard at any time
+        self.fDedupInteractive = interactive
+        self.fDedupThread.setBundles(bundles, [self.fJournal.getBundle()])
+        self.fDedupThread.start(QThread.IdlePriority)
+
+        if interactive:
+            self.statusBar().showMessage(self.tr("Compacting the pedalboard library..."))
+
+    @pyqtSlot()
+    def slot_compactionFinished(self):
+        report = self.fDedupThread.getReport()
+
+        if report is None:
+            return
+
+        lines = formatReport(report)
+        print("pedalboard library compacted:", "; ".join(lines))
+
+        if not self.fDedupInteractive:
+            return
+
+        self.fDedupInteractive = False
+        self.statusBar().clearMessage()
+
+        icon = QMessageBox.Warning if report['errors'] else QMessageBox.Information
+        box  = QMessageBox(icon, self.tr("Compact Library"), "\n".join(lines), QMessageBox.Ok, self)
+        if report['errors']:
+            box.setDetailedText("\n".join(report['errors']))
+        box.exec_()
+
+    # Shared files have to be copied before mod-ui writes to a bundle
+    @pyqtSlot(str)
+    def slot_unshareBundle(self, bundle):
+        if not bundle or not os.path.isdir(bundle):
+            return
+
+        # it could link them again right after
+        if self.fDedupThread.isRunning():
+            self.fDedupThread.stopWait()
+
+        count = unshareBundle(bundle)
+
+        if count > 0:
+            print("unshared %i files of %s" % (count, bundle))
+
+    @pyqtSlot()
+    def slot_unsharePedalboard(self):
+        self.slot_unshareBundle(self.fJournal.getBundle())
+
     # --------------------------------------------------------------------------------------------------------
     # Presets (menu actions)
 
@@ -483,11 +1252,9 @@ class HostWindow(QMainWindow):
 
     @pyqtSlot()
     def slot_configure(self):
+        # changes are applied through slot_settingChanged
         dialog = SettingsWindow(self, True)
-        if not dialog.exec_():
-            return
-
-        self.loadSettings(False)
+        dialog.exec_()
 
     # --------------------------------------------------------------------------------------------------------
     # About (menu actions)
@@ -519,41 +1286,199 @@ class HostWindow(QMainWindow):
 
     @pyqtSlot()
     def slot_backendInformation(self):
+        stats = self.fVisibilityThrottler.getStats()
         table = """
         <table><tr>
         <td> MOD-UI port:     <td></td> %s </td>
+        </tr><tr>
+        <td> Last backend start: <td></td> %s </td>
+        </tr><tr>
+        <td> CPU while visible: <td></td> %.1f%% (%i s) </td>
+        </tr><tr>
+        <td> CPU while hidden:  <td></td> %.1f%% (%i s) </td>
+        </tr><tr>
+        <td> CPU saved per hidden hour: <td></td> %.1f s </td>
+        </tr><tr>
+        <td> DSP load: <td></td> %s </td>
+        </tr><tr>
+        <td> Backend scheduling: <td></td> %s </td>
+        </tr><tr>
+        <td> Interface scheduling: <td></td> %s </td>
+        </tr><tr>
+        <td> Memory%s: <td></td> %s </td>
         </tr></table>
-        """ % (config["port"],)
+        """ % (config["port"],
+               ", ".join("%s %i ms" % event for event in self.fLifecycleEvents) or "-",
+               stats['visible_cpu'] * 100, stats['visible_time'],
+               stats['hidden_cpu'] * 100, stats['hidden_time'],
+               stats['saved_per_hour'],
+               "<br>".join(self.getDspReport()),
+               "<br>".join(self.fSchedulingReport['backend']),
+               "<br>".join(self.fSchedulingReport['interface']),
+               " (low-memory mode)" if self.fLowMemory else "",
+               "<br>".join(self.getMemoryReport()))
         QMessageBox.information(self, self.tr("information"), table)
 
+    @pyqtSlot()
+    def slot_backendMissingPlugins(self):
+        titles    = dict((pedalboard['bundle'], pedalboard['title']) for pedalboard in self.getPedalboards())
+        installed = [plugin['uri'] for plugin in get_all_plugins()]
+        missing   = self.fPluginUsage.getMissingPlugins(installed)
+        broken    = self.fPluginUsage.getUnreadablePedalboards()
+
+        if len(missing) == 0 and len(broken) == 0:
+            text = self.tr("All %i pedalboards have their plugins installed.") % len(titles)
+        else:
+            text = self.tr("%i of %i pedalboards can't be loaded because of missing plugins.") % (len(missing), len(titles))
+
+            if len(broken) > 0:
+                text += "\n" + self.tr("%i pedalboards could not be read.") % len(broken)
+
+        if self.fPluginUsageThread.isRunning():
+            text += "\n\n" + self.tr("Pedalboards are still being checked, this report may be incomplete.")
+
+        details = []
+
+        for bundle, uris in sorted(missing.items(), key=lambda item: titles.get(item[0], item[0]).lower()):
+            details.append("%s (%s)" % (titles.get(bundle, os.path.basename(bundle)), bundle))
+            details.extend("    %s" % uri for uri in uris)
+
+        if len(broken) > 0:
+            details.append("")
+            details.append(self.tr("Could not be read:"))
+            details.extend("    %s" % bundle for bundle in broken)
+
+        box = QMessageBox(QMessageBox.Information, self.tr("Missing Plugins"), text, QMessageBox.Ok, self)
+        if len(details) > 0:
+            box.setDetailedText("\n".join(details))
+        box.exec_()
+
+    @pyqtSlot()
+    def slot_backendStalls(self):
+        stalls = self.fLagMonitor.getStalls()
+
+        # so there's a file to attach to bug reports, even if no stall has ended yet
+        self.fLagMonitor.dump()
+
+        lines = [self.tr("%s loop: %i ms lag now, %i ms at most, %i stalls") % stats
+                 for stats in self.fLagMonitor.getLoopStats()]
+
+        if len(stalls) == 0:
+            lines.append(self.tr("No stalls recorded."))
+        else:
+            lines.append(self.tr("The last %i stalls are saved in %s") % (len(stalls), self.fLagMonitor.getDumpFile()))
+
+        box = QMessageBox(QMessageBox.Information, self.tr("Stall Report"), "\n".join(lines), QMessageBox.Ok, self)
+        if len(stalls) > 0:
+            box.setDetailedText(self.fLagMonitor.formatReport())
+        box.exec_()
+
+    @pyqtSlot()
+    def slot_pluginUsageUpdated(self):
+        if self.fPedalboards is None:
+            return
+
+        # searching by plugin URI becomes possible
+        self.setPedalboardPlugins()
+
+    @pyqtSlot(str)
+    def slot_thumbnailUpdated(self, bundle):
+        if self.fPedalboards is None:
+            return
+
+        for pedalboard in self.fPedalboards:
+            if pedalboard['bundle'] == bundle:
+                return
+
+        # mod-ui skipped this one for not having a thumbnail before
+        self.fPedalboardRescanTimer.start()
+
+    @pyqtSlot()
+    def slot_pedalboardRescan(self):
+        self.fPedalboards = None
+        self.getPedalboards()
+
+    def getPedalboards(self):
+        if self.fPedalboards is None:
+            self.fPedalboards = get_all_pedalboards()
+            self.setPedalboardPlugins()
+
+        return self.fPedalboards
+
+    def setPedalboardPlugins(self):
+        # only if already in memory, in low-memory mode the plugin index is not loaded just for searching
+        if self.fPluginUsage.isLoaded():
+            for pedalboard in self.fPedalboards:
+                pedalboard['plugins'] = self.fPluginUsage.getPluginURIs(pedalboard['bundle'])
+
+        self.fPedalboardIndex.setPedalboards(self.fPedalboards)
+
     @pyqtSlot()
     def slot_backendStart(self):
-        if self.fProccessBackend.state() != QProcess.NotRunning:
+        if self.fProccessBackend.state() != QProcess.NotRunning or self.fJack.isRunning():
             print("slot_backendStart ignored")
             return
 
         print("slot_backendStart in progress...")
 
-        if USING_LIVE_ISO:
-            os.system("jack_wait -w")
-            os.system("jack_load mod-monitor")
+        self.fLifecycleTimer.start()
+        self.fLifecycleEvents = []
+        self.markLifecycle("start")
+
+        # JACK needs to be up first, the backend is started once it is (see slot_jackReady)
+        if USING_LIVE_ISO or MOD_APP_JACKD:
+            self.ui.act_backend_start.setEnabled(False)
+            self.ui.act_backend_stop.setEnabled(True)
+            self.ui.w_buttons.setEnabled(False)
+            self.fJack.start(["mod-monitor"] if USING_LIVE_ISO else [])
+            return
+
+        self.startBackendProcess()
 
+    def startBackendProcess(self):
+        if USING_LIVE_ISO:
             hostPath = "jack_load"
             hostArgs = ["-w", "-a", "mod-host"]
 
         else:
-            hostPath = self.fSavedSettings[MOD_KEY_HOST_PATH]
+            hostPath = MOD_APP_HOST_PATH or self.fSettings.value(MOD_KEY_HOST_PATH)
             if hostPath.endswith("ingen"):
                 hostPath = MOD_DEFAULT_HOST_PATH
 
             hostArgs = ["-p", "5555", "-f", "5556"]
-            if self.fSavedSettings[MOD_KEY_HOST_VERBOSE]:
+            if self.fSettings.value(MOD_KEY_HOST_VERBOSE):
                 hostArgs.append("-v")
             else:
                 hostArgs.append("-n")
 
         self.fProccessBackend.start(hostPath, hostArgs)
 
+    @pyqtSlot()
+    def slot_jackReady(self):
+        self.markLifecycle("jack")
+        self.startBackendProcess()
+
+    @pyqtSlot(str)
+    def slot_jackFailed(self, error):
+        self.markLifecycle("jack-failed")
+
+        firstBackendInit = self.fFirstBackendInit
+        self.fFirstBackendInit = False
+
+        self.ui.act_backend_start.setEnabled(True)
+        self.ui.act_backend_stop.setEnabled(False)
+        self.ui.w_buttons.setEnabled(True)
+        self.ui.label_progress.setText(error)
+
+        errorStr = self.tr("Could not start host backend.\n") + error
+        qWarning(errorStr)
+
+        # same as backend errors, no dialog at first start or on the live ISO
+        if firstBackendInit or USING_LIVE_ISO:
+            return
+
+        QMessageBox.critical(self, self.tr("Error"), errorStr)
+
     @pyqtSlot()
     def slot_backendStop(self):
         #if self.fPluginCount > 0:
@@ -573,9 +1498,21 @@ class HostWindow(QMainWindow):
         self.ui.webview.setHtml("<html><body bgcolor='green'></body></html>")
         self.ui.webview.blockSignals(False)
 
+        self.markLifecycle("stop")
+
+        # still waiting for JACK, the backend was never started
+        if self.fJack.isRunning():
+            self.fJack.abort()
+            self.ui.act_backend_start.setEnabled(True)
+            self.ui.act_backend_stop.setEnabled(False)
+            self.ui.w_buttons.setEnabled(True)
+            self.ui.label_progress.setText("")
+
         self.stopAndWaitForWebServer()
         self.stopAndWaitForBackend()
 
+        self.markLifecycle("stopped")
+
     @pyqtSlot()
     def slot_backendRestart(self):
         self.slot_backendStop()
@@ -585,6 +1522,11 @@ class HostWindow(QMainWindow):
 
     @pyqtSlot()
     def slot_backendStarted(self):
+        self.markLifecycle("process")
+
+        # as early as possible, so the threads created while starting up inherit it
+        self.applyBackendScheduling(False)
+
         self.ui.act_backend_start.setEnabled(False)
         self.ui.act_backend_stop.setEnabled(True)
         self.ui.act_backend_restart.setEnabled(True)
@@ -593,6 +1535,17 @@ class HostWindow(QMainWindow):
 
     @pyqtSlot(int, QProcess.ExitStatus)
     def slot_backendFinished(self, exitCode, exitStatus):
+        self.markLifecycle("crashed" if exitStatus == QProcess.CrashExit and not self.fStoppingBackend else "finished")
+
+        # nothing to render or save with without a webserver
+        self.fThumbnailQueue.setPaused(True)
+        self.fSaver.setFrame(None)
+        self.stopDspMonitor()
+
+        # the backend's state is gone, offer to restore it once the UI is back
+        self.fJournalBridge.setEnabled(False)
+        self.fJournalRecover = self.fJournal.hasChanges()
+
         self.fFirstBackendInit = False
         self.fStoppingBackend = False
         self.ui.act_backend_start.setEnabled(True)
@@ -607,6 +1560,10 @@ class HostWindow(QMainWindow):
 
     @pyqtSlot(QProcess.ProcessError)
     def slot_backendError(self, error):
+        self.markLifecycle("error")
+        self.fThumbnailQueue.setPaused(True)
+        self.stopDspMonitor()
+
         firstBackendInit = self.fFirstBackendInit
         self.fFirstBackendInit = False
 
@@ -637,10 +1594,12 @@ class HostWindow(QMainWindow):
             if not line:
                 continue
 
-            if self.fSavedSettings[MOD_KEY_HOST_VERBOSE]:
+            if self.fSettings.value(MOD_KEY_HOST_VERBOSE):
                 print("BACKEND:", line)
 
             if line == "mod-host ready!" or line == "mod-host is running.":
+                self.markLifecycle("ready")
+                self.applyBackendScheduling(True)
                 QTimer.singleShot(0, self.slot_backendStartPhase2)
             #elif "Listening on socket " in line:
                 #QTimer.singleShot(1000, self.slot_ingenStarted)
@@ -655,14 +1614,26 @@ class HostWindow(QMainWindow):
         if self.fProccessBackend.state() == QProcess.NotRunning:
             return
 
-        if not self.fNeedsSessionReconnect:
-            # we'll need it for next time
-            self.fNeedsSessionReconnect = True
+        # JACK is surely running by now
+        self.startDspMonitor()
+
+        if self.fWebServerIntegrated is not None:
+            self.fWebServer = self.fWebServerIntegrated
+        elif self.fSettings.value(MOD_KEY_HOST_WEBSERVER_PROCESS) and WEBSERVER_PROCESS_SUPPORTED:
+            self.fWebServer = self.fWebServerProcess
         else:
-            # we need it now
-            SESSION.reconnectApp()
+            self.fWebServer = self.fWebServerThread
+
+        # a new process every time has a new session, the others reuse ours
+        if self.fWebServer is not self.fWebServerProcess:
+            if not self.fNeedsSessionReconnect:
+                # we'll need it for next time
+                self.fNeedsSessionReconnect = True
+            else:
+                # we need it now
+                SESSION.reconnectApp()
 
-        self.fWebServerThread.start()
+        self.fWebServer.start()
 
     @pyqtSlot()
     def slot_backendStartError(self):
@@ -679,6 +1650,8 @@ class HostWindow(QMainWindow):
         self.ui.webview.loadFinished.connect(self.slot_webviewLoadFinished)
 
         print("webserver running with URL:", config["addr"])
+        self.markLifecycle("webserver")
+        self.fLoadTimer.start()
         self.ui.webview.load(QUrl(config["addr"]))
 
     @pyqtSlot()
@@ -690,6 +1663,10 @@ class HostWindow(QMainWindow):
         except:
             pass
 
+        if self.fRefreshing:
+            self.fRefreshing = False
+            self.ui.webview.loadFinished.disconnect(self.slot_webviewRefreshFinished)
+
         print("webserver finished")
         # testing red color for server finished
         self.ui.webview.blockSignals(True)
@@ -716,7 +1693,12 @@ class HostWindow(QMainWindow):
 
         if ok:
             # message
-            self.ui.label_progress.setText(self.tr("Loading UI... finished!"))
+            loadTime = self.fLoadTimer.elapsed() if self.fLoadTimer.isValid() else 0
+            self.ui.label_progress.setText(self.tr("Loading UI... finished! (%i ms)") % loadTime)
+            self.statusBar().showMessage(self.tr("UI loaded in %i ms (%i static files cached)") % (loadTime,
+                                                                                                 self.fStaticAssetCache.getFileCount()), 5000)
+            print("UI loaded in %i ms" % loadTime)
+            self.markLifecycle("ui")
 
             # enable file menu
             self.ui.act_file_refresh.setEnabled(True)
@@ -724,6 +1706,7 @@ class HostWindow(QMainWindow):
 
             # for js evaulation
             self.fWebFrame = self.ui.webpage.currentFrame()
+            self.fSaver.setFrame(self.fWebFrame)
 
             # postpone app stuff
             QTimer.singleShot(100, self.slot_webviewPostFinished)
@@ -731,6 +1714,7 @@ class HostWindow(QMainWindow):
         else:
             # message
             self.ui.label_progress.setText(self.tr("Loading UI... failed!"))
+            self.markLifecycle("ui-failed")
 
             # disable file menu
             self.ui.act_file_refresh.setEnabled(False)
@@ -746,6 +1730,7 @@ class HostWindow(QMainWindow):
 
             # stop js evaulation
             self.fWebFrame = None
+            self.fSaver.setFrame(None)
 
             # stop backend&server
             self.stopAndWaitForWebServer()
@@ -753,6 +1738,21 @@ class HostWindow(QMainWindow):
 
         print("load finished")
 
+    @pyqtSlot(bool)
+    def slot_webviewRefreshFinished(self, ok):
+        self.ui.webview.loadFinished.disconnect(self.slot_webviewRefreshFinished)
+        self.fRefreshing = False
+
+        if not ok:
+            self.ui.label_progress.setText(self.tr("Refreshing UI... failed!"))
+            return
+
+        loadTime = self.fLoadTimer.elapsed() if self.fLoadTimer.isValid() else 0
+        self.ui.label_progress.setText(self.tr("Refreshing UI... finished! (%i ms)") % loadTime)
+        self.statusBar().showMessage(self.tr("UI refreshed in %i ms (%i static files cached)") % (loadTime,
+                                                                                                self.fStaticAssetCache.getFileCount()), 5000)
+        self.ui.stackedwidget.setCurrentIndex(1)
+
     @pyqtSlot()
     def slot_webviewPostFinished(self):
         if self.fNextBundle:
@@ -766,6 +1766,270 @@ class HostWindow(QMainWindow):
     def slot_webviewPostFinished2(self):
         self.ui.stackedwidget.setCurrentIndex(1)
 
+        # the UI is ready, loading it shouldn't count towards the visible CPU baseline
+        self.fVisibilityThrottler.resetStats()
+
+        if not self.fLowMemory:
+            self.startBackgroundJobs()
+
+        self.checkJournalRecovery()
+
+    def startBackgroundJobs(self):
+        bundles = [pedalboard['bundle'] for pedalboard in self.getPedalboards()]
+
+        # now there's time to check pedalboards for plugin usage
+        if not self.fPluginUsageThread.isRunning():
+            self.fPluginUsageThread.setBundles(bundles)
+            self.fPluginUsageThread.start(QThread.LowPriority)
+
+        # and to fill in missing pedalboard images, including bundles mod-ui didn't list because of that
+        self.fThumbnailQueue.addBundles(bundles + findPedalboardBundles())
+        self.fThumbnailQueue.setPaused(False)
+
+        if self.fSettings.value(MOD_KEY_PEDALBOARD_DEDUPLICATE):
+            self.startCompaction(False)
+
+    @pyqtSlot()
+    def slot_webviewWindowObjectCleared(self):
+        frame = self.ui.webpage.mainFrame()
+        frame.addToJavaScriptWindowObject("modAppJournal", self.fJournalBridge)
+        frame.evaluateJavaScript(JS_JOURNAL_HOOK)
+
+    @pyqtSlot(int, QNetworkReply)
+    def slot_webRequestCreated(self, op, reply):
+        # the webserver and the page have work to do
+        self.fLagMonitor.noteActivity()
+
+        if reply.url().path().rstrip("/") != "/pedalboard/load_bundle":
+            return
+
+        # xruns right after this are blamed on the pedalboard switch
+        self.fDspMonitor.markSwitch()
+
+        # restoring, the journal is replayed on top of the freshly loaded pedalboard
+        if self.fJournalReplay is not None:
+            reply.finished.connect(self.slot_journalReplay)
+
+    @pyqtSlot()
+    def slot_journalReplay(self):
+        replay = self.fJournalReplay
+        self.fJournalReplay = None
+
+        if replay is None or self.fWebFrame is None:
+            return
+
+        # the replayed edits go into the journal again through the page hooks
+        self.fWebFrame.evaluateJavaScript(JS_JOURNAL_REPLAY % json.dumps(replay))
+        self.statusBar().showMessage(self.tr("Restored %i changes to the pedalboard") % len(replay), 5000)
+
+    # --------------------------------------------------------------------------------------------------------
+    # Journal
+
+    def checkJournalRecovery(self):
+        recover = self.fJournalRecover and self.fJournal.hasChanges()
+        self.fJournalRecover = False
+
+        if recover:
+            if USING_LIVE_ISO:
+                restore = True
+            else:
+                restore = (QMessageBox.question(self,
+                                                self.tr("Restore Pedalboard"),
+                                                self.tr("The last session ended without saving, %i changes to the pedalboard "
+                                                        "can be restored.\nDo you want to restore them?") % self.fJournal.getChangeCount(),
+                                                QMessageBox.Yes|QMessageBox.No, QMessageBox.Yes) == QMessageBox.Yes)
+
+            if restore:
+                self.restoreFromJournal()
+                return
+
+        bundle = self.fWebFrame.evaluateJavaScript("(window.desktop && desktop.pedalboardBundle) || ''")
+        self.fJournal.reset(bundle or "")
+        self.fJournalBridge.setEnabled(True)
+
+    def restoreFromJournal(self):
+        bundle = self.fJournal.getBundle()
+
+        self.fJournalReplay = self.fJournal.getReplay()
+        self.fJournal.reset(bundle)
+        self.fJournalBridge.setEnabled(True)
+
+        if bundle:
+            self.fWebFrame.evaluateJavaScript("desktop.loadPedalboard(\"%s\")" % bundle)
+        else:
+            QTimer.singleShot(0, self.slot_journalReplay)
+
+    # --------------------------------------------------------------------------------------------------------
+    # DSP
+
+    def startDspMonitor(self):
+        if not self.fDspMonitor.start():
+            return
+
+        self.fScheduler.addTask("dsp", DSP_SAMPLE_INTERVAL, self.fDspMonitor.sample)
+        self.fVisibilityThrottler.addForegroundTask("dsp")
+        self.slot_dspUpdated()
+        self.ui.dspmeter.show()
+
+    def stopDspMonitor(self):
+        self.fScheduler.removeTask("dsp")
+        self.fDspMonitor.stop()
+        self.ui.dspmeter.hide()
+
+    @pyqtSlot()
+    def slot_dspUpdated(self):
+        if not self.fDspMonitor.isRunning():
+            self.stopDspMonitor()
+            return
+
+        load   = self.fDspMonitor.getLoad()
+        xruns  = self.fDspMonitor.getRecentXrunCount()
+        meter  = self.ui.dspmeter
+
+        meter.setValue(int(min(load, 100.0)))
+        meter.setFormat(self.tr("DSP %i%%, %i xruns") % (load, xruns) if xruns else self.tr("DSP %i%%") % load)
+        meter.setToolTip("<br>".join(self.getDspReport()))
+
+        warning = load >= DSP_LOAD_WARNING or xruns > 0
+        if warning != meter.property("warning"):
+            meter.setProperty("warning", warning)
+            meter.setStyleSheet("QProgressBar::chunk { background-color: #c0392b; }" if warning else "")
+
+    @pyqtSlot(int)
+    def slot_dspSwitchXruns(self, xruns):
+        title = self.fCurrentTitle or self.tr("Untitled")
+
+        self.fDspSwitches.append((title, xruns))
+        del self.fDspSwitches[:-10]
+
+        self.statusBar().showMessage(self.tr("Loading \"%s\" caused %i xruns") % (title, xruns), 10000)
+
+    def getDspReport(self):
+        if not self.fDspMonitor.isRunning():
+            return ["-"]
+
+        lines = ["%.1f%% now, %.1f%% peak over the last 2 minutes" % (self.fDspMonitor.getLoad(),
+                                                                      self.fDspMonitor.getPeakLoad())]
+
+        sampleRate, bufferSize = self.fDspMonitor.getEngineInfo()
+        lines.append("%i Hz, %i frames" % (sampleRate, bufferSize))
+        lines.append("xruns: %i recently, %i in total" % (self.fDspMonitor.getRecentXrunCount(),
+                                                           self.fDspMonitor.getXrunCount()))
+
+        for title, xruns in reversed(self.fDspSwitches):
+            lines.append("loading %s: %i xruns" % (title, xruns))
+
+        return lines
+
+    # --------------------------------------------------------------------------------------------------------
+    # Scheduling
+
+    def getBackendCpus(self):
+        return parseCpuList(self.fSettings.value(MOD_KEY_HOST_CPUS)) or set()
+
+    # Pin the backend to its CPUs and set its priorities. Done when it starts and again once it's ready, as the
+    # JACK client threads only exist by then, which is also when the result is verified.
+    def applyBackendScheduling(self, verify):
+        if not SCHED_SUPPORTED or self.fProccessBackend.state() == QProcess.NotRunning:
+            return
+
+        if USING_LIVE_ISO:
+            self.fSchedulingReport['backend'] = ["runs inside the JACK server, left alone"]
+            return
+
+        # all CPUs when not set, so clearing the setting also unpins a running backend
+        cpus   = self.getBackendCpus() or set(ALL_CPUS)
+        nice   = self.fSettings.value(MOD_KEY_HOST_NICE) or None
+        rtprio = self.fSettings.value(MOD_KEY_HOST_REALTIME_PRIORITY)
+        pid    = self.fProccessBackend.pid() if using_Qt4 else self.fProccessBackend.processId()
+
+        ok, lines = applyScheduling(pid, cpus, nice, rtprio)
+
+        if not verify:
+            return
+
+        verified, report = verifyScheduling(pid, cpus, nice, rtprio)
+
+        self.fSchedulingReport['backend'] = report + lines
+
+        for line in report + lines:
+            print("backend scheduling:", line)
+
+        if not (ok and verified):
+            self.statusBar().showMessage(self.tr("Backend scheduling settings could not be fully applied, "
+                                                 "see Backend Information"), 10000)
+
+    # Keep the GUI, webserver and WebKit threads off the backend CPUs
+    def applyGuiScheduling(self):
+        if not SCHED_SUPPORTED:
+            return
+
+        backendCpus = self.getBackendCpus()
+        cpus        = set(ALL_CPUS)
+        lines       = []
+
+        if self.fSettings.value(MOD_KEY_HOST_ISOLATE_GUI) and len(backendCpus) > 0:
+            if len(ALL_CPUS - backendCpus) > 0:
+                cpus = ALL_CPUS - backendCpus
+            else:
+                lines.append("the backend uses all CPUs, not isolated")
+
+        applied = applyScheduling(os.getpid(), cpus, None, 0)[1]
+        report  = verifyScheduling(os.getpid(), cpus, None, 0)[1]
+
+        self.fSchedulingReport['interface'] = report + lines + applied
+
+        for line in lines + applied:
+            print("interface scheduling:", line)
+
+    # --------------------------------------------------------------------------------------------------------
+    # Memory
+
+    def checkMemoryPressure(self):
+        if not isMemoryUnderPressure():
+            return
+
+        # don't keep dropping things that are being read back in right away
+        if self.fMemoryReleaseTimer.isValid() and self.fMemoryReleaseTimer.elapsed() < 60000:
+            return
+
+        print("memory is low, releasing caches")
+        self.releaseMemory()
+
+    # Drop everything that can be recreated, for plugins to use
+    def releaseMemory(self):
+        self.fMemoryReleaseTimer.start()
+
+        QWebSettings.clearMemoryCaches()
+        QPixmapCache.clear()
+        self.fStaticAssetCache.clear()
+        self.fThumbnailQueue.releasePage()
+
+        if self.ui.webinspector is not None and not self.ui.webinspector.isVisible():
+            self.ui.webinspector.deleteLater()
+            self.ui.webinspector = None
+
+        # the pedalboard list and plugin index are read again when needed
+        self.fPedalboards = None
+        self.fPedalboardIndex.setPedalboards([])
+
+        if not self.fPluginUsageThread.isRunning():
+            self.fPluginUsage.unload()
+
+        gc.collect()
+
+    def getMemoryReport(self):
+        lines = ["%s: %s" % (name, formatSize(size)) for name, size in getRSSBreakdown()]
+
+        lines.append("of which static file cache: %s" % formatSize(self.fStaticAssetCache.getSize()))
+        lines.append("pedalboards in memory: %s" % ("-" if self.fPedalboards is None else len(self.fPedalboards)))
+
+        if self.fProccessBackend.state() != QProcess.NotRunning:
+            pid = self.fProccessBackend.pid() if using_Qt4 else self.fProccessBackend.processId()
+            lines.append("backend: %s" % formatSize(getProcessRSS(pid)))
+
+        return lines
+
     # --------------------------------------------------------------------------------------------------------
     # Settings
 
@@ -774,25 +2038,16 @@ class HostWindow(QMainWindow):
         settings.setValue("Geometry", self.saveGeometry())
 
     def loadSettings(self, firstTime):
-        qsettings   = QSettings()
-        websettings = self.ui.webview.settings()
-
-        self.fSavedSettings = {
-            # Main
-            MOD_KEY_MAIN_PROJECT_FOLDER:    qsettings.value(MOD_KEY_MAIN_PROJECT_FOLDER,    MOD_DEFAULT_MAIN_PROJECT_FOLDER,    type=str),
-            MOD_KEY_MAIN_REFRESH_INTERVAL:  qsettings.value(MOD_KEY_MAIN_REFRESH_INTERVAL,  MOD_DEFAULT_MAIN_REFRESH_INTERVAL,  type=int),
-            # Host
-            MOD_KEY_HOST_VERBOSE:           qsettings.value(MOD_KEY_HOST_VERBOSE,           MOD_DEFAULT_HOST_VERBOSE,           type=bool),
-            MOD_KEY_HOST_PATH:              qsettings.value(MOD_KEY_HOST_PATH,              MOD_DEFAULT_HOST_PATH,              type=str),
-            # WebView
-            MOD_KEY_WEBVIEW_INSPECTOR:      qsettings.value(MOD_KEY_WEBVIEW_INSPECTOR,      MOD_DEFAULT_WEBVIEW_INSPECTOR,      type=bool),
-            MOD_KEY_WEBVIEW_VERBOSE:        qsettings.value(MOD_KEY_WEBVIEW_VERBOSE,        MOD_DEFAULT_WEBVIEW_VERBOSE,        type=bool),
-            MOD_KEY_WEBVIEW_SHOW_INSPECTOR: qsettings.value(MOD_KEY_WEBVIEW_SHOW_INSPECTOR, MOD_DEFAULT_WEBVIEW_SHOW_INSPECTOR, type=bool)
-        }
+        qsettings = QSettings()
 
-        inspectorEnabled = self.fSavedSettings[MOD_KEY_WEBVIEW_INSPECTOR] and not USING_LIVE_ISO
-
-        websettings.setAttribute(QWebSettings.DeveloperExtrasEnabled, inspectorEnabled)
+        for key in (MOD_KEY_MAIN_LOW_MEMORY,
+                    MOD_KEY_MAIN_REFRESH_INTERVAL,
+                    MOD_KEY_MAIN_AUTOSAVE_DELAY,
+                    MOD_KEY_HOST_CPUS,
+                    MOD_KEY_WEBVIEW_INSPECTOR,
+                    MOD_KEY_WEBVIEW_DISK_CACHE,
+                    MOD_KEY_WEBVIEW_MEMORY_CACHE):
+            self.slot_settingChanged(key, self.fSettings.value(key))
 
         if firstTime:
             if qsettings.contains("Geometry"):
@@ -800,15 +2055,69 @@ class HostWindow(QMainWindow):
             else:
                 self.setWindowState(self.windowState() | Qt.WindowMaximized)
 
-            if inspectorEnabled and self.fSavedSettings[MOD_KEY_WEBVIEW_SHOW_INSPECTOR]:
-                QTimer.singleShot(1000, self.ui.webinspector.show)
+            if self.isInspectorEnabled() and self.fSettings.value(MOD_KEY_WEBVIEW_SHOW_INSPECTOR):
+                QTimer.singleShot(1000, self.slot_fileInspect)
+
+    @pyqtSlot(str, object)
+    def slot_settingChanged(self, key, value):
+        # Main
+        if key == MOD_KEY_MAIN_REFRESH_INTERVAL:
+            self.fScheduler.setResolution(value)
+
+        elif key == MOD_KEY_MAIN_AUTOSAVE_DELAY:
+            self.fSaver.setAutosaveDelay(value)
+
+        elif key == MOD_KEY_MAIN_LOW_MEMORY:
+            self.fLowMemory = value
+            self.slot_settingChanged(MOD_KEY_WEBVIEW_MEMORY_CACHE, self.fSettings.value(MOD_KEY_WEBVIEW_MEMORY_CACHE))
+
+            if value:
+                self.fThumbnailQueue.stop()
+                self.fPluginUsageThread.stopWait()
+                self.fDedupThread.stopWait()
+                self.releaseMemory()
+
+        # Host (verbose mode is read on every backend line, path on every start)
+        elif key in (MOD_KEY_HOST_CPUS, MOD_KEY_HOST_ISOLATE_GUI):
+            self.applyGuiScheduling()
+            self.applyBackendScheduling(True)
+
+        elif key in (MOD_KEY_HOST_NICE, MOD_KEY_HOST_REALTIME_PRIORITY):
+            self.applyBackendScheduling(True)
+
+        # WebView
+        elif key == MOD_KEY_WEBVIEW_INSPECTOR:
+            inspectorEnabled = self.isInspectorEnabled()
+            self.ui.webview.settings().setAttribute(QWebSettings.DeveloperExtrasEnabled, inspectorEnabled)
+            self.ui.act_file_inspect.setVisible(inspectorEnabled)
+
+            if not inspectorEnabled and self.ui.webinspector is not None:
+                self.ui.webinspector.hide()
 
-        self.ui.act_file_inspect.setVisible(inspectorEnabled)
+        elif key == MOD_KEY_WEBVIEW_VERBOSE:
+            if not USING_LIVE_ISO:
+                setWebServerVerbose(value)
+                self.fWebServerProcess.setVerbose(value)
 
-        if self.fIdleTimerId != 0:
-            self.killTimer(self.fIdleTimerId)
+        elif key == MOD_KEY_WEBVIEW_DISK_CACHE:
+            self.ui.webnetwork.setDiskCacheSize(value * 1024 * 1024)
 
-        self.fIdleTimerId = self.startTimer(self.fSavedSettings[MOD_KEY_MAIN_REFRESH_INTERVAL])
+        elif key == MOD_KEY_WEBVIEW_MEMORY_CACHE:
+            if self.fLowMemory:
+                value = min(value, LOW_MEMORY_WEB_CACHE)
+
+            # memory cache is split between WebKit's object cache and our static files
+            memoryCacheSize = value * 1024 * 1024
+            setWebMemoryCacheSize(memoryCacheSize // 2)
+            self.fStaticAssetCache.setMaximumSize(memoryCacheSize // 2)
+
+        # Pedalboards (shared files stay shared when turned off, they load the same)
+        elif key == MOD_KEY_PEDALBOARD_DEDUPLICATE:
+            if value and self.fWebFrame is not None and not self.fLowMemory:
+                self.startCompaction(False)
+
+    def isInspectorEnabled(self):
+        return self.fSettings.value(MOD_KEY_WEBVIEW_INSPECTOR) and not USING_LIVE_ISO
 
     # --------------------------------------------------------------------------------------------------------
     # Misc
@@ -827,25 +2136,30 @@ class HostWindow(QMainWindow):
     # Qt events
 
     def closeEvent(self, event):
-        if self.fIdleTimerId != 0:
-            self.killTimer(self.fIdleTimerId)
-            self.fIdleTimerId = 0
+        self.fScheduler.stop()
+        self.fThumbnailQueue.stop()
+        self.stopDspMonitor()
+        self.fLagMonitor.stop()
+        self.fPluginUsageThread.stopWait()
+        self.fArchiveThread.stopWait()
+        self.fDedupThread.stopWait()
+        self.fSettings.flush()
 
         self.saveSettings()
         self.slot_backendStop()
 
+        # closed cleanly, nothing to recover
+        self.fJournal.close()
+
+        # only if we started it
+        self.fJack.stopServer()
+
         QMainWindow.closeEvent(self, event)
 
         # Needed in case the web inspector is still alive
         #self.ui.webinspector.close()
         QApplication.instance().quit()
 
-    def timerEvent(self, event):
-        if event.timerId() == self.fIdleTimerId:
-            pass
-
-        QMainWindow.timerEvent(self, event)
-
     def resizeEvent(self, event):
         QMainWindow.resizeEvent(self, event)
         self.fixWebViewSize()
@@ -875,8 +2189,17 @@ class HostWindow(QMainWindow):
         self.ui.webview.resize(size)
         self.ui.webpage.setViewportSize(size)
 
+    # Record a backend lifecycle phase, printed in a fixed format so tests can parse it
+    def markLifecycle(self, phase):
+        if not self.fLifecycleTimer.isValid():
+            return
+
+        elapsed = self.fLifecycleTimer.elapsed()
+        self.fLifecycleEvents.append((phase, elapsed))
+        print("lifecycle: %s %i ms" % (phase, elapsed), flush=True)
+
     def stopAndWaitForBackend(self):
-        SESSION.host.close_jack()
+        self.fWebServer.closeJack()
 
         if self.fProccessBackend.state() == QProcess.NotRunning:
             return
@@ -888,12 +2211,12 @@ class HostWindow(QMainWindow):
             self.fProccessBackend.kill()
 
     def stopAndWaitForWebServer(self):
-        if not self.fWebServerThread.isRunning():
+        if not self.fWebServer.isRunning():
             return
 
-        if not self.fWebServerThread.stopWait():
-            qWarning("WebServer Thread failed top stop cleanly, forced terminate")
-            self.fWebServerThread.terminate()
+        if not self.fWebServer.stopWait():
+            qWarning("WebServer failed top stop cleanly, forced terminate")
+            self.fWebServer.terminate()
 
     def setProperWindowTitle(self):
         title = "MOD Application"
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QElapsedTimer, QObject, QProcess, QTimer
+
+# ------------------------------------------------------------------------------------------------------------
+
+# time for the JACK server to come up, and for loading each internal client (in s)
+JACK_WAIT_TIMEOUT = 30
+JACK_LOAD_TIMEOUT = 10
+
+# extra time given to the tools before they're killed, they have their own timeouts (in ms)
+JACK_TOOL_GRACE = 5000
+
+# ------------------------------------------------------------------------------------------------------------
+# JACK Manager
+# Gets a JACK server ready for the backend without blocking the GUI: checks if one is running, optionally starts
+# one, waits for it and then loads internal clients. Every step runs the JACK tools through QProcess and has a
+# timeout, and progress is reported through signals.
+
+class JackManager(QObject):
+    # signals
+    progress = pyqtSignal(str)
+    ready    = pyqtSignal()
+    failed   = pyqtSignal(str)
+
+    def __init__(self, parent):
+        QObject.__init__(self, parent)
+
+        self.fServerCommand = []
+        self.fWaitTimeout   = JACK_WAIT_TIMEOUT
+        self.fLoadTimeout   = JACK_LOAD_TIMEOUT
+        self.fClients       = []
+        self.fStep          = None
+        self.fServer        = None
+        self.fElapsed       = QElapsedTimer()
+
+        self.fProcess = QProcess(self)
+        self.fProcess.setProcessChannelMode(QProcess.MergedChannels)
+        self.fProcess.finished.connect(self.slot_processFinished)
+        self.fProcess.error.connect(self.slot_processError)
+
+        self.fTimeoutTimer = QTimer(self)
+        self.fTimeoutTimer.setSingleShot(True)
+        self.fTimeoutTimer.timeout.connect(self.slot_timeout)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Command line of a JACK server to start when none is running, empty to only wait for one
+    def setServerCommand(self, command):
+        self.fServerCommand = list(command)
+
+    def setTimeouts(self, waitTimeout, loadTimeout):
+        self.fWaitTimeout = waitTimeout
+        self.fLoadTimeout = loadTimeout
+
+    def isRunning(self):
+        return self.fStep is not None
+
+    # Time since start() in ms
+    def getElapsed(self):
+        return self.fElapsed.elapsed() if self.fElapsed.isValid() else 0
+
+    # Start getting JACK ready, loading the internal @a clients once it is
+    def start(self, clients):
+        if self.fStep is not None:
+            return
+
+        self.fClients = list(clients)
+        self.fElapsed.start()
+
+        self.progress.emit(self.tr("Checking for JACK..."))
+        self.runTool("check", "jack_wait", ["-c"], JACK_TOOL_GRACE)
+
+    def abort(self):
+        if self.fStep is None:
+            return
+
+        self.fStep = None
+        self.fTimeoutTimer.stop()
+
+        if self.fProcess.state() != QProcess.NotRunning:
+            self.fProcess.kill()
+            self.fProcess.waitForFinished(1000)
+
+    # Stop the JACK server, only if it was started by us
+    def stopServer(self):
+        if self.fServer is None:
+            return
+
+        if self.fServer.state() != QProcess.NotRunning:
+            self.fServer.terminate()
+            if not self.fServer.waitForFinished(2000):
+                self.fServer.kill()
+                self.fServer.waitForFinished(1000)
+
+        self.fServer = None
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def runTool(self, step, program, args, timeout):
+        self.fStep = step
+        self.fTimeoutTimer.start(timeout)
+        self.fProcess.start(program, args)
+
+    def startServer(self):
+        self.progress.emit(self.tr("Starting JACK server..."))
+
+        # from an earlier start, and has exited since
+        if self.fServer is not None:
+            self.fServer.deleteLater()
+
+        self.fServer = QProcess(self)
+        self.fServer.setProcessChannelMode(QProcess.ForwardedChannels)
+        self.fServer.start(self.fServerCommand[0], self.fServerCommand[1:])
+
+        self.waitForServer()
+
+    def waitForServer(self):
+        self.progress.emit(self.tr("Waiting for JACK server..."))
+        self.runTool("wait", "jack_wait", ["-w", "-t", str(self.fWaitTimeout)], self.fWaitTimeout * 1000 + JACK_TOOL_GRACE)
+
+    def loadNextClient(self):
+        if len(self.fClients) == 0:
+            self.fStep = None
+            self.fTimeoutTimer.stop()
+            print("JACK ready in %i ms" % self.getElapsed())
+            self.ready.emit()
+            return
+
+        client = self.fClients.pop(0)
+        self.progress.emit(self.tr("Loading %s...") % client)
+        self.runTool("load", "jack_load", [client], self.fLoadTimeout * 1000)
+
+    def fail(self, error):
+        self.fStep = None
+        self.fTimeoutTimer.stop()
+        print("JACK failed after %i ms: %s" % (self.getElapsed(), error))
+        self.failed.emit(error)
+
+    def getToolOutput(self):
+        return str(self.fProcess.readAll(), encoding="utf-8", errors="ignore").strip()
+
+    # --------------------------------------------------------------------------------------------------------
+
+    @pyqtSlot(int, QProcess.ExitStatus)
+    def slot_processFinished(self, exitCode, exitStatus):
+        step   = self.fStep
+        ok     = exitStatus == QProcess.NormalExit and exitCode == 0
+        output = self.getToolOutput()
+
+        self.fTimeoutTimer.stop()
+
+        if step == "check":
+            if ok and "not running" not in output:
+                self.loadNextClient()
+            elif len(self.fServerCommand) > 0:
+                self.startServer()
+            else:
+                self.waitForServer()
+
+        elif step == "wait":
+            if ok:
+                self.loadNextClient()
+            elif self.fServer is not None and self.fServer.state() == QProcess.NotRunning:
+                self.fail(self.tr("JACK server exited with code %i") % self.fServer.exitCode())
+            else:
+                self.fail(self.tr("JACK server did not start within %i s") % self.fWaitTimeout)
+
+        elif step == "load":
+            # the backend can run without the extra clients, so this is not fatal
+            if not ok:
+                print("JACK: failed to load internal client:", output or exitCode)
+            self.loadNextClient()
+
+    @pyqtSlot(QProcess.ProcessError)
+    def slot_processError(self, error):
+        if self.fStep is None or error != QProcess.FailedToStart:
+            return
+
+        self.fail(self.tr("Could not run %s, are the JACK tools installed?") % self.fProcess.program())
+
+    @pyqtSlot()
+    def slot_timeout(self):
+        step = self.fStep
+
+        if step is None:
+            return
+
+        # finished() is not handled once the step is cleared
+        self.fStep = None
+        self.fProcess.kill()
+        self.fProcess.waitForFinished(1000)
+        self.fStep = step
+
+        if step == "load":
+            print("JACK: timed out loading internal client")
+            self.loadNextClient()
+        else:
+            self.fail(self.tr("Timed out waiting for JACK"))
+
+# ------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import json
+import os
+
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlsplit
+
+# ------------------------------------------------------------------------------------------------------------
+
+# number of appended edits after which the journal is rewritten as a single snapshot
+JOURNAL_COMPACT_EVERY = 1000
+
+JOURNAL_VERSION = 1
+
+# ------------------------------------------------------------------------------------------------------------
+# Turn a mod-ui request or websocket message into a journal edit, None if it doesn't change the pedalboard
+# Edits are lists, so they go through JSON unchanged:
+#   ["load", bundle]  ["reset"]
+#   ["add", instance, uri, x, y]  ["remove", instance]
+#   ["connect", port1, port2]  ["disconnect", port1, port2]
+#   ["param", port, value]  ["pos", instance, x, y]
+
+def parseRequest(method, url, body):
+    parts = urlsplit(url)
+    path  = unquote(parts.path)
+    query = parse_qs(parts.query)
+
+    if path.startswith("/effect/add/"):
+        instance = "/" + path[12:].strip("/")
+        return ["add", instance, query.get('uri', [""])[0],
+                float(query.get('x', ["0"])[0]), float(query.get('y', ["0"])[0])]
+
+    if path.startswith("/effect/remove/"):
+        return ["remove", "/" + path[15:].strip("/")]
+
+    if path.startswith(("/effect/connect/", "/effect/disconnect/")):
+        action, ports = path[8:].split("/", 1)
+        ports = ports.strip("/").split(",", 1)
+        if len(ports) != 2:
+            return None
+        return [action, "/" + ports[0].strip("/"), "/" + ports[1].strip("/")]
+
+    if path.rstrip("/") == "/pedalboard/load_bundle":
+        bundle = parse_qs(body).get('bundlepath', [""])[0]
+        return ["load", bundle] if bundle else None
+
+    if path.rstrip("/") == "/reset":
+        return ["reset"]
+
+    return None
+
+def parseMessage(message):
+    parts = message.split(" ")
+
+    try:
+        if parts[0] == "param_set" and len(parts) == 3:
+            return ["param", parts[1], float(parts[2])]
+
+        if parts[0] == "plugin_pos" and len(parts) == 4:
+            return ["pos", parts[1], float(parts[2]), float(parts[3])]
+
+    except ValueError:
+        pass
+
+    return None
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard Journal
+# Append-only log of the edits made to the current pedalboard since it was loaded or last saved.
+# Every edit is also folded into an in-memory state that holds only the net changes against the base bundle, and
+# every JOURNAL_COMPACT_EVERY edits the file is replaced by that state, so it stays small no matter how long the
+# session is. Appending an edit is a single buffered write plus flush, the data survives the app crashing but
+# only compaction syncs it to disk.
+
+class PedalboardJournal(object):
+    def __init__(self, filename, compactEvery=JOURNAL_COMPACT_EVERY):
+        self.fFilename     = filename
+        self.fCompactEvery = compactEvery
+        self.fFile         = None
+        self.fAppended     = 0
+        self.clearState("")
+
+    def clearState(self, bundle):
+        self.fBundle       = bundle
+        self.fRemoved      = []
+        self.fAdded        = {}
+        self.fConnected    = []
+        self.fDisconnected = []
+        self.fParams       = {}
+        self.fPositions    = {}
+        self.fEditCount    = 0
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Read the journal left by a previous run, returns True if it has changes to restore
+    def load(self):
+        try:
+            with open(self.fFilename, 'r') as fh:
+                lines = fh.readlines()
+        except (IOError, OSError):
+            return False
+
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # the last line may be cut short by a crash
+                continue
+
+            if isinstance(entry, dict):
+                if entry.get('version') == JOURNAL_VERSION:
+                    self.setSnapshot(entry)
+            elif isinstance(entry, list):
+                self.apply(entry)
+
+        return self.hasChanges()
+
+    # Edits that undo each other (like adding and then removing a plugin) leave no changes behind
+    def hasChanges(self):
+        return self.getChangeCount() > 0
+
+    def getBundle(self):
+        return self.fBundle
+
+    # Number of edits recorded, including the ones that were undone later
+    def getEditCount(self):
+        return self.fEditCount
+
+    # Number of net changes against the base bundle, one per request or message in getReplay()
+    def getChangeCount(self):
+        return (len(self.fRemoved) + len(self.fAdded) + len(self.fConnected) + len(self.fDisconnected) +
+                len(self.fParams) + len(self.fPositions))
+
+    # Start over from @a bundle (empty for a new pedalboard), after loading or saving
+    def reset(self, bundle=""):
+        self.clearState(bundle)
+        self.compact()
+
+    def record(self, edit):
+        if edit is None:
+            return
+
+        if edit[0] == "load":
+            self.reset(edit[1])
+            return
+        if edit[0] == "reset":
+            self.reset("")
+            return
+
+        self.apply(edit)
+
+        try:
+            if self.fFile is None:
+                self.fFile = open(self.fFilename, 'a')
+
+            self.fFile.write(json.dumps(edit) + "\n")
+            self.fFile.flush()
+
+        except (IOError, OSError) as e:
+            print("failed to write pedalboard journal:", e)
+            return
+
+        self.fAppended += 1
+
+        if self.fAppended >= self.fCompactEvery:
+            self.compact()
+
+    def recordRequest(self, method, url, body):
+        self.record(parseRequest(method, url, body))
+
+    def recordMessage(self, message):
+        self.record(parseMessage(message))
+
+    # Done with it, a journal is only left behind when not closed cleanly
+    def close(self):
+        if self.fFile is not None:
+            self.fFile.close()
+            self.fFile = None
+
+        try:
+            os.remove(self.fFilename)
+        except OSError:
+            pass
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def apply(self, edit):
+        action = edit[0]
+
+        if action == "add":
+            _, instance, uri, x, y = edit
+            self.fAdded[instance] = [uri, x, y]
+
+        elif action == "remove":
+            instance = edit[1]
+            prefix   = instance + "/"
+
+            if self.fAdded.pop(instance, None) is None and instance not in self.fRemoved:
+                self.fRemoved.append(instance)
+
+            self.fPositions.pop(instance, None)
+            self.fConnected    = [c for c in self.fConnected if not (c[0].startswith(prefix) or c[1].startswith(prefix))]
+            self.fDisconnected = [c for c in self.fDisconnected if not (c[0].startswith(prefix) or c[1].startswith(prefix))]
+
+            for port in [port for port in self.fParams if port.startswith(prefix)]:
+                del self.fParams[port]
+
+        elif action in ("connect", "disconnect"):
+            ports = [edit[1], edit[2]]
+            undo  = self.fDisconnected if action == "connect" else self.fConnected
+            redo  = self.fConnected    if action == "connect" else self.fDisconnected
+
+            if ports in undo:
+                undo.remove(ports)
+            elif ports not in redo:
+                redo.append(ports)
+
+        elif action == "param":
+            self.fParams[edit[1]] = edit[2]
+
+        elif action == "pos":
+            _, instance, x, y = edit
+            if instance in self.fAdded:
+                self.fAdded[instance][1:] = [x, y]
+            else:
+                self.fPositions[instance] = [x, y]
+
+        else:
+            return
+
+        self.fEditCount += 1
+
+    def getSnapshot(self):
+        return {
+            'version':      JOURNAL_VERSION,
+            'bundle':       self.fBundle,
+            'removed':      self.fRemoved,
+            'added':        self.fAdded,
+            'connected':    self.fConnected,
+            'disconnected': self.fDisconnected,
+            'params':       self.fParams,
+            'positions':    self.fPositions,
+            'edits':        self.fEditCount,
+        }
+
+    def setSnapshot(self, snapshot):
+        self.fBundle       = snapshot['bundle']
+        self.fRemoved      = snapshot['removed']
+        self.fAdded        = snapshot['added']
+        self.fConnected    = snapshot['connected']
+        self.fDisconnected = snapshot['disconnected']
+        self.fParams       = snapshot['params']
+        self.fPositions    = snapshot['positions']
+        self.fEditCount    = snapshot['edits']
+
+    # Compact if anything was appended since the last time, called periodically so the journal gets synced
+    def compactIfDirty(self):
+        if self.fAppended > 0:
+            self.compact()
+
+    # Replace the journal with a snapshot of the current state
+    def compact(self):
+        if self.fFile is not None:
+            self.fFile.close()
+            self.fFile = None
+
+        self.fAppended = 0
+
+        tmpFile = self.fFilename + ".tmp"
+
+        try:
+            os.makedirs(os.path.dirname(self.fFilename), exist_ok=True)
+
+            with open(tmpFile, 'w') as fh:
+                fh.write(json.dumps(self.getSnapshot()) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+
+            os.replace(tmpFile, self.fFilename)
+
+        except (IOError, OSError) as e:
+            print("failed to compact pedalboard journal:", e)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Requests and websocket messages that bring a freshly loaded base bundle to the journaled state,
+    # as ("request", method, url, body) and ("message", text) tuples
+    def getReplay(self):
+        replay = []
+
+        for instance in self.fRemoved:
+            replay.append(("request", "GET", "/effect/remove%s" % quote(instance), ""))
+
+        for instance, (uri, x, y) in self.fAdded.items():
+            query = urlencode({ 'uri': uri, 'x': x, 'y': y })
+            replay.append(("request", "GET", "/effect/add%s?%s" % (quote(instance), query), ""))
+
+        for port1, port2 in self.fDisconnected:
+            replay.append(("request", "GET", "/effect/disconnect%s,%s" % (quote(port1), quote(port2)), ""))
+
+        for port1, port2 in self.fConnected:
+            replay.append(("request", "GET", "/effect/connect%s,%s" % (quote(port1), quote(port2)), ""))
+
+        for port, value in self.fParams.items():
+            replay.append(("message", "param_set %s %f" % (port, value)))
+
+        for instance, (x, y) in self.fPositions.items():
+            replay.append(("message", "plugin_pos %s %f %f" % (instance, x, y)))
+
+        return replay
+
+# ------------------------------------------------------------------------------------------------------------
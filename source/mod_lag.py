@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import os
+import sys
+import threading
+import time
+import traceback
+
+from collections import deque
+
+# ------------------------------------------------------------------------------------------------------------
+
+# time between pings to a busy event loop, and the most it backs off to while the loop is idle (in s)
+LAG_PING_INTERVAL      = 0.25
+LAG_IDLE_PING_INTERVAL = 8.0
+
+# a ping that waits longer than this was queued behind other work, so the loop is busy (in s)
+LAG_BUSY_THRESHOLD = 0.01
+
+# a ping that takes longer than this to be handled is a stall (in s)
+LAG_STALL_THRESHOLD = 0.3
+
+# number of stalls kept, and frames kept per thread stack
+LAG_HISTORY_SIZE = 50
+LAG_STACK_LIMIT  = 25
+
+# ------------------------------------------------------------------------------------------------------------
+# Lag Monitor
+# Measures scheduling lag of event loops from a watchdog thread: each loop gets a ping posted to it, and the lag
+# is the time until the loop runs it. When a ping is still waiting after LAG_STALL_THRESHOLD, the stacks of all
+# Python threads are captured while the loop is still stuck, so the culprit shows up in them. The last
+# LAG_HISTORY_SIZE stalls are kept, and written to a dump file when each one ends.
+#
+# Pings go out every LAG_PING_INTERVAL while a loop is busy. Each ping that is handled right away doubles the
+# interval, up to LAG_IDLE_PING_INTERVAL, and noteActivity() brings it back down, so an idle app is only woken up
+# every few seconds. The watchdog sleeps until the next ping or stall deadline instead of polling.
+#
+# Loops are added with a thread-safe function that runs a callback in them, like tornado's add_callback.
+
+class LagMonitor(object):
+    def __init__(self, dumpFile, threshold=LAG_STALL_THRESHOLD):
+        self.fDumpFile  = dumpFile
+        self.fThreshold = threshold
+        self.fLoops     = {}
+        self.fStalls    = deque(maxlen=LAG_HISTORY_SIZE)
+        self.fLock      = threading.Lock()
+        self.fWakeup    = threading.Condition(self.fLock)
+        self.fStopping  = False
+        self.fThread    = None
+        self.fDirty     = False
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Monitor loop @a name, which runs callbacks given to @a post in thread @a threadId
+    def addLoop(self, name, post, threadId):
+        with self.fLock:
+            self.fLoops[name] = {
+                'post':     post,
+                'thread':   threadId,
+                'pending':  None, # time the ping in flight was posted
+                'last':     0.0,  # time the last ping was handled
+                'interval': LAG_PING_INTERVAL,
+                'lag':      0.0,
+                'maxLag':   0.0,
+                'stalls':   0,
+                'stall':    None, # ongoing stall
+            }
+            self.fWakeup.notify()
+
+    # Stop monitoring loop @a name, for loops that stop on purpose
+    def removeLoop(self, name):
+        with self.fLock:
+            self.fLoops.pop(name, None)
+
+    # Loop @a name (or all of them) is doing work, go back to pinging it often
+    def noteActivity(self, name=None):
+        with self.fLock:
+            for loopName, loop in self.fLoops.items():
+                if name is not None and loopName != name:
+                    continue
+                if loop['interval'] == LAG_PING_INTERVAL:
+                    continue
+
+                loop['interval'] = LAG_PING_INTERVAL
+                self.fWakeup.notify()
+
+    def start(self):
+        if self.fThread is not None:
+            return
+
+        self.fStopping = False
+        self.fThread = threading.Thread(target=self.run, name="LagMonitor", daemon=True)
+        self.fThread.start()
+
+    def stop(self):
+        if self.fThread is None:
+            return
+
+        with self.fLock:
+            self.fStopping = True
+            self.fWakeup.notify()
+
+        self.fThread.join()
+        self.fThread = None
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Per loop (name, last lag, max lag, number of stalls), lags in ms
+    def getLoopStats(self):
+        with self.fLock:
+            return [(name, loop['lag'] * 1000, loop['maxLag'] * 1000, loop['stalls'])
+                    for name, loop in sorted(self.fLoops.items())]
+
+    # Stalls, oldest first, as dicts with loop, time (wall clock), duration (ms, None while ongoing) and
+    # stacks, a list of (thread name, is the loop's thread, formatted stack)
+    def getStalls(self):
+        with self.fLock:
+            return [dict(stall) for stall in self.fStalls]
+
+    def getDumpFile(self):
+        return self.fDumpFile
+
+    def formatReport(self):
+        lines = []
+
+        for name, lag, maxLag, stalls in self.getLoopStats():
+            lines.append("%s: lag %i ms, max %i ms, %i stalls" % (name, lag, maxLag, stalls))
+
+        for stall in reversed(self.getStalls()):
+            duration = "still stalled" if stall['duration'] is None else "%i ms" % stall['duration']
+
+            lines.append("")
+            lines.append("=== %s stalled at %s, %s" % (stall['loop'], time.strftime("%Y-%m-%d %H:%M:%S",
+                                                                                   time.localtime(stall['time'])),
+                                                        duration))
+
+            for threadName, isLoopThread, stack in stall['stacks']:
+                lines.append("--- thread %s%s" % (threadName, " (stalled loop)" if isLoopThread else ""))
+                lines.append(stack.rstrip())
+
+        return "\n".join(lines)
+
+    def dump(self):
+        tmpFile = self.fDumpFile + ".tmp"
+
+        try:
+            os.makedirs(os.path.dirname(self.fDumpFile), exist_ok=True)
+
+            with open(tmpFile, 'w') as fh:
+                fh.write(self.formatReport() + "\n")
+
+            os.replace(tmpFile, self.fDumpFile)
+
+        except (IOError, OSError) as e:
+            print("failed to write stall report:", e)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def run(self):
+        # loops may have been added before starting
+        timeout = 0.0
+
+        while True:
+            posts = []
+
+            with self.fLock:
+                if not self.fStopping:
+                    self.fWakeup.wait(timeout)
+                if self.fStopping:
+                    break
+
+                now     = time.monotonic()
+                timeout = None
+
+                for name, loop in self.fLoops.items():
+                    if loop['pending'] is None:
+                        due = loop['last'] + loop['interval']
+
+                        if now >= due:
+                            loop['pending'] = now
+                            posts.append((loop['post'], name, now))
+                            due = now + self.fThreshold
+                    else:
+                        due = loop['pending'] + self.fThreshold
+
+                        if loop['stall'] is None and now > due:
+                            loop['stall'] = self.captureStall(name, loop['thread'])
+                            loop['stalls'] += 1
+                            self.fStalls.append(loop['stall'])
+                            print("event loop '%s' stalled for more than %i ms" % (name, self.fThreshold * 1000))
+
+                        # nothing to do until the pong, which wakes us up
+                        if loop['stall'] is not None:
+                            continue
+
+                    timeout = max(0.0, due - now) if timeout is None else min(timeout, max(0.0, due - now))
+
+                dirty, self.fDirty = self.fDirty, False
+
+            # outside the lock, posting can run the callback right away
+            for post, name, sent in posts:
+                try:
+                    post(lambda name=name, sent=sent: self.pong(name, sent))
+                except Exception:
+                    # the loop is going away
+                    with self.fLock:
+                        if name in self.fLoops:
+                            self.fLoops[name]['pending'] = None
+
+            if dirty:
+                self.dump()
+
+    # Called in the monitored loop when it gets to a ping
+    def pong(self, name, sent):
+        now = time.monotonic()
+        lag = now - sent
+
+        with self.fLock:
+            loop = self.fLoops.get(name)
+
+            if loop is None or loop['pending'] != sent:
+                return
+
+            loop['pending'] = None
+            loop['last']    = now
+            loop['lag']     = lag
+            loop['maxLag']  = max(loop['maxLag'], lag)
+
+            # back off while the loop is idle
+            if lag < LAG_BUSY_THRESHOLD:
+                loop['interval'] = min(loop['interval'] * 2, LAG_IDLE_PING_INTERVAL)
+            else:
+                loop['interval'] = LAG_PING_INTERVAL
+
+            if loop['stall'] is not None:
+                loop['stall']['duration'] = lag * 1000
+                loop['stall'] = None
+                self.fDirty = True
+
+            # the next ping is due from now on
+            self.fWakeup.notify()
+
+    def captureStall(self, name, loopThreadId):
+        names  = dict((thread.ident, thread.name) for thread in threading.enumerate())
+        stacks = []
+
+        for threadId, frame in sys._current_frames().items():
+            if threadId == threading.get_ident():
+                continue
+
+            stack = "".join(traceback.format_stack(frame, LAG_STACK_LIMIT))
+            stacks.append((names.get(threadId, "%x" % threadId), threadId == loopThreadId, stack))
+
+        # the stalled loop's thread first
+        stacks.sort(key=lambda item: not item[1])
+
+        return { 'loop': name, 'time': time.time(), 'duration': None, 'stacks': stacks }
+
+# ------------------------------------------------------------------------------------------------------------
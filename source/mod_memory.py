@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+
+# systems with less memory than this use the low-memory profile by default
+LOW_MEMORY_SYSTEM_SIZE = 3 * 1024 * 1024 * 1024
+
+# WebKit memory cache limit in low-memory mode, in MiB
+LOW_MEMORY_WEB_CACHE = 8
+
+# memory is considered under pressure when less than this much (or this fraction of the total) is available
+MEMORY_PRESSURE_AVAILABLE = 256 * 1024 * 1024
+MEMORY_PRESSURE_FRACTION  = 0.1
+
+# Subsystems for the RSS breakdown, as (name, substrings of the mapped file path).
+# The first match wins, anonymous memory can't be attributed and is reported as heap.
+RSS_SUBSYSTEMS = (
+    ("WebKit",          ("WebKit", "javascriptcore", "libicu")),
+    ("Qt",              ("libQt",)),
+    ("Python",          ("python", "lib-dynload", "site-packages", "dist-packages")),
+    ("Graphics & fonts", ("libGL", "/dri/", "libX", "libxcb", "fontconfig", "freetype", ".ttf", ".otf")),
+    ("Other libraries", (".so",)),
+)
+
+# ------------------------------------------------------------------------------------------------------------
+# System memory from /proc/meminfo, in bytes. Empty if not available (non-Linux)
+
+def getMemInfo():
+    info = {}
+
+    try:
+        with open("/proc/meminfo", 'r') as fh:
+            for line in fh:
+                key, value = line.split(":", 1)
+                value = value.split()
+                info[key] = int(value[0]) * (1024 if len(value) > 1 and value[1] == "kB" else 1)
+    except (IOError, OSError, ValueError):
+        pass
+
+    return info
+
+def isLowMemorySystem():
+    total = getMemInfo().get('MemTotal', 0)
+    return 0 < total < LOW_MEMORY_SYSTEM_SIZE
+
+def isMemoryUnderPressure():
+    info  = getMemInfo()
+    total = info.get('MemTotal', 0)
+    avail = info.get('MemAvailable', info.get('MemFree', 0) + info.get('Cached', 0))
+
+    if total == 0:
+        return False
+
+    return avail < MEMORY_PRESSURE_AVAILABLE or avail < total * MEMORY_PRESSURE_FRACTION
+
+# ------------------------------------------------------------------------------------------------------------
+# Resident memory of a process in bytes, from /proc/<pid>/status. 0 if not available
+
+def getProcessRSS(pid="self"):
+    try:
+        with open("/proc/%s/status" % pid, 'r') as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError, ValueError):
+        pass
+
+    return 0
+
+# ------------------------------------------------------------------------------------------------------------
+# Resident memory of a process split by subsystem, from /proc/<pid>/smaps.
+# Returns a list of (name, bytes), largest first, empty if not available.
+
+def getRSSBreakdown(pid="self"):
+    sizes = {}
+    name  = None
+
+    try:
+        with open("/proc/%s/smaps" % pid, 'r') as fh:
+            for line in fh:
+                # mapping header: address perms offset dev inode [path]
+                if "-" in line.split(" ", 1)[0]:
+                    parts = line.split(None, 5)
+                    name  = getMappingSubsystem(parts[5].strip() if len(parts) > 5 else "")
+
+                elif line.startswith("Rss:") and name is not None:
+                    sizes[name] = sizes.get(name, 0) + int(line.split()[1]) * 1024
+
+    except (IOError, OSError, ValueError):
+        return []
+
+    return sorted(((n, s) for n, s in sizes.items() if s > 0), key=lambda item: item[1], reverse=True)
+
+def getMappingSubsystem(path):
+    if not path or path == "[heap]" or path.startswith("[anon"):
+        return "Heap (unattributed)"
+
+    if path.startswith("[stack"):
+        return "Stacks"
+
+    if path.startswith("["):
+        return "Kernel"
+
+    for name, patterns in RSS_SUBSYSTEMS:
+        for pattern in patterns:
+            if pattern in path:
+                return name
+
+    return "Other files"
+
+# ------------------------------------------------------------------------------------------------------------
+
+def formatSize(size):
+    if size >= 1024 * 1024:
+        return "%.1f MiB" % (size / (1024.0 * 1024.0))
+    return "%i KiB" % (size // 1024)
+
+# ------------------------------------------------------------------------------------------------------------
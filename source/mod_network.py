@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import json
+import mimetypes
+import os
+import time
+
+from collections import deque
+from random import uniform
+from threading import Lock, Thread
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QElapsedTimer, QIODevice, QObject, QTimer, QUrl
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkDiskCache, QNetworkReply, QNetworkRequest
+from PyQt5.QtWebKit import QWebSettings
+
+# ------------------------------------------------------------------------------------------------------------
+# Link probe configuration
+
+# time between probes, in ms
+LINK_PROBE_INTERVAL = 2000
+
+# probes are HEAD requests, only every this many probes the whole page is fetched to measure throughput
+# (once a minute at the default interval)
+LINK_THROUGHPUT_EVERY = 30
+
+# a probe that takes longer than this is considered lost, in ms
+LINK_PROBE_TIMEOUT = 5000
+
+# number of probes kept for statistics (10 minutes at the default interval)
+LINK_HISTORY_SIZE = 300
+
+# consecutive lost probes before the link is considered down
+LINK_LOST_THRESHOLD = 2
+
+# ------------------------------------------------------------------------------------------------------------
+# Reconnect configuration
+
+# first retry delay and upper limit for the exponential backoff, in ms
+RECONNECT_BASE_DELAY = 1000
+RECONNECT_MAX_DELAY  = 30000
+
+# files that never change between page loads of the same device
+STATIC_ASSET_EXTENSIONS = (".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico",
+                           ".woff", ".woff2", ".ttf", ".otf", ".eot")
+
+# files with a static-looking name that are generated by mod-ui on each request
+DYNAMIC_ASSET_PATHS = ("/js/templates.js", "/js/settings.js")
+
+def isStaticAssetPath(path):
+    return path.lower().endswith(STATIC_ASSET_EXTENSIONS) and path not in DYNAMIC_ASSET_PATHS
+
+# ------------------------------------------------------------------------------------------------------------
+# Set the WebKit in-memory object cache size (global for all web views), in bytes
+
+def setWebMemoryCacheSize(size):
+    # allow dead objects (not used by the current page) to take up half of it
+    QWebSettings.setObjectCacheCapacities(0, size // 2, size)
+
+# ------------------------------------------------------------------------------------------------------------
+# Get the value at percentile @a pct (0-100) of an already sorted list
+
+def getPercentile(sortedValues, pct):
+    if len(sortedValues) == 0:
+        return None
+
+    index = int(round(pct / 100.0 * (len(sortedValues) - 1)))
+    return sortedValues[index]
+
+# ------------------------------------------------------------------------------------------------------------
+# Link Quality Monitor
+# Periodically probes the remote page with a HEAD request and measures round-trip time (time until the response
+# headers arrive) and probe loss (timeouts and network errors). Every LINK_THROUGHPUT_EVERY probes the page is
+# fetched instead, for throughput (body size over body transfer time).
+
+class LinkQualityMonitor(QObject):
+    # signals
+    updated      = pyqtSignal()
+    linkLost     = pyqtSignal()
+    linkRestored = pyqtSignal()
+
+    def __init__(self, parent, scheduler):
+        QObject.__init__(self, parent)
+
+        self.fURL       = QUrl()
+        self.fScheduler = scheduler
+        self.fManager   = QNetworkAccessManager(self)
+        self.fSamples = deque(maxlen=LINK_HISTORY_SIZE)
+
+        # current probe
+        self.fReply       = None
+        self.fReplyTimer  = QElapsedTimer()
+        self.fReplyRTT    = -1
+        self.fReplyLost   = False
+        self.fProbeCount  = 0
+
+        # number of lost probes in a row
+        self.fLostCount = 0
+
+        self.fTimeoutTimer = QTimer(self)
+        self.fTimeoutTimer.setSingleShot(True)
+        self.fTimeoutTimer.setInterval(LINK_PROBE_TIMEOUT)
+        self.fTimeoutTimer.timeout.connect(self.slot_probeTimeout)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def start(self, url):
+        self.stop()
+        self.fURL = QUrl(url)
+        self.fSamples.clear()
+        self.fLostCount  = 0
+        self.fProbeCount = 0
+        self.fScheduler.addTask("link-probe", LINK_PROBE_INTERVAL, self.slot_probe)
+        self.slot_probe()
+
+    def stop(self):
+        self.fScheduler.removeTask("link-probe")
+        self.fTimeoutTimer.stop()
+
+        if self.fReply is not None:
+            reply = self.fReply
+            self.fReply = None
+            reply.finished.disconnect(self.slot_probeFinished)
+            reply.abort()
+            reply.deleteLater()
+
+    def isRunning(self):
+        return self.fScheduler.hasTask("link-probe")
+
+    def isLinkLost(self):
+        return self.fLostCount >= LINK_LOST_THRESHOLD
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def getStats(self):
+        rtts   = sorted(s['rtt'] for s in self.fSamples if s['rtt'] is not None)
+        speeds = sorted(s['throughput'] for s in self.fSamples if s['throughput'] is not None)
+        count  = len(self.fSamples)
+        lost   = sum(1 for s in self.fSamples if s['rtt'] is None)
+
+        return {
+            'probes':         count,
+            'lost':           lost,
+            'loss':           float(lost) / count if count else 0.0,
+            'rtt_p50':        getPercentile(rtts, 50),
+            'rtt_p95':        getPercentile(rtts, 95),
+            'rtt_max':        rtts[-1] if rtts else None,
+            'throughput_p50': getPercentile(speeds, 50),
+            'throughput_min': speeds[0] if speeds else None,
+        }
+
+    def getSummaryText(self):
+        stats = self.getStats()
+
+        if stats['probes'] == 0:
+            return ""
+        if stats['rtt_p50'] is None:
+            return self.tr("Link: no response (%i%% loss)") % int(stats['loss'] * 100)
+
+        text = self.tr("Link: %i ms (p95 %i, max %i)") % (stats['rtt_p50'], stats['rtt_p95'], stats['rtt_max'])
+
+        if stats['throughput_p50'] is not None:
+            text += " | %.1f KiB/s" % (stats['throughput_p50'] / 1024.0)
+
+        text += " | " + self.tr("%i%% loss") % int(stats['loss'] * 100)
+        return text
+
+    def exportToFile(self, filename):
+        samples = list(self.fSamples)
+
+        with open(filename, 'w') as fh:
+            if filename.lower().endswith(".csv"):
+                fh.write("time,rtt_ms,bytes,throughput_bps\n")
+                for s in samples:
+                    fh.write("%.3f,%s,%i,%s\n" % (s['time'],
+                                                  "" if s['rtt'] is None else s['rtt'],
+                                                  s['bytes'],
+                                                  "" if s['throughput'] is None else "%.1f" % s['throughput']))
+            else:
+                json.dump({
+                    'url':     self.fURL.toString(),
+                    'stats':   self.getStats(),
+                    'samples': samples,
+                }, fh, indent=2)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    @pyqtSlot()
+    def slot_probe(self):
+        # previous probe still pending, let it time out
+        if self.fReply is not None:
+            return
+
+        request = QNetworkRequest(self.fURL)
+        request.setAttribute(QNetworkRequest.CacheLoadControlAttribute, QNetworkRequest.AlwaysNetwork)
+        request.setRawHeader(b"Cache-Control", b"no-cache")
+
+        self.fReplyRTT  = -1
+        self.fReplyLost = False
+        self.fReplyTimer.start()
+
+        if self.fProbeCount % LINK_THROUGHPUT_EVERY == 0:
+            self.fReply = self.fManager.get(request)
+        else:
+            self.fReply = self.fManager.head(request)
+
+        self.fProbeCount += 1
+        self.fReply.metaDataChanged.connect(self.slot_probeMetaData)
+        self.fReply.finished.connect(self.slot_probeFinished)
+        self.fTimeoutTimer.start()
+
+    @pyqtSlot()
+    def slot_probeMetaData(self):
+        if self.fReplyRTT < 0:
+            self.fReplyRTT = self.fReplyTimer.elapsed()
+
+    @pyqtSlot()
+    def slot_probeTimeout(self):
+        if self.fReply is None:
+            return
+
+        self.fReplyLost = True
+        self.fReply.abort()
+
+    @pyqtSlot()
+    def slot_probeFinished(self):
+        reply = self.fReply
+        self.fReply = None
+        self.fTimeoutTimer.stop()
+
+        if reply is None:
+            return
+
+        elapsed = self.fReplyTimer.elapsed()
+        size    = len(reply.readAll())
+        # any HTTP response made the round trip, mod-ui may answer HEAD with 405
+        lost    = self.fReplyLost or reply.attribute(QNetworkRequest.HttpStatusCodeAttribute) is None
+        reply.deleteLater()
+
+        if lost:
+            rtt = None
+            throughput = None
+        else:
+            rtt = self.fReplyRTT if self.fReplyRTT >= 0 else elapsed
+            transferTime = elapsed - rtt
+            throughput = size * 1000.0 / transferTime if transferTime > 0 and size > 0 else None
+
+        self.fSamples.append({
+            'time':       time.time(),
+            'rtt':        rtt,
+            'bytes':      size,
+            'throughput': throughput,
+        })
+        self.updated.emit()
+
+        if lost:
+            self.fLostCount += 1
+            if self.fLostCount == LINK_LOST_THRESHOLD:
+                self.linkLost.emit()
+        else:
+            wasLost = self.isLinkLost()
+            self.fLostCount = 0
+            if wasLost:
+                self.linkRestored.emit()
+
+# ------------------------------------------------------------------------------------------------------------
+# Reconnect Scheduler
+# Emits reconnect() after a jittered exponential backoff delay. Half of the delay is fixed and half is random,
+# so many clients that lost the same device don't all retry at once.
+
+class ReconnectScheduler(QObject):
+    # signals
+    reconnect = pyqtSignal()
+
+    def __init__(self, parent):
+        QObject.__init__(self, parent)
+
+        self.fAttempt = 0
+
+        self.fTimer = QTimer(self)
+        self.fTimer.setSingleShot(True)
+        self.fTimer.timeout.connect(self.reconnect)
+
+    def getAttempt(self):
+        return self.fAttempt
+
+    def isPending(self):
+        return self.fTimer.isActive()
+
+    def schedule(self):
+        limit = min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * (2 ** min(self.fAttempt, 16)))
+        delay = int(limit / 2 + uniform(0, limit / 2))
+
+        self.fAttempt += 1
+        self.fTimer.start(delay)
+        return delay
+
+    def reset(self):
+        self.fAttempt = 0
+        self.fTimer.stop()
+
+# ------------------------------------------------------------------------------------------------------------
+# Caching Network Access Manager
+# Keeps a persistent disk cache and, while preferCache is set, serves static assets from it without revalidation.
+# Requests that are not served from memory are announced through requestCreated.
+
+class CachingNetworkAccessManager(QNetworkAccessManager):
+    # signals
+    requestCreated = pyqtSignal(int, QNetworkReply)
+
+    def __init__(self, parent, cacheDir):
+        QNetworkAccessManager.__init__(self, parent)
+
+        self.fPreferCache = False
+
+        # local static files, see setStaticAssetCache()
+        self.fStaticCache = None
+        self.fStaticURL   = QUrl()
+
+        if cacheDir:
+            if not os.path.exists(cacheDir):
+                os.makedirs(cacheDir)
+
+            cache = QNetworkDiskCache(self)
+            cache.setCacheDirectory(cacheDir)
+            self.setCache(cache)
+
+    def setDiskCacheSize(self, size):
+        cache = self.cache()
+
+        if cache is None:
+            return
+
+        if size <= 0:
+            cache.clear()
+
+        # QNetworkDiskCache needs a non-zero maximum
+        cache.setMaximumCacheSize(max(1, size))
+
+    def setPreferCache(self, preferCache):
+        self.fPreferCache = preferCache
+
+    # Serve requests to @a baseURL directly from @a staticCache whenever it has the file
+    def setStaticAssetCache(self, baseURL, staticCache):
+        self.fStaticURL   = QUrl(baseURL)
+        self.fStaticCache = staticCache
+
+    def createRequest(self, op, request, outgoingData=None):
+        if self.fStaticCache is not None and op == QNetworkAccessManager.GetOperation:
+            url = request.url()
+
+            if url.host() == self.fStaticURL.host() and url.port() == self.fStaticURL.port():
+                asset = self.fStaticCache.get(url.path())
+
+                if asset is not None:
+                    return StaticAssetReply(self, request, asset[0], asset[1])
+
+        if self.fPreferCache and op == QNetworkAccessManager.GetOperation and isStaticAssetPath(request.url().path()):
+            request = QNetworkRequest(request)
+            request.setAttribute(QNetworkRequest.CacheLoadControlAttribute, QNetworkRequest.PreferCache)
+
+        reply = QNetworkAccessManager.createRequest(self, op, request, outgoingData)
+
+        # announced before anyone else gets the reply, so listeners see all of its signals
+        self.requestCreated.emit(op, reply)
+
+        return reply
+
+# ------------------------------------------------------------------------------------------------------------
+# Static Asset Cache
+# In-memory copy of the static files of a local mod-ui html dir, bounded by size and warmed in the background.
+# Entries are checked against the file modification time on every lookup, so edits to mod-ui show up right away.
+
+class StaticAssetCache(object):
+    def __init__(self, htmlDir, maxSize):
+        self.fHtmlDir = os.path.realpath(htmlDir)
+        self.fMaxSize = maxSize
+        self.fSize    = 0
+        self.fFiles   = {}
+        self.fLock    = Lock()
+
+    def getSize(self):
+        return self.fSize
+
+    def getFileCount(self):
+        return len(self.fFiles)
+
+    def clear(self):
+        with self.fLock:
+            self.fFiles = {}
+            self.fSize  = 0
+
+    def setMaximumSize(self, maxSize):
+        self.fMaxSize = maxSize
+
+        if self.fSize > maxSize:
+            self.clear()
+
+    # Returns (data, mimeType) for @a path (an url path), or None if it should go to the server
+    def get(self, path):
+        if not isStaticAssetPath(path):
+            return None
+
+        filename = os.path.realpath(os.path.join(self.fHtmlDir, path.lstrip("/")))
+
+        if not filename.startswith(self.fHtmlDir + os.sep):
+            return None
+
+        try:
+            mtime = os.stat(filename).st_mtime
+        except OSError:
+            return None
+
+        entry = self.fFiles.get(filename)
+
+        if entry is not None and entry[2] == mtime:
+            return entry[0], entry[1]
+
+        return self.load(filename, mtime)
+
+    def load(self, filename, mtime):
+        try:
+            with open(filename, 'rb') as fh:
+                data = fh.read()
+        except IOError:
+            return None
+
+        mimeType = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+        with self.fLock:
+            old = self.fFiles.pop(filename, None)
+            if old is not None:
+                self.fSize -= len(old[0])
+
+            if self.fSize + len(data) <= self.fMaxSize:
+                self.fFiles[filename] = (data, mimeType, mtime)
+                self.fSize += len(data)
+
+        return data, mimeType
+
+    # Preload all static files, scripts and stylesheets first since they block page rendering
+    def warm(self):
+        def run():
+            filenames = []
+            for root, dirs, files in os.walk(self.fHtmlDir):
+                for name in files:
+                    if name.lower().endswith(STATIC_ASSET_EXTENSIONS):
+                        filenames.append(os.path.join(root, name))
+
+            filenames.sort(key=lambda f: 0 if f.endswith((".js", ".css")) else 1)
+
+            for filename in filenames:
+                if self.fSize >= self.fMaxSize:
+                    break
+                try:
+                    self.load(filename, os.stat(filename).st_mtime)
+                except OSError:
+                    pass
+
+        thread = Thread(target=run, name="StaticAssetCache")
+        thread.daemon = True
+        thread.start()
+
+# ------------------------------------------------------------------------------------------------------------
+# Static Asset Reply
+# A finished network reply with in-memory contents.
+
+class StaticAssetReply(QNetworkReply):
+    def __init__(self, parent, request, data, mimeType):
+        QNetworkReply.__init__(self, parent)
+
+        self.fData   = data
+        self.fOffset = 0
+
+        self.setRequest(request)
+        self.setUrl(request.url())
+        self.setOperation(QNetworkAccessManager.GetOperation)
+        self.setHeader(QNetworkRequest.ContentTypeHeader, mimeType)
+        self.setHeader(QNetworkRequest.ContentLengthHeader, len(data))
+        self.setAttribute(QNetworkRequest.HttpStatusCodeAttribute, 200)
+        self.setAttribute(QNetworkRequest.HttpReasonPhraseAttribute, "OK")
+        self.open(QIODevice.ReadOnly | QIODevice.Unbuffered)
+
+        # signals can only be emitted after the caller gets the reply
+        QTimer.singleShot(0, self.slot_emitFinished)
+
+    @pyqtSlot()
+    def slot_emitFinished(self):
+        self.metaDataChanged.emit()
+        self.downloadProgress.emit(len(self.fData), len(self.fData))
+        self.readyRead.emit()
+        self.finished.emit()
+
+    def abort(self):
+        pass
+
+    def isSequential(self):
+        return True
+
+    def bytesAvailable(self):
+        return len(self.fData) - self.fOffset + QNetworkReply.bytesAvailable(self)
+
+    def readData(self, maxSize):
+        chunk = self.fData[self.fOffset:self.fOffset+maxSize]
+        self.fOffset += len(chunk)
+        return chunk
+
+# ------------------------------------------------------------------------------------------------------------
@@ -20,13 +20,16 @@
 # Imports (Custom)
 
 from mod_settings import *
+from mod_network import CachingNetworkAccessManager, LinkQualityMonitor, ReconnectScheduler, setWebMemoryCacheSize
+from mod_scheduler import IdleScheduler
+from mod_visibility import VisibilityThrottler
 
 # ------------------------------------------------------------------------------------------------------------
 # Imports (Global)
 
-from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QSettings, QTimer, QUrl
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QPoint, QSettings, QTimer, QUrl
 from PyQt5.QtGui import QDesktopServices
-from PyQt5.QtWidgets import QAction, QApplication, QInputDialog, QLineEdit, QMainWindow, QMessageBox
+from PyQt5.QtWidgets import QAction, QApplication, QInputDialog, QLabel, QLineEdit, QMainWindow, QMessageBox
 from PyQt5.QtWebKit import QWebSettings
 from PyQt5.QtWebKitWidgets import QWebInspector, QWebPage, QWebView
 
@@ -159,11 +162,21 @@ class RemoteWindow(QMainWindow):
         # Current remote url
         self.fRemoteURL = ""
 
-        # Qt idle timer
-        self.fIdleTimerId = 0
+        # Periodic tasks, only wakes up when one of them is due
+        self.fScheduler = IdleScheduler(self, MOD_DEFAULT_MAIN_REFRESH_INTERVAL)
 
-        # to be filled with key-value pairs of current settings
-        self.fSavedSettings = {}
+        # Background probe for the connection to the remote device
+        self.fLinkMonitor = LinkQualityMonitor(self, self.fScheduler)
+
+        # Automatic reconnection, only after the first successful load of a device
+        self.fReconnect      = ReconnectScheduler(self)
+        self.fReconnecting   = False
+        self.fWasConnected   = False
+        self.fLastViewURL    = QUrl()
+        self.fLastScrollPos  = QPoint()
+
+        # Current settings, changes are applied as they happen
+        self.fSettings = getSettingsStore("MOD-Remote")
 
         # ----------------------------------------------------------------------------------------------------
         # Set up GUI
@@ -175,6 +188,13 @@ class RemoteWindow(QMainWindow):
         self.ui.webpage = RemoteWebPage(self)
         self.ui.webview.setPage(self.ui.webpage)
 
+        # persistent cache, so reconnects don't need to download all mod-ui assets again
+        self.ui.webnetwork = CachingNetworkAccessManager(self, os.path.join(CACHE_DIR, "MOD-Remote", "webcache"))
+        self.ui.webpage.setNetworkAccessManager(self.ui.webnetwork)
+
+        # throttle the web view while we're not visible, the link probe keeps running for reconnects
+        self.fVisibilityThrottler = VisibilityThrottler(self, self.ui.webview, self.fScheduler)
+
         self.ui.webinspector = QWebInspector(None)
         self.ui.webinspector.resize(800, 600)
         self.ui.webinspector.setPage(self.ui.webpage)
@@ -222,10 +242,19 @@ class RemoteWindow(QMainWindow):
         self.ui.label_app.setText("MOD Remote v%s" % config["version"])
         self.ui.label_progress.setText("")
 
+        self.ui.act_file_link_export = QAction(self.tr("Export link statistics..."), self)
+        self.ui.menu_File.insertAction(self.ui.act_file_quit, self.ui.act_file_link_export)
+        self.ui.menu_File.insertSeparator(self.ui.act_file_quit)
+
+        self.ui.label_link = QLabel(self)
+        self.statusBar().addPermanentWidget(self.ui.label_link)
+        self.statusBar().hide()
+
         # disable file menu
         self.ui.act_file_disconnect.setEnabled(False)
         self.ui.act_file_refresh.setEnabled(False)
         self.ui.act_file_inspect.setEnabled(False)
+        self.ui.act_file_link_export.setEnabled(False)
 
         # Qt needs this so it properly creates & resizes the webview
         self.ui.stackedwidget.setCurrentIndex(1)
@@ -251,11 +280,18 @@ class RemoteWindow(QMainWindow):
 
         self.SIGTERM.connect(self.slot_handleSIGTERM)
 
+        self.fSettings.valueChanged.connect(self.slot_settingChanged)
+
         self.ui.act_file_connect.triggered.connect(self.slot_fileConnect)
         self.ui.act_file_disconnect.triggered.connect(self.slot_fileDisconnect)
 
         self.ui.act_file_refresh.triggered.connect(self.slot_fileRefresh)
         self.ui.act_file_inspect.triggered.connect(self.slot_fileInspect)
+        self.ui.act_file_link_export.triggered.connect(self.slot_fileExportLinkStats)
+
+        self.fLinkMonitor.updated.connect(self.slot_linkUpdated)
+        self.fLinkMonitor.linkLost.connect(self.slot_linkLost)
+        self.fReconnect.reconnect.connect(self.slot_reconnect)
 
         self.ui.act_settings_configure.triggered.connect(self.slot_configure)
 
@@ -283,10 +319,19 @@ class RemoteWindow(QMainWindow):
         if not dialog.exec_():
             return
 
+        self.fReconnect.reset()
+        self.fReconnecting  = False
+        self.fWasConnected  = False
+        self.fLastViewURL   = dialog.getAddress()
+        self.fLastScrollPos = QPoint()
+
         self.ui.webview.loadStarted.connect(self.slot_webviewLoadStarted)
         self.ui.webview.loadProgress.connect(self.slot_webviewLoadProgress)
         self.ui.webview.loadFinished.connect(self.slot_webviewLoadFinished)
 
+        self.fRemoteURL = dialog.getAddress().toString()
+        self.setProperWindowTitle()
+
         self.ui.w_buttons.setEnabled(False)
         self.ui.webview.load(dialog.getAddress())
         self.ui.stackedwidget.setCurrentIndex(1)
@@ -294,6 +339,11 @@ class RemoteWindow(QMainWindow):
         # allow to disconnect
         self.ui.act_file_disconnect.setEnabled(True)
 
+        # start measuring the link right away, so slow loads can be diagnosed too
+        self.fLinkMonitor.start(self.fRemoteURL)
+        self.ui.act_file_link_export.setEnabled(True)
+        self.statusBar().show()
+
     @pyqtSlot()
     def slot_fileDisconnect(self):
         try:
@@ -310,6 +360,18 @@ class RemoteWindow(QMainWindow):
         # testing cyan color for disconnected
         self.ui.webview.setHtml("<html><body bgcolor='cyan'></body></html>")
 
+        self.fLinkMonitor.stop()
+        self.ui.label_link.setText("")
+        self.statusBar().hide()
+
+        self.fReconnect.reset()
+        self.fReconnecting = False
+        self.fWasConnected = False
+        self.ui.webnetwork.setPreferCache(False)
+
+        self.fRemoteURL = ""
+        self.setProperWindowTitle()
+
         # disable file menu
         self.ui.act_file_disconnect.setEnabled(False)
         self.ui.act_file_refresh.setEnabled(False)
@@ -323,16 +385,26 @@ class RemoteWindow(QMainWindow):
     def slot_fileInspect(self):
         self.ui.webinspector.show()
 
+    @pyqtSlot()
+    def slot_fileExportLinkStats(self):
+        filename, ok = QFileDialog.getSaveFileName(self, self.tr("Export link statistics"), "link-stats.json",
+                                                   self.tr("JSON files (*.json);;CSV files (*.csv)"))
+        if not filename:
+            return
+
+        try:
+            self.fLinkMonitor.exportToFile(filename)
+        except IOError as e:
+            QMessageBox.critical(self, self.tr("Error"), self.tr("Failed to export link statistics:\n%s") % str(e))
+
     # --------------------------------------------------------------------------------------------------------
     # Settings (menu actions)
 
     @pyqtSlot()
     def slot_configure(self):
+        # changes are applied through slot_settingChanged
         dialog = SettingsWindow(self, False)
-        if not dialog.exec_():
-            return
-
-        self.loadSettings(False)
+        dialog.exec_()
 
     # --------------------------------------------------------------------------------------------------------
     # About (menu actions)
@@ -379,8 +451,24 @@ class RemoteWindow(QMainWindow):
         self.ui.webview.loadFinished.disconnect(self.slot_webviewLoadFinished)
 
         self.ui.w_buttons.setEnabled(True)
+        self.ui.webnetwork.setPreferCache(False)
+
+        if not ok and self.fWasConnected and self.fSettings.value(MOD_KEY_REMOTE_AUTO_RECONNECT):
+            # we're going to try again, keep the current menu state
+            self.scheduleReconnect()
+            return
 
         if ok:
+            if self.fReconnecting:
+                self.ui.webpage.mainFrame().setScrollPosition(self.fLastScrollPos)
+                self.fReconnecting = False
+
+            self.fReconnect.reset()
+            self.fWasConnected = True
+
+            if not self.fLinkMonitor.isRunning():
+                self.fLinkMonitor.start(self.fRemoteURL)
+
             # enable file menu
             self.ui.act_file_disconnect.setEnabled(True)
             self.ui.act_file_refresh.setEnabled(True)
@@ -402,6 +490,58 @@ class RemoteWindow(QMainWindow):
 
         print("load finished")
 
+    # --------------------------------------------------------------------------------------------------------
+    # Reconnect
+
+    @pyqtSlot()
+    def slot_linkLost(self):
+        if not self.fWasConnected or self.fReconnecting:
+            return
+        if not self.fSettings.value(MOD_KEY_REMOTE_AUTO_RECONNECT):
+            return
+
+        # remember where the user was, so we can go back there after reconnecting
+        self.fLastViewURL   = self.ui.webpage.mainFrame().url()
+        self.fLastScrollPos = self.ui.webpage.mainFrame().scrollPosition()
+
+        self.scheduleReconnect()
+
+    @pyqtSlot()
+    def slot_reconnect(self):
+        if not self.fRemoteURL:
+            return
+
+        self.ui.webview.loadStarted.connect(self.slot_webviewLoadStarted)
+        self.ui.webview.loadProgress.connect(self.slot_webviewLoadProgress)
+        self.ui.webview.loadFinished.connect(self.slot_webviewLoadFinished)
+
+        # assets from the previous connection are still good, don't wait for the network to revalidate them
+        self.ui.webnetwork.setPreferCache(True)
+        self.ui.webview.load(self.fLastViewURL if self.fLastViewURL.isValid() else QUrl(self.fRemoteURL))
+
+    def scheduleReconnect(self):
+        self.fReconnecting = True
+        self.fLinkMonitor.stop()
+
+        delay = self.fReconnect.schedule()
+
+        self.ui.stackedwidget.setCurrentIndex(0)
+        self.ui.act_file_disconnect.setEnabled(True)
+        self.ui.label_progress.setText(self.tr("Connection lost, reconnecting in %.1f s (attempt %i)...") % (delay / 1000.0,
+                                                                                                            self.fReconnect.getAttempt()))
+
+    # --------------------------------------------------------------------------------------------------------
+    # Link monitor
+
+    @pyqtSlot()
+    def slot_linkUpdated(self):
+        stats = self.fLinkMonitor.getStats()
+        self.ui.label_link.setText(self.fLinkMonitor.getSummaryText())
+
+        # full table in the tooltip, the label itself should stay compact
+        self.ui.label_link.setToolTip(self.tr("Probes: %i, lost: %i\nRTT p50/p95/max: %s / %s / %s ms") % (
+                                      stats['probes'], stats['lost'], stats['rtt_p50'], stats['rtt_p95'], stats['rtt_max']))
+
     # --------------------------------------------------------------------------------------------------------
     # Settings
 
@@ -411,31 +551,39 @@ class RemoteWindow(QMainWindow):
         settings.setValue("Geometry", self.saveGeometry())
 
     def loadSettings(self, firstTime):
-        qsettings   = QSettings()
-        websettings = self.ui.webview.settings()
+        qsettings = QSettings()
 
-        self.fSavedSettings = {
-            # WebView
-            MOD_KEY_WEBVIEW_INSPECTOR:      qsettings.value(MOD_KEY_WEBVIEW_INSPECTOR,      MOD_DEFAULT_WEBVIEW_INSPECTOR,      type=bool),
-            MOD_KEY_WEBVIEW_SHOW_INSPECTOR: qsettings.value(MOD_KEY_WEBVIEW_SHOW_INSPECTOR, MOD_DEFAULT_WEBVIEW_SHOW_INSPECTOR, type=bool)
-        }
-
-        inspectorEnabled = self.fSavedSettings[MOD_KEY_WEBVIEW_INSPECTOR] and not USING_LIVE_ISO
-
-        websettings.setAttribute(QWebSettings.DeveloperExtrasEnabled, inspectorEnabled)
+        for key in (MOD_KEY_WEBVIEW_INSPECTOR,
+                    MOD_KEY_WEBVIEW_DISK_CACHE,
+                    MOD_KEY_WEBVIEW_MEMORY_CACHE):
+            self.slot_settingChanged(key, self.fSettings.value(key))
 
         if firstTime:
             self.restoreGeometry(qsettings.value("Geometry", ""))
 
-            if inspectorEnabled and self.fSavedSettings[MOD_KEY_WEBVIEW_SHOW_INSPECTOR]:
+            if self.isInspectorEnabled() and self.fSettings.value(MOD_KEY_WEBVIEW_SHOW_INSPECTOR):
                 QTimer.singleShot(1000, self.ui.webinspector.show)
 
-        self.ui.act_file_inspect.setVisible(inspectorEnabled)
+    @pyqtSlot(str, object)
+    def slot_settingChanged(self, key, value):
+        if key == MOD_KEY_WEBVIEW_INSPECTOR:
+            inspectorEnabled = self.isInspectorEnabled()
+            self.ui.webview.settings().setAttribute(QWebSettings.DeveloperExtrasEnabled, inspectorEnabled)
+            self.ui.act_file_inspect.setVisible(inspectorEnabled)
+
+            if not inspectorEnabled:
+                self.ui.webinspector.hide()
+
+        elif key == MOD_KEY_WEBVIEW_DISK_CACHE:
+            self.ui.webnetwork.setDiskCacheSize(value * 1024 * 1024)
 
-        if self.fIdleTimerId != 0:
-            self.killTimer(self.fIdleTimerId)
+        elif key == MOD_KEY_WEBVIEW_MEMORY_CACHE:
+            setWebMemoryCacheSize(value * 1024 * 1024)
 
-        self.fIdleTimerId = self.startTimer(MOD_DEFAULT_MAIN_REFRESH_INTERVAL)
+        # auto-reconnect is read each time the link drops
+
+    def isInspectorEnabled(self):
+        return self.fSettings.value(MOD_KEY_WEBVIEW_INSPECTOR) and not USING_LIVE_ISO
 
     # --------------------------------------------------------------------------------------------------------
     # Misc
@@ -449,9 +597,10 @@ class RemoteWindow(QMainWindow):
     # Qt events
 
     def closeEvent(self, event):
-        if self.fIdleTimerId != 0:
-            self.killTimer(self.fIdleTimerId)
-            self.fIdleTimerId = 0
+        self.fLinkMonitor.stop()
+        self.fReconnect.reset()
+        self.fScheduler.stop()
+        self.fSettings.flush()
 
         self.saveSettings()
 
@@ -461,12 +610,6 @@ class RemoteWindow(QMainWindow):
         #self.ui.webinspector.close()
         QApplication.instance().quit()
 
-    def timerEvent(self, event):
-        if event.timerId() == self.fIdleTimerId:
-            pass
-
-        QMainWindow.timerEvent(self, event)
-
     def resizeEvent(self, event):
         QMainWindow.resizeEvent(self, event)
         self.fixWebViewSize()
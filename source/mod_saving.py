@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Custom)
+
+from mod_network import isStaticAssetPath
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import json
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QElapsedTimer, QObject, QTimer
+from PyQt5.QtNetwork import QNetworkReply
+
+# ------------------------------------------------------------------------------------------------------------
+
+# mod-ui url that saves the current pedalboard
+SAVE_URL_PATH = "/pedalboard/save"
+
+# time for the save request to finish, and for an autosave to send it (in ms)
+SAVE_TIMEOUT         = 30000
+SAVE_REQUEST_TIMEOUT = 5000
+
+# manual saves may show a title dialog first, after this long without a request it was probably cancelled
+SAVE_DIALOG_TIMEOUT  = 300000
+
+# how often the page is checked for unsaved changes while autosave is on (in ms)
+AUTOSAVE_CHECK_INTERVAL = 1000
+
+# only pedalboards that were saved before can be saved without asking for a title
+JS_NEEDS_AUTOSAVE = "!!(window.desktop && desktop.pedalboardModified && desktop.pedalboardBundle)"
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard Saver
+# Turns mod-ui's fire-and-forget save into an operation with a result. The save is started through javascript,
+# and tracked from the matching request seen by the network manager, so saves started from the web UI itself are
+# tracked as well. Its outcome is the response the page got, reported by the page's hooks (see slot_saveResponse).
+# Autosave is debounced: it waits until the pedalboard has unsaved changes and no edit requests were made for
+# the configured delay, so a burst of edits becomes a single save. Nothing is written while there are no changes.
+
+class PedalboardSaver(QObject):
+    # signals
+    saveStarted  = pyqtSignal(str)
+    saveFinished = pyqtSignal(bool, int, str) # ok, duration in ms, bundle path or error message
+
+    def __init__(self, parent, networkManager, scheduler):
+        QObject.__init__(self, parent)
+
+        self.fScheduler = scheduler
+        self.fFrame     = None
+        self.fReply     = None
+        self.fReason    = ""
+        self.fSaving    = False
+        self.fTimer     = QElapsedTimer()
+
+        # autosave delay in ms, 0 means off
+        self.fAutosaveDelay = 0
+        self.fActivityTimer = QElapsedTimer()
+        self.fDirtyTimer    = QElapsedTimer()
+
+        # last result, (ok, duration, message)
+        self.fLastResult = None
+        self.fSaveCount  = 0
+
+        self.fTimeoutTimer = QTimer(self)
+        self.fTimeoutTimer.setSingleShot(True)
+        self.fTimeoutTimer.timeout.connect(self.slot_timeout)
+
+        networkManager.requestCreated.connect(self.slot_requestCreated)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Set the frame to run javascript in, None while there's no UI to save from
+    def setFrame(self, frame):
+        self.fFrame = frame
+
+        if frame is None and self.fSaving:
+            self.finishSave(False, self.tr("UI was closed"))
+
+        self.fDirtyTimer.invalidate()
+        self.updateTask()
+
+    def setAutosaveDelay(self, seconds):
+        self.fAutosaveDelay = max(0, seconds) * 1000
+        self.updateTask()
+
+    def isSaving(self):
+        return self.fSaving
+
+    def getLastResult(self):
+        return self.fLastResult
+
+    def getSaveCount(self):
+        return self.fSaveCount
+
+    # Start saving the current pedalboard, the result comes through saveFinished
+    def save(self, saveAs=False, reason="manual"):
+        if self.fFrame is None:
+            return False
+
+        # a manual save that is still waiting for its dialog can be started over
+        if self.fSaving and (self.fReply is not None or self.fReason == "autosave"):
+            return False
+
+        self.startSave(reason)
+
+        # autosaves never show a dialog, so their request must show up soon
+        self.fTimeoutTimer.start(SAVE_REQUEST_TIMEOUT if reason == "autosave" else SAVE_DIALOG_TIMEOUT)
+
+        self.fFrame.evaluateJavaScript("desktop.saveCurrentPedalboard(%s)" % ("true" if saveAs else "false"))
+        return True
+
+    # Something was edited, postpones the next autosave
+    def noteActivity(self):
+        self.fActivityTimer.start()
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def startSave(self, reason):
+        self.fSaving = True
+        self.fReason = reason
+        self.fReply  = None
+        self.fTimer.start()
+        self.fTimeoutTimer.stop()
+        self.saveStarted.emit(reason)
+
+    def finishSave(self, ok, message):
+        duration = self.fTimer.elapsed()
+
+        if self.fReply is not None:
+            self.fReply.finished.disconnect(self.slot_replyFinished)
+            self.fReply = None
+
+        self.fSaving = False
+        self.fTimeoutTimer.stop()
+        self.fLastResult = (ok, duration, message)
+
+        if ok:
+            self.fSaveCount += 1
+            self.fDirtyTimer.invalidate()
+
+        print("pedalboard %s %s in %i ms: %s" % (self.fReason, "save finished" if ok else "save failed", duration, message))
+        self.saveFinished.emit(ok, duration, message)
+
+    def updateTask(self):
+        wanted = self.fAutosaveDelay > 0 and self.fFrame is not None
+
+        if wanted and not self.fScheduler.hasTask("autosave"):
+            self.fScheduler.addTask("autosave", AUTOSAVE_CHECK_INTERVAL, self.checkAutosave)
+        elif not wanted and self.fScheduler.hasTask("autosave"):
+            self.fScheduler.removeTask("autosave")
+
+    def checkAutosave(self):
+        if self.fFrame is None or self.fSaving:
+            return
+
+        if not self.fFrame.evaluateJavaScript(JS_NEEDS_AUTOSAVE):
+            self.fDirtyTimer.invalidate()
+            return
+
+        if not self.fDirtyTimer.isValid():
+            self.fDirtyTimer.start()
+
+        # wait for the edits to settle
+        if self.fDirtyTimer.elapsed() < self.fAutosaveDelay:
+            return
+        if self.fActivityTimer.isValid() and self.fActivityTimer.elapsed() < self.fAutosaveDelay:
+            return
+
+        self.save(reason="autosave")
+
+    # --------------------------------------------------------------------------------------------------------
+
+    @pyqtSlot(int, QNetworkReply)
+    def slot_requestCreated(self, op, reply):
+        path = reply.url().path()
+
+        if path != SAVE_URL_PATH:
+            if not isStaticAssetPath(path):
+                self.noteActivity()
+            return
+
+        # started from the web UI
+        if not self.fSaving:
+            self.startSave("ui")
+
+        self.fReply = reply
+        self.fReply.finished.connect(self.slot_replyFinished)
+        self.fTimeoutTimer.start(SAVE_TIMEOUT)
+
+    # Only network errors are taken from the reply, its body is read by the page
+    @pyqtSlot()
+    def slot_replyFinished(self):
+        reply = self.fReply
+
+        if reply is None:
+            return
+
+        if reply.error() != QNetworkReply.NoError:
+            self.finishSave(False, reply.errorString())
+
+    # The page got the response to its save request, @a status is 0 if there was none
+    @pyqtSlot(int, str)
+    def slot_saveResponse(self, status, body):
+        if self.fReply is None:
+            return
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+
+        if isinstance(data, dict):
+            if data.get('ok', False):
+                self.finishSave(True, data.get('bundlepath', ""))
+            else:
+                self.finishSave(False, data.get('error', self.tr("not saved by the server")))
+            return
+
+        self.finishSave(status == 200, "" if status == 200 else self.tr("server returned %s") % status)
+
+    @pyqtSlot()
+    def slot_timeout(self):
+        if self.fReply is not None:
+            self.finishSave(False, self.tr("timed out"))
+
+        elif self.fReason == "autosave":
+            self.finishSave(False, self.tr("save was not started"))
+
+        else:
+            # the user cancelled the dialog, not an error
+            print("pedalboard save was not sent, assuming it was cancelled")
+            self.fSaving = False
+
+# ------------------------------------------------------------------------------------------------------------
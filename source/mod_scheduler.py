@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import signal
+import socket
+import traceback
+
+from PyQt5.QtCore import pyqtSlot, QElapsedTimer, QObject, QSocketNotifier, QTimer
+
+# ------------------------------------------------------------------------------------------------------------
+# Idle Scheduler
+# Replaces fixed-rate idle timers. Periodic tasks register the rate they need, and a single-shot timer is armed
+# for the earliest due task only. Tasks that become due within the resolution window of each other run in the
+# same wakeup, and when there are no tasks the timer is not running at all.
+
+class IdleScheduler(QObject):
+    def __init__(self, parent, resolution=30):
+        QObject.__init__(self, parent)
+
+        # name -> [interval, callback, next due time, enabled]
+        self.fTasks = {}
+
+        # minimum time between wakeups, also used to coalesce tasks, in ms
+        self.fResolution = resolution
+
+        self.fClock = QElapsedTimer()
+        self.fClock.start()
+
+        self.fLastRun = -resolution
+
+        self.fTimer = QTimer(self)
+        self.fTimer.setSingleShot(True)
+        self.fTimer.timeout.connect(self.slot_run)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def addTask(self, name, interval, callback):
+        self.fTasks[name] = [interval, callback, self.fClock.elapsed() + interval, True]
+        self.rearm()
+
+    def removeTask(self, name):
+        if self.fTasks.pop(name, None) is not None:
+            self.rearm()
+
+    def hasTask(self, name):
+        return name in self.fTasks
+
+    def setTaskEnabled(self, name, enabled):
+        task = self.fTasks.get(name)
+
+        if task is None or task[3] == enabled:
+            return
+
+        task[3] = enabled
+        task[2] = self.fClock.elapsed() + task[0]
+        self.rearm()
+
+    def setResolution(self, resolution):
+        self.fResolution = resolution
+        self.rearm()
+
+    def stop(self):
+        self.fTasks = {}
+        self.fTimer.stop()
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def rearm(self):
+        dues = [task[2] for task in self.fTasks.values() if task[3]]
+
+        if len(dues) == 0:
+            self.fTimer.stop()
+            return
+
+        now   = self.fClock.elapsed()
+        delay = max(min(dues) - now, self.fLastRun + self.fResolution - now, 0)
+
+        self.fTimer.start(delay)
+
+    @pyqtSlot()
+    def slot_run(self):
+        now = self.fClock.elapsed()
+
+        self.fLastRun = now
+
+        for name, task in list(self.fTasks.items()):
+            # removed by a previous callback
+            if name not in self.fTasks:
+                continue
+            if not task[3] or task[2] > now + self.fResolution:
+                continue
+
+            # schedule from now, a late wakeup doesn't cause a burst of catch-up runs
+            task[2] = now + task[0]
+
+            try:
+                task[1]()
+            except:
+                traceback.print_exc()
+
+        self.rearm()
+
+# ------------------------------------------------------------------------------------------------------------
+# Signal Wakeup
+# Python signal handlers only run when the main thread executes Python code, which an idle Qt event loop never
+# does, so without a periodic timer a signal would wait for the next unrelated event. The C-level handler writes
+# the signal number to a socket (signal.set_wakeup_fd), and a QSocketNotifier on the other end runs a Python slot,
+# which lets the pending handlers run right away.
+
+class SignalWakeup(QObject):
+    def __init__(self, parent):
+        QObject.__init__(self, parent)
+
+        self.fReader, self.fWriter = socket.socketpair()
+        self.fReader.setblocking(False)
+        self.fWriter.setblocking(False)
+
+        self.fOldWakeupFd = signal.set_wakeup_fd(self.fWriter.fileno())
+
+        self.fNotifier = QSocketNotifier(self.fReader.fileno(), QSocketNotifier.Read, self)
+        self.fNotifier.activated.connect(self.slot_wakeup)
+
+    @pyqtSlot(int)
+    def slot_wakeup(self, fd):
+        # the handlers have run by now, the data is just the signal numbers
+        try:
+            while self.fReader.recv(4096):
+                pass
+        except OSError:
+            pass
+
+    def close(self):
+        if self.fNotifier is None:
+            return
+
+        signal.set_wakeup_fd(self.fOldWakeupFd)
+
+        self.fNotifier.setEnabled(False)
+        self.fNotifier = None
+
+        self.fReader.close()
+        self.fWriter.close()
+
+# ------------------------------------------------------------------------------------------------------------
@@ -19,7 +19,10 @@
 # ------------------------------------------------------------------------------------------------------------
 # Imports (Custom)
 
-from mod_common import *
+from mod_config import *
+from mod_affinity import SCHED_SUPPORTED, parseCpuList
+from mod_eventloop import ASYNCIO_DRIVER_SUPPORTED
+from mod_webserver import WEBSERVER_PROCESS_SUPPORTED
 
 # ------------------------------------------------------------------------------------------------------------
 # Imports (Global)
@@ -54,6 +57,8 @@ class SettingsWindow(QDialog):
         self.ui = Ui_SettingsWindow()
         self.ui.setupUi(self)
 
+        self.fSettings = getSettingsStore("MOD-App" if isApp else "MOD-Remote")
+
         # ----------------------------------------------------------------------------------------------------
         # Set up GUI
 
@@ -65,6 +70,13 @@ class SettingsWindow(QDialog):
             self.ui.cb_webview_verbose.setEnabled(False)
             self.ui.cb_webview_verbose.setVisible(False)
 
+        # only Linux has CPU affinity and per-thread scheduling
+        if not SCHED_SUPPORTED:
+            self.ui.group_host_scheduling.setEnabled(False)
+
+        if not ASYNCIO_DRIVER_SUPPORTED:
+            self.ui.cb_host_webserver_integrated.setEnabled(False)
+
         # ----------------------------------------------------------------------------------------------------
         # Load Settings
 
@@ -78,6 +90,7 @@ class SettingsWindow(QDialog):
 
         self.ui.tb_main_proj_folder_open.clicked.connect(self.slot_getAndSetProjectPath)
         self.ui.tb_host_path.clicked.connect(self.slot_getAndSetIngenPath)
+        self.ui.cb_host_webserver_integrated.toggled.connect(self.slot_updateWebServerOptions)
 
         # ----------------------------------------------------------------------------------------------------
         # Post-connect setup
@@ -87,49 +100,75 @@ class SettingsWindow(QDialog):
     # --------------------------------------------------------------------------------------------------------
 
     def loadSettings(self):
-        settings = QSettings()
+        settings = self.fSettings
 
         # ----------------------------------------------------------------------------------------------------
         # Main
 
-        self.ui.le_main_proj_folder.setText(settings.value(MOD_KEY_MAIN_PROJECT_FOLDER, MOD_DEFAULT_MAIN_PROJECT_FOLDER, type=str))
-        self.ui.sb_main_refresh_interval.setValue(settings.value(MOD_KEY_MAIN_REFRESH_INTERVAL, MOD_DEFAULT_MAIN_REFRESH_INTERVAL, type=int))
+        self.ui.le_main_proj_folder.setText(settings.value(MOD_KEY_MAIN_PROJECT_FOLDER))
+        self.ui.sb_main_refresh_interval.setValue(settings.value(MOD_KEY_MAIN_REFRESH_INTERVAL))
+        self.ui.sb_main_autosave_delay.setValue(settings.value(MOD_KEY_MAIN_AUTOSAVE_DELAY))
+        self.ui.cb_main_low_memory.setChecked(settings.value(MOD_KEY_MAIN_LOW_MEMORY))
+        self.ui.cb_main_deduplicate.setChecked(settings.value(MOD_KEY_PEDALBOARD_DEDUPLICATE))
 
         # ----------------------------------------------------------------------------------------------------
         # Host
 
-        self.ui.cb_host_verbose.setChecked(settings.value(MOD_KEY_HOST_VERBOSE, MOD_DEFAULT_HOST_VERBOSE, type=bool))
+        self.ui.cb_host_verbose.setChecked(settings.value(MOD_KEY_HOST_VERBOSE))
+        self.ui.cb_host_webserver_process.setChecked(settings.value(MOD_KEY_HOST_WEBSERVER_PROCESS))
+        self.ui.cb_host_webserver_integrated.setChecked(settings.value(MOD_KEY_HOST_WEBSERVER_INTEGRATED))
+        self.slot_updateWebServerOptions()
 
-        hostPath = settings.value(MOD_KEY_HOST_PATH, MOD_DEFAULT_HOST_PATH, type=str)
+        hostPath = settings.value(MOD_KEY_HOST_PATH)
         if hostPath.endswith("ingen"):
             hostPath = MOD_DEFAULT_HOST_PATH
         self.ui.le_host_path.setText(hostPath)
 
+        self.ui.le_host_cpus.setText(settings.value(MOD_KEY_HOST_CPUS))
+        self.ui.sb_host_nice.setValue(settings.value(MOD_KEY_HOST_NICE))
+        self.ui.sb_host_realtime_priority.setValue(settings.value(MOD_KEY_HOST_REALTIME_PRIORITY))
+        self.ui.cb_host_isolate_gui.setChecked(settings.value(MOD_KEY_HOST_ISOLATE_GUI))
+
         # ----------------------------------------------------------------------------------------------------
         # WebView
 
-        self.ui.cb_webview_inspector.setChecked(settings.value(MOD_KEY_WEBVIEW_INSPECTOR, MOD_DEFAULT_WEBVIEW_INSPECTOR, type=bool))
-        self.ui.cb_webview_verbose.setChecked(settings.value(MOD_KEY_WEBVIEW_VERBOSE, MOD_DEFAULT_WEBVIEW_VERBOSE, type=bool))
-        self.ui.cb_webview_show_inspector.setChecked(settings.value(MOD_KEY_WEBVIEW_SHOW_INSPECTOR, MOD_DEFAULT_WEBVIEW_SHOW_INSPECTOR, type=bool))
+        self.ui.cb_webview_inspector.setChecked(settings.value(MOD_KEY_WEBVIEW_INSPECTOR))
+        self.ui.cb_webview_verbose.setChecked(settings.value(MOD_KEY_WEBVIEW_VERBOSE))
+        self.ui.cb_webview_show_inspector.setChecked(settings.value(MOD_KEY_WEBVIEW_SHOW_INSPECTOR))
         self.ui.cb_webview_show_inspector.setEnabled(self.ui.cb_webview_inspector.isChecked())
+        self.ui.sb_webview_disk_cache.setValue(settings.value(MOD_KEY_WEBVIEW_DISK_CACHE))
+        self.ui.sb_webview_memory_cache.setValue(settings.value(MOD_KEY_WEBVIEW_MEMORY_CACHE))
 
     # --------------------------------------------------------------------------------------------------------
 
     @pyqtSlot()
     def slot_saveSettings(self):
-        settings = QSettings()
+        settings = self.fSettings
 
         # ----------------------------------------------------------------------------------------------------
         # Main
 
         settings.setValue(MOD_KEY_MAIN_PROJECT_FOLDER,   self.ui.le_main_proj_folder.text())
         settings.setValue(MOD_KEY_MAIN_REFRESH_INTERVAL, self.ui.sb_main_refresh_interval.value())
+        settings.setValue(MOD_KEY_MAIN_AUTOSAVE_DELAY,   self.ui.sb_main_autosave_delay.value())
+        settings.setValue(MOD_KEY_MAIN_LOW_MEMORY,       self.ui.cb_main_low_memory.isChecked())
+        settings.setValue(MOD_KEY_PEDALBOARD_DEDUPLICATE, self.ui.cb_main_deduplicate.isChecked())
 
         # ----------------------------------------------------------------------------------------------------
         # Host
 
         settings.setValue(MOD_KEY_HOST_VERBOSE, self.ui.cb_host_verbose.isChecked())
         settings.setValue(MOD_KEY_HOST_PATH,    self.ui.le_host_path.text())
+        settings.setValue(MOD_KEY_HOST_WEBSERVER_PROCESS, self.ui.cb_host_webserver_process.isChecked())
+        settings.setValue(MOD_KEY_HOST_WEBSERVER_INTEGRATED, self.ui.cb_host_webserver_integrated.isChecked())
+
+        # invalid CPU lists are not saved
+        if parseCpuList(self.ui.le_host_cpus.text()) is not None:
+            settings.setValue(MOD_KEY_HOST_CPUS, self.ui.le_host_cpus.text().strip())
+
+        settings.setValue(MOD_KEY_HOST_NICE,              self.ui.sb_host_nice.value())
+        settings.setValue(MOD_KEY_HOST_REALTIME_PRIORITY, self.ui.sb_host_realtime_priority.value())
+        settings.setValue(MOD_KEY_HOST_ISOLATE_GUI,       self.ui.cb_host_isolate_gui.isChecked())
 
         # ----------------------------------------------------------------------------------------------------
         # WebView
@@ -137,6 +176,8 @@ class SettingsWindow(QDialog):
         settings.setValue(MOD_KEY_WEBVIEW_INSPECTOR,      self.ui.cb_webview_inspector.isChecked())
         settings.setValue(MOD_KEY_WEBVIEW_VERBOSE,        self.ui.cb_webview_verbose.isChecked())
         settings.setValue(MOD_KEY_WEBVIEW_SHOW_INSPECTOR, self.ui.cb_webview_show_inspector.isChecked())
+        settings.setValue(MOD_KEY_WEBVIEW_DISK_CACHE,     self.ui.sb_webview_disk_cache.value())
+        settings.setValue(MOD_KEY_WEBVIEW_MEMORY_CACHE,   self.ui.sb_webview_memory_cache.value())
 
     # --------------------------------------------------------------------------------------------------------
 
@@ -148,13 +189,22 @@ class SettingsWindow(QDialog):
         if self.ui.lw_page.currentRow() == self.TAB_INDEX_MAIN:
             self.ui.le_main_proj_folder.setText(MOD_DEFAULT_MAIN_PROJECT_FOLDER)
             self.ui.sb_main_refresh_interval.setValue(MOD_DEFAULT_MAIN_REFRESH_INTERVAL)
+            self.ui.sb_main_autosave_delay.setValue(MOD_DEFAULT_MAIN_AUTOSAVE_DELAY)
+            self.ui.cb_main_low_memory.setChecked(MOD_DEFAULT_MAIN_LOW_MEMORY)
+            self.ui.cb_main_deduplicate.setChecked(MOD_DEFAULT_PEDALBOARD_DEDUPLICATE)
 
         # ----------------------------------------------------------------------------------------------------
         # Host
 
         elif self.ui.lw_page.currentRow() == self.TAB_INDEX_HOST:
             self.ui.cb_host_verbose.setChecked(MOD_DEFAULT_HOST_VERBOSE)
+            self.ui.cb_host_webserver_process.setChecked(MOD_DEFAULT_HOST_WEBSERVER_PROCESS)
+            self.ui.cb_host_webserver_integrated.setChecked(MOD_DEFAULT_HOST_WEBSERVER_INTEGRATED)
             self.ui.le_host_path.setText(MOD_DEFAULT_HOST_PATH)
+            self.ui.le_host_cpus.setText(MOD_DEFAULT_HOST_CPUS)
+            self.ui.sb_host_nice.setValue(MOD_DEFAULT_HOST_NICE)
+            self.ui.sb_host_realtime_priority.setValue(MOD_DEFAULT_HOST_REALTIME_PRIORITY)
+            self.ui.cb_host_isolate_gui.setChecked(MOD_DEFAULT_HOST_ISOLATE_GUI)
 
         # ----------------------------------------------------------------------------------------------------
         # WebView
@@ -163,6 +213,8 @@ class SettingsWindow(QDialog):
             self.ui.cb_webview_inspector.setChecked(MOD_DEFAULT_WEBVIEW_INSPECTOR)
             self.ui.cb_webview_verbose.setChecked(MOD_DEFAULT_WEBVIEW_VERBOSE)
             self.ui.cb_webview_show_inspector.setChecked(MOD_DEFAULT_WEBVIEW_SHOW_INSPECTOR)
+            self.ui.sb_webview_disk_cache.setValue(MOD_DEFAULT_WEBVIEW_DISK_CACHE)
+            self.ui.sb_webview_memory_cache.setValue(MOD_DEFAULT_WEBVIEW_MEMORY_CACHE)
 
     # --------------------------------------------------------------------------------------------------------
 
@@ -190,6 +242,12 @@ class SettingsWindow(QDialog):
 
         self.ui.le_host_path.setText(path)
 
+    # the integrated event loop takes precedence over a separate process
+    @pyqtSlot()
+    def slot_updateWebServerOptions(self):
+        self.ui.cb_host_webserver_process.setEnabled(WEBSERVER_PROCESS_SUPPORTED and
+                                                     not self.ui.cb_host_webserver_integrated.isChecked())
+
     # --------------------------------------------------------------------------------------------------------
 
     def done(self, r):
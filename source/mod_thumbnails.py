@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import os
+import time
+
+from urllib.parse import quote
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QEvent, QObject, QSize, QTimer, QUrl
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWebKit import QWebSettings
+from PyQt5.QtWebKitWidgets import QWebPage
+
+# ------------------------------------------------------------------------------------------------------------
+
+# time between jobs, and the pause after each batch of jobs (in ms)
+THUMBNAIL_JOB_INTERVAL  = 2000
+THUMBNAIL_BATCH_SIZE    = 10
+THUMBNAIL_BATCH_PAUSE   = 60000
+
+# jobs only run after this long without user input (in seconds)
+THUMBNAIL_IDLE_TIME     = 5
+
+# time given to the pedalboard page to build itself after loading, and the time a single job may take (in ms)
+THUMBNAIL_RENDER_DELAY  = 3000
+THUMBNAIL_JOB_TIMEOUT   = 30000
+
+# at most this many bundles are checked for staleness in a single tick
+THUMBNAIL_CHECKS_PER_TICK = 200
+
+SCREENSHOT_MAX_SIZE = QSize(3000, 3000)
+THUMBNAIL_WIDTH     = 640
+
+NS_MODGUI = "http://moddevices.com/ns/modgui#"
+
+# ------------------------------------------------------------------------------------------------------------
+# Find pedalboard bundles in LV2_PATH, including the ones mod-ui refuses to list (because they have no thumbnail)
+
+def findPedalboardBundles():
+    paths   = os.getenv("LV2_PATH", "").split(os.pathsep) + [os.path.expanduser("~/.pedalboards")]
+    bundles = []
+
+    for path in paths:
+        if not path or not os.path.isdir(path):
+            continue
+
+        try:
+            for entry in os.scandir(path):
+                if entry.name.endswith(".pedalboard") and entry.is_dir():
+                    bundles.append(entry.path)
+        except OSError:
+            continue
+
+    return bundles
+
+# ------------------------------------------------------------------------------------------------------------
+# The pedalboard ttl of a bundle (the one that is not the manifest)
+
+def getPedalboardTTL(bundle):
+    for entry in os.scandir(bundle):
+        if entry.name.endswith(".ttl") and entry.name != "manifest.ttl":
+            return entry.path
+
+    return None
+
+# ------------------------------------------------------------------------------------------------------------
+# Check if a bundle needs new images: missing, or older than the pedalboard ttl
+
+def needsThumbnail(bundle):
+    try:
+        ttl = getPedalboardTTL(bundle)
+
+        if ttl is None:
+            return False
+
+        ttlTime = os.stat(ttl).st_mtime
+
+    except OSError:
+        return False
+
+    for filename in ("thumbnail.png", "screenshot.png"):
+        try:
+            if os.stat(os.path.join(bundle, filename)).st_mtime < ttlTime:
+                return True
+        except OSError:
+            return True
+
+    return False
+
+# ------------------------------------------------------------------------------------------------------------
+# Write a file by replacing it, so readers never see a partial one
+
+def writeFileAtomically(filename, data):
+    tmpFile = filename + ".tmp"
+
+    with open(tmpFile, 'wb') as fh:
+        fh.write(data)
+
+    os.replace(tmpFile, filename)
+
+def saveImageAtomically(image, filename):
+    tmpFile = filename + ".tmp"
+
+    if not image.save(tmpFile, "PNG"):
+        return False
+
+    os.replace(tmpFile, filename)
+    return True
+
+# ------------------------------------------------------------------------------------------------------------
+# Reference the images from the pedalboard ttl if it doesn't yet, so mod-ui accepts the bundle
+
+def addImageTriples(ttl):
+    with open(ttl, 'rb') as fh:
+        data = fh.read()
+
+    extra = b""
+
+    # full URIs, the ttl may not have declared the modgui prefix
+    if b"modgui:thumbnail" not in data and (NS_MODGUI + "thumbnail").encode("utf-8") not in data:
+        extra += ("\n<> <%sthumbnail> <thumbnail.png> .\n" % NS_MODGUI).encode("utf-8")
+    if b"modgui:screenshot" not in data and (NS_MODGUI + "screenshot").encode("utf-8") not in data:
+        extra += ("\n<> <%sscreenshot> <screenshot.png> .\n" % NS_MODGUI).encode("utf-8")
+
+    if not extra:
+        return False
+
+    # keep the ttl older than the images, otherwise the bundle would always look stale
+    stat = os.stat(ttl)
+    writeFileAtomically(ttl, data + extra)
+    os.utime(ttl, (stat.st_atime, stat.st_mtime))
+    return True
+
+# ------------------------------------------------------------------------------------------------------------
+# Thumbnail Queue
+# Renders pedalboard screenshots and thumbnails with an offscreen web page pointed at the local webserver.
+# Jobs run one at a time in small batches, spaced apart by the idle scheduler, and only while the user is not
+# interacting with the app. Rendering happens in the GUI thread (QtWebKit needs it) but the audio engine runs in
+# its own realtime process, so the cost is a short stall of an idle GUI at worst.
+
+class ThumbnailQueue(QObject):
+    # signals
+    thumbnailUpdated = pyqtSignal(str)
+
+    def __init__(self, parent, scheduler, baseURL, networkManager=None):
+        QObject.__init__(self, parent)
+
+        self.fScheduler = scheduler
+        self.fBaseURL   = baseURL
+        self.fPending   = []
+        self.fQueued    = set()
+        self.fCurrent   = None
+        self.fBatchLeft = THUMBNAIL_BATCH_SIZE
+        self.fPaused    = True
+        self.fDoneCount = 0
+
+        self.fLastInput = time.time()
+        QApplication.instance().installEventFilter(self)
+
+        # the offscreen page only exists while there are jobs
+        self.fPage = None
+        self.fNetworkManager = networkManager
+
+        self.fRenderTimer = QTimer(self)
+        self.fRenderTimer.setSingleShot(True)
+        self.fRenderTimer.timeout.connect(self.slot_render)
+
+        self.fTimeoutTimer = QTimer(self)
+        self.fTimeoutTimer.setSingleShot(True)
+        self.fTimeoutTimer.setInterval(THUMBNAIL_JOB_TIMEOUT)
+        self.fTimeoutTimer.timeout.connect(self.slot_jobTimeout)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Queue bundles to be checked, the ones with up-to-date images are skipped when their turn comes
+    def addBundles(self, bundles):
+        for bundle in bundles:
+            if bundle in self.fQueued:
+                continue
+            self.fQueued.add(bundle)
+            self.fPending.append(bundle)
+
+        self.updateTask()
+
+    def setPaused(self, paused):
+        self.fPaused = paused
+        self.updateTask()
+
+    def getPendingCount(self):
+        return len(self.fPending)
+
+    def getDoneCount(self):
+        return self.fDoneCount
+
+    def stop(self):
+        self.fPending = []
+        self.fQueued  = set()
+        self.fPaused  = True
+        self.finishJob()
+        self.updateTask()
+
+    # Free the offscreen page unless a job is using it, it is created again when needed
+    def releasePage(self):
+        if self.fPage is None or self.fCurrent is not None:
+            return
+
+        self.fPage.deleteLater()
+        self.fPage = None
+
+    def getPage(self):
+        if self.fPage is None:
+            self.fPage = QWebPage(self)
+            self.fPage.settings().setAttribute(QWebSettings.PluginsEnabled, False)
+            self.fPage.mainFrame().setScrollBarPolicy(Qt.Horizontal, Qt.ScrollBarAlwaysOff)
+            self.fPage.mainFrame().setScrollBarPolicy(Qt.Vertical, Qt.ScrollBarAlwaysOff)
+            self.fPage.setViewportSize(QSize(1280, 720))
+            self.fPage.loadFinished.connect(self.slot_pageLoaded)
+
+            if self.fNetworkManager is not None:
+                self.fPage.setNetworkAccessManager(self.fNetworkManager)
+
+        return self.fPage
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def updateTask(self):
+        wanted = not self.fPaused and (len(self.fPending) > 0 or self.fCurrent is not None)
+
+        if wanted and not self.fScheduler.hasTask("thumbnails"):
+            self.fScheduler.addTask("thumbnails", THUMBNAIL_JOB_INTERVAL, self.runNextJob)
+        elif not wanted and self.fScheduler.hasTask("thumbnails"):
+            self.fScheduler.removeTask("thumbnails")
+
+        if not wanted:
+            self.releasePage()
+
+    def runNextJob(self):
+        if self.fCurrent is not None:
+            return
+
+        if time.time() - self.fLastInput < THUMBNAIL_IDLE_TIME:
+            return
+
+        # back from the pause after a batch
+        if self.fBatchLeft <= 0:
+            self.fBatchLeft = THUMBNAIL_BATCH_SIZE
+            self.fScheduler.addTask("thumbnails", THUMBNAIL_JOB_INTERVAL, self.runNextJob)
+
+        # skip over bundles that are up to date, a limited amount at a time
+        for _ in range(THUMBNAIL_CHECKS_PER_TICK):
+            if len(self.fPending) == 0:
+                break
+
+            bundle = self.fPending.pop(0)
+            self.fQueued.discard(bundle)
+
+            if needsThumbnail(bundle):
+                self.startJob(bundle)
+                break
+
+        self.updateTask()
+
+    def startJob(self, bundle):
+        self.fCurrent = bundle
+        self.fBatchLeft -= 1
+
+        # batch done, wait a lot longer for the next one (re-adding the task postpones it)
+        if self.fBatchLeft == 0:
+            self.fScheduler.addTask("thumbnails", THUMBNAIL_BATCH_PAUSE, self.runNextJob)
+
+        self.fTimeoutTimer.start()
+        self.getPage().mainFrame().load(QUrl("%s/pedalboard.html?bundlepath=%s" % (self.fBaseURL, quote(bundle))))
+
+    def finishJob(self):
+        self.fCurrent = None
+        self.fRenderTimer.stop()
+        self.fTimeoutTimer.stop()
+
+        if self.fPage is not None:
+            self.fPage.mainFrame().setHtml("")
+
+    # --------------------------------------------------------------------------------------------------------
+
+    @pyqtSlot(bool)
+    def slot_pageLoaded(self, ok):
+        if self.fCurrent is None:
+            return
+
+        if not ok:
+            print("thumbnail: failed to load pedalboard page for", self.fCurrent)
+            self.finishJob()
+            return
+
+        # the page builds the pedalboard asynchronously
+        self.fRenderTimer.start(THUMBNAIL_RENDER_DELAY)
+
+    @pyqtSlot()
+    def slot_render(self):
+        bundle = self.fCurrent
+
+        if bundle is None:
+            return
+
+        frame = self.fPage.mainFrame()
+        size  = frame.contentsSize().boundedTo(SCREENSHOT_MAX_SIZE).expandedTo(self.fPage.viewportSize())
+
+        self.fPage.setViewportSize(size)
+
+        screenshot = QImage(size, QImage.Format_ARGB32)
+        screenshot.fill(Qt.transparent)
+
+        painter = QPainter(screenshot)
+        frame.render(painter)
+        painter.end()
+
+        thumbnail = screenshot.scaledToWidth(THUMBNAIL_WIDTH, Qt.SmoothTransformation)
+
+        try:
+            ok = (saveImageAtomically(screenshot, os.path.join(bundle, "screenshot.png")) and
+                  saveImageAtomically(thumbnail, os.path.join(bundle, "thumbnail.png")))
+
+            ttl = getPedalboardTTL(bundle)
+            if ok and ttl is not None:
+                addImageTriples(ttl)
+
+        except (IOError, OSError) as e:
+            print("thumbnail: failed to write images for %s: %s" % (bundle, e))
+            ok = False
+
+        self.fPage.setViewportSize(QSize(1280, 720))
+        self.finishJob()
+
+        if ok:
+            self.fDoneCount += 1
+            self.thumbnailUpdated.emit(bundle)
+
+    @pyqtSlot()
+    def slot_jobTimeout(self):
+        print("thumbnail: timed out rendering", self.fCurrent)
+        self.getPage().triggerAction(QWebPage.Stop)
+        self.finishJob()
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QEvent.KeyPress, QEvent.MouseButtonPress, QEvent.MouseMove, QEvent.Wheel):
+            self.fLastInput = time.time()
+
+        return False
+
+# ------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import mmap
+import os
+import re
+
+from collections import namedtuple
+from urllib.parse import unquote, urljoin, urlsplit
+from urllib.request import pathname2url
+
+# ------------------------------------------------------------------------------------------------------------
+
+NS_RDF   = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+NS_RDFS  = "http://www.w3.org/2000/01/rdf-schema#"
+NS_XSD   = "http://www.w3.org/2001/XMLSchema#"
+NS_DOAP  = "http://usefulinc.com/ns/doap#"
+NS_INGEN = "http://drobilla.net/ns/ingen#"
+NS_LV2   = "http://lv2plug.in/ns/lv2core#"
+NS_MODGUI = "http://moddevices.com/ns/modgui#"
+NS_PEDAL = "http://moddevices.com/ns/modpedal#"
+
+RDF_TYPE         = NS_RDF + "type"
+RDFS_SEEALSO     = NS_RDFS + "seeAlso"
+DOAP_NAME        = NS_DOAP + "name"
+INGEN_BLOCK      = NS_INGEN + "block"
+INGEN_PROTOTYPE  = NS_INGEN + "prototype"
+LV2_PROTOTYPE    = NS_LV2 + "prototype"
+MODGUI_THUMBNAIL = NS_MODGUI + "thumbnail"
+PEDAL_PEDALBOARD = NS_PEDAL + "Pedalboard"
+
+# ------------------------------------------------------------------------------------------------------------
+# Restricted Turtle reader
+# Reads the Turtle written for pedalboards (by mod-ui and ingen): prefixes, IRIs, prefixed names, blank node labels,
+# single-line literals, numbers and booleans, with ";" and "," lists. Anything else, like "[ ]" property lists,
+# "( )" collections or long literals, raises TurtleError so the caller can fall back to lilv.
+# Files are memory-mapped and tokenized in place, nothing but the tokens is copied.
+
+class TurtleError(Exception):
+    pass
+
+# a literal, value is already unescaped
+Literal = namedtuple("Literal", ("value", "datatype", "lang"))
+
+# whitespace and comments are skipped as part of the next token, a match with no group is trailing whitespace
+_tokenizer = re.compile(rb"""
+    (?:[ \t\r\n]+|\#[^\r\n]*)*
+    (?:
+    (?P<iri><[^<>"{}|^`\\\x00-\x20]*>)
+  | (?P<long>\"\"\"|''')
+  | (?P<string>"(?:[^"\\\r\n]|\\.)*"|'(?:[^'\\\r\n]|\\.)*')
+  | (?P<directive>@prefix\b|@base\b|(?i:prefix|base)(?=[ \t\r\n]))
+  | (?P<bnode>_:[A-Za-z0-9_](?:[A-Za-z0-9_\-]|\.(?=[A-Za-z0-9_\-]))*)
+  | (?P<lang>@[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+  | (?P<datatype>\^\^)
+  | (?P<number>[+-]?(?:[0-9]*\.[0-9]+(?:[eE][+-]?[0-9]+)?|[0-9]+(?:[eE][+-]?[0-9]+)?))
+  | (?P<pname>(?:[A-Za-z](?:[\w\-]|\.(?=[\w\-]))*)?:(?:[\w\-:%]|\.(?=[\w\-:%]))*)
+  | (?P<keyword>(?:a|true|false)(?![\w\-:]))
+  | (?P<punct>[.;,])
+  | (?P<other>.)
+    )?
+""", re.X | re.S)
+
+_escapes = re.compile(r"\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))", re.S)
+
+_escapeChars = {
+    "t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", '"': '"', "'": "'", "\\": "\\",
+}
+
+def _unescape(match):
+    code = match.group(1) or match.group(2)
+
+    if code is not None:
+        return chr(int(code, 16))
+
+    char = _escapeChars.get(match.group(3))
+
+    if char is None:
+        raise TurtleError("invalid escape sequence \\%s" % match.group(3))
+
+    return char
+
+def _unescapeString(text):
+    return _escapes.sub(_unescape, text) if "\\" in text else text
+
+def getFileURI(path):
+    return "file://" + pathname2url(os.path.abspath(path))
+
+# Local path of a file:// URI, or None for anything else
+def getURIPath(uri):
+    parts = urlsplit(uri)
+
+    if parts.scheme != "file" or parts.netloc not in ("", "localhost"):
+        return None
+
+    return unquote(parts.path)
+
+# ------------------------------------------------------------------------------------------------------------
+
+# Parse Turtle @a data (bytes or a buffer, like an mmap) into @a graph, a dict of subject -> predicate -> list of
+# objects. IRIs are absolute strings, blank nodes "_:label" strings (per document) and literals Literal tuples.
+def parseTurtle(data, baseURI, graph=None, docId=""):
+    if graph is None:
+        graph = {}
+
+    prefixes = {}
+    base     = baseURI
+
+    tokens = [(m.lastgroup, m.group(m.lastindex)) for m in _tokenizer.finditer(data) if m.lastindex is not None]
+    count  = len(tokens)
+    pos    = 0
+
+    # the same IRIs and names come up again and again, resolving them is the slow part
+    terms = {}
+
+    def fail(message):
+        raise TurtleError("%s (%s, token %i)" % (message, baseURI, pos))
+
+    def term(kind, text):
+        value = terms.get(text)
+
+        if value is None:
+            value = terms[text] = resolve(kind, text)
+
+        return value
+
+    def resolve(kind, text):
+        if kind == "iri":
+            return urljoin(base, _unescapeString(text[1:-1].decode("utf-8")))
+
+        if kind == "pname":
+            prefix, local = text.decode("utf-8").split(":", 1)
+
+            if prefix not in prefixes:
+                fail("unknown prefix '%s:'" % prefix)
+
+            return prefixes[prefix] + local
+
+        if kind == "bnode":
+            return "_:%s:%s" % (docId, text[2:].decode("utf-8"))
+
+        fail("unexpected %s" % kind)
+
+    while pos < count:
+        kind, text = tokens[pos]
+
+        # ----------------------------------------------------------------------------------------------------
+        # @prefix p: <iri> . / @base <iri> . (and the SPARQL forms, without the dot)
+
+        if kind == "directive":
+            sparql = not text.startswith(b"@")
+            name   = text.lstrip(b"@").lower()
+
+            if name == b"prefix":
+                if pos + 2 >= count or tokens[pos+1][0] != "pname" or tokens[pos+2][0] != "iri":
+                    fail("invalid prefix directive")
+
+                prefix, local = tokens[pos+1][1].decode("utf-8").split(":", 1)
+
+                if local:
+                    fail("invalid prefix name")
+
+                prefixes[prefix] = term("iri", tokens[pos+2][1])
+                terms.clear()
+                pos += 3
+
+            else:
+                if pos + 1 >= count or tokens[pos+1][0] != "iri":
+                    fail("invalid base directive")
+
+                base = term("iri", tokens[pos+1][1])
+                terms.clear()
+                pos += 2
+
+            if not sparql:
+                if pos >= count or tokens[pos][1] != b".":
+                    fail("missing '.' after directive")
+                pos += 1
+
+            continue
+
+        # ----------------------------------------------------------------------------------------------------
+        # subject verb object (, object)* (; verb object (, object)*)* .
+
+        subject    = term(kind, text)
+        properties = graph.setdefault(subject, {})
+        pos += 1
+
+        while True:
+            if pos >= count:
+                fail("unexpected end of file")
+
+            kind, text = tokens[pos]
+            pos += 1
+
+            # ";" may be repeated, and may come right before the final "."
+            if kind == "punct" and text == b";":
+                continue
+            if kind == "punct" and text == b".":
+                break
+
+            if kind == "keyword" and text == b"a":
+                predicate = RDF_TYPE
+            else:
+                predicate = term(kind, text)
+
+            objects = properties.setdefault(predicate, [])
+
+            while True:
+                if pos >= count:
+                    fail("unexpected end of file")
+
+                kind, text = tokens[pos]
+                pos += 1
+
+                if kind == "string":
+                    value    = _unescapeString(text[1:-1].decode("utf-8"))
+                    datatype = None
+                    lang     = None
+
+                    if pos < count and tokens[pos][0] == "lang":
+                        lang = tokens[pos][1][1:].decode("utf-8")
+                        pos += 1
+
+                    elif pos < count and tokens[pos][0] == "datatype":
+                        if pos + 1 >= count:
+                            fail("unexpected end of file")
+                        datatype = term(*tokens[pos+1])
+                        pos += 2
+
+                    objects.append(Literal(value, datatype, lang))
+
+                elif kind == "number":
+                    number = text.decode("utf-8")
+
+                    if "e" in number or "E" in number:
+                        datatype = NS_XSD + "double"
+                    elif "." in number:
+                        datatype = NS_XSD + "decimal"
+                    else:
+                        datatype = NS_XSD + "integer"
+
+                    objects.append(Literal(number, datatype, None))
+
+                elif kind == "keyword" and text != b"a":
+                    objects.append(Literal(text.decode("utf-8"), NS_XSD + "boolean", None))
+
+                else:
+                    objects.append(term(kind, text))
+
+                if pos < count and tokens[pos] == ("punct", b","):
+                    pos += 1
+                    continue
+                break
+
+            if pos >= count or tokens[pos][0] != "punct" or tokens[pos][1] == b",":
+                fail("expected ';' or '.'")
+
+    return graph
+
+# Parse the Turtle file at @a path into @a graph, see parseTurtle()
+def parseTurtleFile(path, graph=None):
+    with open(path, 'rb') as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return {} if graph is None else graph
+
+        data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        return parseTurtle(data, getFileURI(path), graph, path)
+    finally:
+        data.close()
+
+# ------------------------------------------------------------------------------------------------------------
+# Pedalboard info
+# Name, thumbnail and block prototypes of a pedalboard bundle, read from its manifest and the files it points to,
+# without loading a lilv world. Same fields as the lilv based reader (see tests/lv2bundleinfo.py), plus 'uri'.
+
+def _getSingle(properties, predicate):
+    values = properties.get(predicate, [])
+
+    if len(values) != 1:
+        return None
+
+    return values[0]
+
+# Returns None when the bundle has something this reader doesn't handle or isn't sure about, that is left to lilv
+def readPedalboardInfo(bundle):
+    bundle   = os.path.abspath(bundle)
+    manifest = os.path.join(bundle, "manifest.ttl")
+
+    try:
+        graph = parseTurtleFile(manifest)
+
+        # exactly one pedalboard, described by files inside the bundle
+        uris = [subject for subject, properties in graph.items()
+                if PEDAL_PEDALBOARD in properties.get(RDF_TYPE, ())]
+
+        if len(uris) != 1:
+            return None
+
+        uri   = uris[0]
+        files = graph[uri].get(RDFS_SEEALSO, [])
+
+        if not files:
+            return None
+
+        for fileURI in files:
+            path = getURIPath(fileURI) if isinstance(fileURI, str) else None
+
+            if path is None or os.path.dirname(os.path.normpath(path)) != bundle:
+                return None
+
+            parseTurtleFile(path, graph)
+
+    except (TurtleError, IOError, OSError, ValueError):
+        return None
+
+    properties = graph[uri]
+    name       = _getSingle(properties, DOAP_NAME)
+    thumbnail  = _getSingle(properties, MODGUI_THUMBNAIL)
+
+    # lilv's reader refuses pedalboards without a thumbnail too
+    if not isinstance(name, Literal) or not isinstance(thumbnail, str):
+        return None
+
+    plugins = []
+
+    for block in properties.get(INGEN_BLOCK, []):
+        if isinstance(block, Literal):
+            return None
+
+        blockProperties = graph.get(block, {})
+        prototypes = blockProperties.get(LV2_PROTOTYPE) or blockProperties.get(INGEN_PROTOTYPE)
+
+        if not prototypes or isinstance(prototypes[0], Literal):
+            return None
+
+        plugins.append(prototypes[0])
+
+    return {
+        'uri':       uri,
+        'name':      name.value,
+        'thumbnail': os.path.basename(getURIPath(thumbnail) or thumbnail),
+        'plugins':   plugins,
+    }
+
+# Pedalboard info read by readPedalboardInfo(), or by @a fallback (like mod-ui's get_pedalboard_info) when that
+# can't be sure about it
+def getPedalboardInfo(bundle, fallback):
+    info = readPedalboardInfo(bundle)
+
+    if info is not None:
+        return info
+
+    return fallback(bundle)
+
+# ------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import os
+import time
+
+from PyQt5.QtCore import pyqtSlot, QEvent, QObject
+from PyQt5.QtGui import QWindow
+from PyQt5.QtWebKitWidgets import QWebPage
+
+# ------------------------------------------------------------------------------------------------------------
+# Process CPU time (all threads, user + system), in seconds
+
+def getProcessCpuTime():
+    times = os.times()
+    return times[0] + times[1]
+
+# ------------------------------------------------------------------------------------------------------------
+# Visibility Throttler
+# Watches a main window and, while it is minimized or hidden, stops web view painting, tells WebKit the page is
+# hidden (which throttles JS timers and animation frames), turns off jQuery animations and pauses the scheduler
+# tasks that only matter when the window can be seen. CPU usage is accounted separately for hidden and visible
+# time, so the savings can be measured.
+
+class VisibilityThrottler(QObject):
+    def __init__(self, window, webview, scheduler):
+        QObject.__init__(self, window)
+
+        self.fWindow    = window
+        self.fWebView   = webview
+        self.fScheduler = scheduler
+        self.fVisible   = True
+        self.fHandle    = None
+
+        # scheduler tasks paused while hidden, by name, whether they're currently added or not
+        self.fForegroundTasks = []
+
+        # CPU accounting, [cpu seconds, wall seconds] for each state
+        self.fStats    = { True: [0.0, 0.0], False: [0.0, 0.0] }
+        self.fLastCpu  = getProcessCpuTime()
+        self.fLastWall = time.time()
+
+        window.installEventFilter(self)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    # Pause the scheduler task @a name while hidden, call again each time the task is added to the scheduler
+    def addForegroundTask(self, name):
+        if name not in self.fForegroundTasks:
+            self.fForegroundTasks.append(name)
+
+        if not self.fVisible:
+            self.fScheduler.setTaskEnabled(name, False)
+
+    def isVisible(self):
+        return self.fVisible
+
+    # Start measuring from scratch, used to leave the UI loading out of the visible baseline
+    def resetStats(self):
+        self.fStats    = { True: [0.0, 0.0], False: [0.0, 0.0] }
+        self.fLastCpu  = getProcessCpuTime()
+        self.fLastWall = time.time()
+
+    # Returns cpu usage (0.0 to 1.0 per core) while visible and hidden, and the estimated CPU seconds saved per
+    # hour of hidden runtime (compared to the visible rate)
+    def getStats(self):
+        self.accountTime()
+
+        visibleCpu, visibleWall = self.fStats[True]
+        hiddenCpu,  hiddenWall  = self.fStats[False]
+
+        visibleRate = visibleCpu / visibleWall if visibleWall > 0 else 0.0
+        hiddenRate  = hiddenCpu  / hiddenWall  if hiddenWall  > 0 else 0.0
+
+        return {
+            'visible_time':    visibleWall,
+            'visible_cpu':     visibleRate,
+            'hidden_time':     hiddenWall,
+            'hidden_cpu':      hiddenRate,
+            'saved_per_hour':  (visibleRate - hiddenRate) * 3600 if hiddenWall > 0 else 0.0,
+        }
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def eventFilter(self, obj, event):
+        etype = event.type()
+
+        if etype == QEvent.Show and self.fHandle is None and self.fWindow.windowHandle() is not None:
+            # also catches the window being unmapped, for example when switching workspaces
+            self.fHandle = self.fWindow.windowHandle()
+            self.fHandle.visibilityChanged.connect(self.slot_updateVisibility)
+
+        if etype in (QEvent.Show, QEvent.Hide, QEvent.WindowStateChange):
+            self.slot_updateVisibility()
+
+        return False
+
+    @pyqtSlot()
+    def slot_updateVisibility(self):
+        visible = self.fWindow.isVisible() and not self.fWindow.isMinimized()
+
+        if visible and self.fHandle is not None:
+            visible = self.fHandle.visibility() not in (QWindow.Hidden, QWindow.Minimized)
+
+        if visible == self.fVisible:
+            return
+
+        self.accountTime()
+        self.fVisible = visible
+
+        page = self.fWebView.page()
+
+        self.fWebView.setUpdatesEnabled(visible)
+
+        # needs QtWebKit >= 5.5
+        if hasattr(page, "setVisibilityState"):
+            page.setVisibilityState(QWebPage.VisibilityStateVisible if visible else QWebPage.VisibilityStateHidden)
+
+        page.mainFrame().evaluateJavaScript("if (window.jQuery) { jQuery.fx.off = %s; }" % ("false" if visible else "true"))
+
+        for name in self.fForegroundTasks:
+            self.fScheduler.setTaskEnabled(name, visible)
+
+        if visible:
+            stats = self.getStats()
+            print("window visible again; CPU while hidden %.1f%%, while visible %.1f%%, saving %.1f CPU seconds per hidden hour" % (
+                  stats['hidden_cpu'] * 100, stats['visible_cpu'] * 100, stats['saved_per_hour']))
+
+    def accountTime(self):
+        cpu  = getProcessCpuTime()
+        wall = time.time()
+
+        stats = self.fStats[self.fVisible]
+        stats[0] += cpu  - self.fLastCpu
+        stats[1] += wall - self.fLastWall
+
+        self.fLastCpu  = cpu
+        self.fLastWall = wall
+
+# ------------------------------------------------------------------------------------------------------------
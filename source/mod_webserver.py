@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# MOD-App
+# Copyright (C) 2014-2015 Filipe Coelho <falktx@falktx.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 3 of
+# the License, or any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# For a full copy of the GNU General Public License see the LICENSE file.
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Custom)
+
+from mod_common import *
+
+# ------------------------------------------------------------------------------------------------------------
+# Imports (Global)
+
+import json
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QProcess
+
+# ------------------------------------------------------------------------------------------------------------
+
+# Lines from the webserver process that start with this are events for the app, the rest is its log output.
+# Events and commands are JSON objects, one per line:
+#   process -> app  { "event": "ready" }
+#                   { "event": "pedal_changed", "ok": bool, "bundlepath": str, "title": str }
+#   app -> process  { "command": "reconnect" }  { "command": "close_jack" }
+#                   { "command": "verbose", "value": bool }  { "command": "stop" }
+# The process also stops when its stdin is closed, so it never outlives the app.
+WEBSERVER_EVENT_PREFIX = "@@modapp "
+
+# time given to the process to stop before it's killed, in ms
+WEBSERVER_STOP_TIMEOUT = 5000
+
+# frozen builds have no interpreter to run the webserver with
+WEBSERVER_PROCESS_SUPPORTED = not getattr(sys, "frozen", False)
+
+# ------------------------------------------------------------------------------------------------------------
+# WebServer Process
+# Runs the mod-ui webserver in a child process, so it doesn't share the GIL with the GUI.
+# Has the same interface as WebServerThread (running, finished, start, isRunning, stopWait and terminate),
+# plus the calls that go to the webserver's SESSION, which lives in the other process.
+
+class WebServerProcess(QObject):
+    # signals
+    running      = pyqtSignal()
+    finished     = pyqtSignal()
+    pedalChanged = pyqtSignal(bool, str, str) # ok, bundlepath, title
+
+    def __init__(self, parent):
+        QObject.__init__(self, parent)
+
+        self.fBuffer = b""
+
+        self.fProcess = QProcess(self)
+        self.fProcess.setProcessChannelMode(QProcess.ForwardedErrorChannel)
+        self.fProcess.readyReadStandardOutput.connect(self.slot_processRead)
+        self.fProcess.finished.connect(self.slot_processFinished)
+        self.fProcess.error.connect(self.slot_processError)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def start(self):
+        if self.isRunning():
+            return
+
+        args = ["-u", os.path.abspath(__file__), "--port", config["port"]]
+
+        if USING_LIVE_ISO:
+            args.append("--using-live-iso")
+        if SKIP_INTEGRATION:
+            args.append("--skip-integration")
+
+        self.fBuffer = b""
+        self.fProcess.start(sys.executable, args)
+
+    def isRunning(self):
+        return self.fProcess.state() != QProcess.NotRunning
+
+    def getProcessId(self):
+        return self.fProcess.processId() if self.isRunning() else 0
+
+    # Ask the process to stop and wait for it, returns False if it didn't
+    def stopWait(self):
+        if not self.isRunning():
+            return True
+
+        self.sendCommand("stop")
+        self.fProcess.closeWriteChannel()
+        return self.fProcess.waitForFinished(WEBSERVER_STOP_TIMEOUT)
+
+    def terminate(self):
+        self.fProcess.kill()
+        self.fProcess.waitForFinished(1000)
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def reconnectApp(self):
+        self.sendCommand("reconnect")
+
+    def closeJack(self):
+        self.sendCommand("close_jack")
+
+    def setVerbose(self, verbose):
+        self.sendCommand("verbose", value=verbose)
+
+    def sendCommand(self, command, **kwargs):
+        if self.fProcess.state() != QProcess.Running:
+            return
+
+        kwargs['command'] = command
+        self.fProcess.write((json.dumps(kwargs) + "\n").encode("utf-8"))
+
+    # --------------------------------------------------------------------------------------------------------
+
+    @pyqtSlot()
+    def slot_processRead(self):
+        lines = (self.fBuffer + bytes(self.fProcess.readAllStandardOutput())).split(b"\n")
+        self.fBuffer = lines.pop()
+
+        for line in lines:
+            line = str(line, encoding="utf-8", errors="ignore").rstrip()
+
+            if not line.startswith(WEBSERVER_EVENT_PREFIX):
+                print(line)
+                continue
+
+            try:
+                event = json.loads(line[len(WEBSERVER_EVENT_PREFIX):])
+            except ValueError:
+                print("webserver: invalid event:", line)
+                continue
+
+            if event['event'] == "ready":
+                self.running.emit()
+            elif event['event'] == "pedal_changed":
+                self.pedalChanged.emit(event['ok'], event['bundlepath'] or "", event['title'] or "")
+
+    @pyqtSlot(int, QProcess.ExitStatus)
+    def slot_processFinished(self, exitCode, exitStatus):
+        if exitCode != 0 or exitStatus != QProcess.NormalExit:
+            print("webserver process exited with code %i" % exitCode)
+        self.finished.emit()
+
+    @pyqtSlot(QProcess.ProcessError)
+    def slot_processError(self, error):
+        if error == QProcess.FailedToStart:
+            print("webserver process failed to start")
+            self.finished.emit()
+
+# ------------------------------------------------------------------------------------------------------------
+# The webserver process itself
+
+def sendEvent(event, **kwargs):
+    kwargs['event'] = event
+    print(WEBSERVER_EVENT_PREFIX + json.dumps(kwargs), flush=True)
+
+def runWebServer(port):
+    from threading import Thread
+
+    # each process picks its own random port, use the app's
+    config["addr"] = "http://127.0.0.1:%s" % port
+    config["port"] = port
+    os.environ['MOD_DEVICE_WEBSERVER_PORT'] = port
+
+    setInitialSettings()
+
+    from tornado.ioloop import IOLoop
+    from mod import webserver
+    from mod.session import SESSION
+
+    ioloop = IOLoop.instance()
+
+    def pedalChanged(ok, bundlepath, title):
+        sendEvent("pedal_changed", ok=bool(ok), bundlepath=bundlepath, title=title)
+
+    def checkReady():
+        if not SESSION.host.connected:
+            ioloop.call_later(0.25, checkReady)
+            return
+        sendEvent("ready")
+
+    def handleCommand(line):
+        try:
+            command = json.loads(line)
+        except ValueError:
+            return
+
+        if command['command'] == "reconnect":
+            SESSION.reconnectApp()
+        elif command['command'] == "close_jack":
+            SESSION.host.close_jack()
+        elif command['command'] == "verbose":
+            setWebServerVerbose(command['value'])
+        elif command['command'] == "stop":
+            webserver.stop()
+
+    # commands come in on stdin, the app going away closes it
+    def readCommands():
+        for line in sys.stdin:
+            ioloop.add_callback(handleCommand, line)
+        ioloop.add_callback(webserver.stop)
+
+    SESSION.setupApp(pedalChanged)
+    SESSION.host.init_host()
+    webserver.prepare(True)
+
+    reader = Thread(target=readCommands, daemon=True)
+    reader.start()
+
+    ioloop.add_callback(checkReady)
+    webserver.start()
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MOD-App webserver process")
+    parser.add_argument("--port", required=True)
+    parser.add_argument("--using-live-iso", action="store_true")
+    parser.add_argument("--skip-integration", action="store_true")
+    args = parser.parse_args()
+
+    runWebServer(args.port)
+
+# ------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Pedalboard archive tests
+# Checks that importArchive (mod_archive.py) only installs bundles that are complete and match their checksums:
+# a mismatch is rejected as corrupt, a damaged or cut short archive keeps only the bundles verified before the
+# damage, and a bundle without checksums fails unless the archive has no checksums at all.
+
+import os
+import shutil
+import sys
+import tempfile
+
+# ------------------------------------------------------------------------------------------------------------
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.dirname(CWD)
+
+# ------------------------------------------------------------------------------------------------------------
+
+# A bundle with a few files, @a size bytes of data in total
+def make_bundle(tmpdir, name, size=4096):
+    bundle = os.path.join(tmpdir, "source", name + ".pedalboard")
+    os.makedirs(os.path.join(bundle, "data"))
+
+    files = {
+        "manifest.ttl":  ("manifest of %s\n" % name).encode("utf-8"),
+        name + ".ttl":   ("pedalboard %s\n" % name).encode("utf-8"),
+        "data/blob.bin": bytes((i * 7 + len(name)) % 256 for i in range(size)),
+    }
+
+    for filename, data in files.items():
+        with open(os.path.join(bundle, *filename.split("/")), 'wb') as fh:
+            fh.write(data)
+
+    return bundle
+
+def import_archive(tmpdir, filename):
+    from mod_archive import ArchiveProgress, importArchive
+
+    directory = os.path.join(tmpdir, "imported", os.path.basename(filename))
+    results   = importArchive(filename, directory, ArchiveProgress())
+
+    return dict((result['name'], result) for result in results), directory
+
+def same_files(bundle1, bundle2):
+    from mod_archive import listBundleFiles
+
+    files1 = [(name, size) for name, path, size, mtime in listBundleFiles(bundle1)]
+    files2 = [(name, size) for name, path, size, mtime in listBundleFiles(bundle2)]
+
+    return sorted(files1) == sorted(files2)
+
+# Check the status of each bundle in @a results, and that only the imported ones were installed
+def check_results(errors, results, directory, expected):
+    from mod_archive import ARCHIVE_IMPORTED, ARCHIVE_UNVERIFIED
+
+    for name, status in expected.items():
+        result = results.get(name)
+
+        if result is None:
+            errors.append("%s has no result" % name)
+            continue
+
+        if result['status'] != status:
+            errors.append("%s is %s (%s), expected %s" % (name, result['status'], result['error'], status))
+
+        installed = status in (ARCHIVE_IMPORTED, ARCHIVE_UNVERIFIED)
+
+        if bool(result['bundle']) != installed:
+            errors.append("%s was %sinstalled" % (name, "not " if installed else ""))
+
+    # nothing else left behind, like partial bundles or the staging directory
+    names = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+    wanted = sorted(os.path.basename(result['bundle']) for result in results.values() if result['bundle'])
+
+    if names != wanted:
+        errors.append("import directory has %s, expected %s" % (names, wanted))
+
+# ------------------------------------------------------------------------------------------------------------
+
+# Exported bundles import as they were, in every archive format
+def test_roundtrip(tmpdir):
+    from mod_archive import ARCHIVE_IMPORTED, ArchiveProgress, exportBundles
+
+    bundles = [make_bundle(tmpdir, "one"), make_bundle(tmpdir, "two", 100000)]
+    errors  = []
+
+    for extension in (".zip", ".tar", ".tar.gz", ".tar.bz2", ".tar.xz"):
+        filename = os.path.join(tmpdir, "export" + extension)
+        exportBundles(bundles, filename, ArchiveProgress())
+
+        results, directory = import_archive(tmpdir, filename)
+        check_results(errors, results, directory, { "one.pedalboard": ARCHIVE_IMPORTED,
+                                                    "two.pedalboard": ARCHIVE_IMPORTED })
+
+        for bundle in bundles:
+            result = results.get(os.path.basename(bundle))
+
+            if result and result['bundle'] and not same_files(bundle, result['bundle']):
+                errors.append("%s differs after importing from %s" % (os.path.basename(bundle), extension))
+
+    return errors, "zip and tar"
+
+# A file that doesn't match its checksum makes the whole bundle corrupt, it is not installed
+def test_mismatch(tmpdir):
+    from mod_archive import ARCHIVE_CORRUPT, ARCHIVE_IMPORTED, ArchiveProgress, ArchiveWriter
+    from mod_archive import formatChecksums, listBundleFiles
+
+    good   = make_bundle(tmpdir, "good")
+    bad    = make_bundle(tmpdir, "bad")
+    errors = []
+
+    for extension in (".zip", ".tar"):
+        filename = os.path.join(tmpdir, "mismatch" + extension)
+        writer   = ArchiveWriter(filename)
+        writer.addBundle(good, ArchiveProgress())
+
+        checksums = []
+
+        for name, path, size, mtime in listBundleFiles(bad):
+            checksum = writer.addFile("bad.pedalboard/" + name, path, size, mtime, ArchiveProgress())
+
+            # as if the file was changed after it was hashed
+            if name == "data/blob.bin":
+                checksum = "0" * 64
+
+            checksums.append((name, checksum))
+
+        writer.addData("bad.pedalboard.sha256", formatChecksums("bad.pedalboard", checksums).encode("utf-8"))
+        writer.close()
+
+        results, directory = import_archive(tmpdir, filename)
+        check_results(errors, results, directory, { "good.pedalboard": ARCHIVE_IMPORTED,
+                                                    "bad.pedalboard":  ARCHIVE_CORRUPT })
+
+        if "blob.bin" not in results.get("bad.pedalboard", {}).get('error', ""):
+            errors.append("mismatch error doesn't name the file: %s" % results.get("bad.pedalboard"))
+
+    return errors, "zip and tar"
+
+# An archive cut short in the middle of a bundle keeps the bundles verified before, the partial one fails
+def test_truncated(tmpdir):
+    from mod_archive import ARCHIVE_FAILED, ARCHIVE_IMPORTED, ArchiveProgress, exportBundles
+
+    bundles = [make_bundle(tmpdir, "first"), make_bundle(tmpdir, "second", 200000)]
+    errors  = []
+
+    for extension in (".tar", ".tar.gz"):
+        filename = os.path.join(tmpdir, "truncated" + extension)
+        exportBundles(bundles, filename, ArchiveProgress())
+
+        # cut in the middle of the second bundle's big file
+        size = os.path.getsize(filename)
+
+        with open(filename, 'r+b') as fh:
+            fh.truncate(size // 2)
+
+        results, directory = import_archive(tmpdir, filename)
+        check_results(errors, results, directory, { "first.pedalboard":  ARCHIVE_IMPORTED,
+                                                    "second.pedalboard": ARCHIVE_FAILED })
+
+    return errors, "tar and tar.gz"
+
+# A bundle without checksums fails when the archive has checksums for others, it may have been cut short
+# right after its files; an archive without any checksums at all is imported unverified
+def test_unverified(tmpdir):
+    from mod_archive import ARCHIVE_FAILED, ARCHIVE_IMPORTED, ARCHIVE_UNVERIFIED, ArchiveProgress, ArchiveWriter
+    from mod_archive import listBundleFiles
+
+    checked   = make_bundle(tmpdir, "checked")
+    unchecked = make_bundle(tmpdir, "unchecked")
+    errors    = []
+
+    def addFiles(writer, bundle):
+        bundleName = os.path.basename(bundle)
+
+        for name, path, size, mtime in listBundleFiles(bundle):
+            writer.addFile(bundleName + "/" + name, path, size, mtime, ArchiveProgress())
+
+    for extension in (".zip", ".tar"):
+        filename = os.path.join(tmpdir, "partial" + extension)
+        writer   = ArchiveWriter(filename)
+        writer.addBundle(checked, ArchiveProgress())
+        addFiles(writer, unchecked)
+        writer.close()
+
+        results, directory = import_archive(tmpdir, filename)
+        check_results(errors, results, directory, { "checked.pedalboard":   ARCHIVE_IMPORTED,
+                                                    "unchecked.pedalboard": ARCHIVE_FAILED })
+
+        filename = os.path.join(tmpdir, "plain" + extension)
+        writer   = ArchiveWriter(filename)
+        addFiles(writer, checked)
+        addFiles(writer, unchecked)
+        writer.close()
+
+        results, directory = import_archive(tmpdir, filename)
+        check_results(errors, results, directory, { "checked.pedalboard":   ARCHIVE_UNVERIFIED,
+                                                    "unchecked.pedalboard": ARCHIVE_UNVERIFIED })
+
+    return errors, "zip and tar, with and without other checksums"
+
+TESTS = {
+    'roundtrip':  test_roundtrip,
+    'mismatch':   test_mismatch,
+    'truncated':  test_truncated,
+    'unverified': test_unverified,
+}
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MOD-App pedalboard archive tests")
+    parser.add_argument("tests", nargs="*", help="tests to run (default: all of %s)" % ", ".join(sorted(TESTS)))
+    args = parser.parse_args()
+
+    for name in args.tests:
+        if name not in TESTS:
+            parser.error("unknown test '%s'" % name)
+
+    sys.path.insert(0, SOURCE_DIR)
+
+    failed = False
+
+    for name in args.tests or sorted(TESTS):
+        tmpdir = tempfile.mkdtemp(prefix="mod-archivetest-")
+
+        try:
+            errors, info = TESTS[name](tmpdir)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        print("%-10s %s (%s)" % (name, "FAILED" if errors else "ok", info))
+
+        for error in errors[:10]:
+            print("    " + error)
+
+        failed = failed or len(errors) > 0
+
+    sys.exit(1 if failed else 0)
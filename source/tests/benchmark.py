@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Benchmark suite for pedalboard library scaling
+# Generates synthetic libraries (see pedalboardgen.py) of several sizes and times the library-dependent parts
+# of the app on each of them. Every measurement runs in a fresh process with LV2_PATH pointing to the library,
+# so nothing is cached between runs. Results are written as JSON, and can be compared against a previous run.
+#
+# Cases that need something not available here (lilv, mod-ui, PyQt5) are recorded as skipped.
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# ------------------------------------------------------------------------------------------------------------
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.dirname(CWD)
+MOD_UI_DIR = os.path.join(SOURCE_DIR, "modules", "mod-ui")
+
+DEFAULT_SIZES     = (100, 1000, 10000)
+DEFAULT_REPEAT    = 3
+DEFAULT_SAMPLE    = 100
+DEFAULT_THRESHOLD = 10.0
+
+# printed before the worker result, anything else on stdout is noise from the code being measured
+RESULT_PREFIX = "@@bench "
+
+# ------------------------------------------------------------------------------------------------------------
+# Case was not run because something it needs is missing
+
+class SkipCase(Exception):
+    pass
+
+# ------------------------------------------------------------------------------------------------------------
+# Worker side, each function runs inside a fresh process and returns a dict with at least 'ms'
+
+def _import_mod_ui_utils():
+    sys.path = [SOURCE_DIR, MOD_UI_DIR] + sys.path
+
+    try:
+        from modtools.utils import get_all_pedalboards
+    except ImportError as e:
+        raise SkipCase("mod-ui not available: %s" % e)
+
+    return get_all_pedalboards
+
+def _scan_filesystem(libdir):
+    pedalboards = []
+
+    for entry in sorted(os.listdir(libdir)):
+        bundle   = os.path.join(libdir, entry)
+        manifest = os.path.join(bundle, "manifest.ttl")
+
+        if not os.path.exists(manifest):
+            continue
+
+        with open(manifest, 'r') as fh:
+            fh.read()
+
+        pedalboards.append({
+            'uri':    "file://" + os.path.join(bundle, entry.replace(".pedalboard", ".ttl")),
+            'bundle': bundle,
+            'title':  entry.replace(".pedalboard", ""),
+        })
+
+    return pedalboards
+
+def case_scan_fs(libdir, sample):
+    t0 = time.perf_counter()
+    pedalboards = _scan_filesystem(libdir)
+    t1 = time.perf_counter()
+
+    return { 'ms': (t1 - t0) * 1000, 'count': len(pedalboards) }
+
+def case_scan(libdir, sample):
+    get_all_pedalboards = _import_mod_ui_utils()
+
+    t0 = time.perf_counter()
+    pedalboards = get_all_pedalboards()
+    t1 = time.perf_counter()
+
+    return { 'ms': (t1 - t0) * 1000, 'count': len(pedalboards) }
+
+def case_bundle_info(libdir, sample):
+    try:
+        from lv2bundleinfo import get_info_from_lv2_bundle
+    except ImportError as e:
+        raise SkipCase("lilv not available: %s" % e)
+
+    # the full library would take too long at 10k, time a fixed sample and extrapolate
+    bundles = [os.path.join(libdir, b) for b in sorted(os.listdir(libdir))][:sample]
+
+    t0 = time.perf_counter()
+    for bundle in bundles:
+        get_info_from_lv2_bundle(bundle)
+    t1 = time.perf_counter()
+
+    perBundle = (t1 - t0) * 1000 / max(1, len(bundles))
+
+    return { 'ms': perBundle * len(os.listdir(libdir)), 'per_bundle_ms': perBundle, 'sampled': len(bundles) }
+
+def case_ttl_info(libdir, sample):
+    sys.path = [SOURCE_DIR] + sys.path
+
+    from mod_ttl import readPedalboardInfo
+
+    # same sample as bundle_info, so the two compare directly
+    bundles = [os.path.join(libdir, b) for b in sorted(os.listdir(libdir))][:sample]
+
+    t0 = time.perf_counter()
+    infos = [readPedalboardInfo(bundle) for bundle in bundles]
+    t1 = time.perf_counter()
+
+    perBundle = (t1 - t0) * 1000 / max(1, len(bundles))
+
+    result = {
+        'ms':            perBundle * len(os.listdir(libdir)),
+        'per_bundle_ms': perBundle,
+        'sampled':       len(bundles),
+        'fallbacks':     sum(1 for info in infos if info is None),
+    }
+
+    # check against the lilv reader when it's there
+    try:
+        from lv2bundleinfo import get_info_from_lv2_bundle
+    except ImportError:
+        return result
+
+    mismatches = 0
+
+    for bundle, info in zip(bundles, infos):
+        if info is None:
+            continue
+
+        expected = get_info_from_lv2_bundle(bundle)
+
+        if (info['name'], info['thumbnail'], sorted(info['plugins'])) != (expected['name'], expected['thumbnail'],
+                                                                          sorted(expected['plugins'])):
+            mismatches += 1
+
+    result['mismatches'] = mismatches
+    return result
+
+def case_open_dialog(libdir, sample):
+    sys.path = [SOURCE_DIR, MOD_UI_DIR] + sys.path
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    try:
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication(sys.argv[:1])
+        from mod_host import OpenPedalboardWindow, PedalboardSearchIndex
+    except ImportError as e:
+        raise SkipCase("mod_host not importable: %s" % e)
+
+    pedalboards = _scan_filesystem(libdir)
+
+    t0 = time.perf_counter()
+    dialog = OpenPedalboardWindow(None, PedalboardSearchIndex(pedalboards))
+    dialog.show()
+    app.processEvents()
+    t1 = time.perf_counter()
+
+    dialog.close()
+
+    # rows the view got so far, the rest are fetched as it scrolls
+    return { 'ms': (t1 - t0) * 1000, 'count': len(dialog.fModel.getPedalboards()),
+             'fetched': dialog.ui.listView.model().rowCount() }
+
+def case_search(libdir, sample):
+    sys.path = [SOURCE_DIR] + sys.path
+
+    from mod_catalog import PedalboardSearchIndex
+
+    pedalboards = _scan_filesystem(libdir)
+
+    t0 = time.perf_counter()
+    index = PedalboardSearchIndex(pedalboards)
+    t1 = time.perf_counter()
+
+    # someone typing a title, with a typo and a backspace, each keystroke is a search
+    keystrokes = []
+    query = ""
+
+    for key in "pedalboard 12x\b3":
+        query = query[:-1] if key == "\b" else query + key
+
+        k0 = time.perf_counter()
+        index.search(query)
+        keystrokes.append((time.perf_counter() - k0) * 1000)
+
+    return { 'ms': max(keystrokes), 'build_ms': (t1 - t0) * 1000, 'keystroke_avg_ms': sum(keystrokes) / len(keystrokes) }
+
+def case_startup(libdir, sample):
+    # time from interpreter start to the pedalboard list being ready, which is what HostWindow waits for before
+    # showing anything (the backend and webserver start afterwards and don't depend on the library)
+    sys.path = [SOURCE_DIR, MOD_UI_DIR] + sys.path
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    try:
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication(sys.argv[:1])
+        import mod_host
+    except ImportError as e:
+        raise SkipCase("mod_host not importable: %s" % e)
+
+    mod_host.get_all_pedalboards()
+
+    return { 'ms': (time.perf_counter() - WORKER_START) * 1000 }
+
+def case_archive(libdir, sample):
+    sys.path = [SOURCE_DIR] + sys.path
+
+    import shutil
+    import tempfile
+
+    from mod_archive import ArchiveProgress, exportBundlesToDirectory, importArchives
+
+    bundles = [os.path.join(libdir, b) for b in sorted(os.listdir(libdir))]
+    workdir = tempfile.mkdtemp(prefix="mod-app-archive-")
+
+    try:
+        # the whole library out as an archive per pedalboard, and back in, checksums verified on the way
+        exportProgress = ArchiveProgress()
+        t0 = time.perf_counter()
+        exportBundlesToDirectory(bundles, os.path.join(workdir, "export"), ".zip", exportProgress)
+        t1 = time.perf_counter()
+
+        archives = [os.path.join(workdir, "export", f) for f in os.listdir(os.path.join(workdir, "export"))]
+
+        importProgress = ArchiveProgress()
+        t2 = time.perf_counter()
+        results = importArchives(archives, os.path.join(workdir, "import"), importProgress)
+        t3 = time.perf_counter()
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'ms':          (t3 - t0) * 1000,
+        'export_ms':   (t1 - t0) * 1000,
+        'import_ms':   (t3 - t2) * 1000,
+        'export_mb_s': exportProgress.getStats()[0] / (1024.0 * 1024.0) / max(t1 - t0, 0.001),
+        'imported':    sum(1 for result in results if result['status'] == "imported"),
+    }
+
+CASES = {
+    'scan_fs':     case_scan_fs,
+    'scan':        case_scan,
+    'bundle_info': case_bundle_info,
+    'ttl_info':    case_ttl_info,
+    'open_dialog': case_open_dialog,
+    'search':      case_search,
+    'startup':     case_startup,
+    'archive':     case_archive,
+}
+
+# perf_counter has no defined reference point, so startup time is taken from the process start time instead
+def _get_process_uptime():
+    try:
+        with open("/proc/self/stat", 'r') as fh:
+            starttime = int(fh.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", 'r') as fh:
+            uptime = float(fh.read().split()[0])
+        return uptime - starttime / os.sysconf("SC_CLK_TCK")
+    except (IOError, OSError, ValueError, IndexError):
+        return 0.0
+
+WORKER_START = time.perf_counter() - _get_process_uptime()
+
+def run_worker(case, libdir, sample):
+    try:
+        result = CASES[case](libdir, sample)
+        result['status'] = "ok"
+    except SkipCase as e:
+        result = { 'status': "skipped", 'reason': str(e) }
+    except Exception as e:
+        result = { 'status': "error", 'reason': "%s: %s" % (type(e).__name__, e) }
+
+    sys.stdout.flush()
+    print(RESULT_PREFIX + json.dumps(result))
+    sys.stdout.flush()
+
+    # don't spend time (or crash) tearing down Qt and mod-ui
+    os._exit(0)
+
+# ------------------------------------------------------------------------------------------------------------
+# Runner side
+
+def run_case(case, libdir, sample, timeout):
+    env = os.environ.copy()
+    env['LV2_PATH'] = libdir
+
+    try:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", case, libdir, str(sample)],
+                              env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return { 'status': "error", 'reason': "timed out after %i s" % timeout }
+
+    for line in reversed(proc.stdout.decode("utf-8", errors="replace").splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+
+    stderr = proc.stderr.decode("utf-8", errors="replace").strip().splitlines()
+    return { 'status': "error", 'reason': stderr[-1] if stderr else "exit code %i" % proc.returncode }
+
+def summarize(runs):
+    oks = [r for r in runs if r['status'] == "ok"]
+
+    if len(oks) != len(runs):
+        failed = [r for r in runs if r['status'] != "ok"][0]
+        return { 'status': failed['status'], 'reason': failed.get('reason', "") }
+
+    times = sorted(r['ms'] for r in oks)
+    extra = dict((k, v) for k, v in oks[-1].items() if k not in ('ms', 'status'))
+
+    summary = {
+        'status': "ok",
+        'runs':   [round(t, 3) for t in times],
+        'min':    round(times[0], 3),
+        'median': round(times[len(times) // 2], 3),
+        'max':    round(times[-1], 3),
+    }
+    summary.update(extra)
+
+    return summary
+
+def get_git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=CWD,
+                                       stderr=subprocess.DEVNULL).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def run_suite(args):
+    from pedalboardgen import generate_library
+
+    results = {
+        'meta': {
+            'date':     time.strftime("%Y-%m-%d %H:%M:%S"),
+            'revision': get_git_revision(),
+            'python':   platform.python_version(),
+            'platform': platform.platform(),
+            'machine':  platform.machine(),
+            'cpus':     os.cpu_count(),
+            'repeat':   args.repeat,
+            'sample':   args.sample,
+            'blocks':   args.blocks,
+        },
+        'results': {},
+    }
+
+    for size in args.sizes:
+        libdir = os.path.join(args.workdir, "library-%i" % size)
+
+        print("generating %i pedalboards in %s..." % (size, libdir))
+        generate_library(libdir, size, args.blocks)
+
+        sizeResults = results['results'][str(size)] = {}
+
+        for case in args.cases:
+            runs = []
+
+            for _ in range(args.repeat):
+                run = run_case(case, libdir, args.sample, args.timeout)
+                runs.append(run)
+
+                if run['status'] != "ok":
+                    break
+
+            summary = sizeResults[case] = summarize(runs)
+
+            if summary['status'] == "ok":
+                print("  %-12s %6i: %10.1f ms" % (case, size, summary['median']))
+            else:
+                print("  %-12s %6i: %s (%s)" % (case, size, summary['status'], summary['reason']))
+
+    with open(args.output, 'w') as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+
+    print("results written to %s" % args.output)
+    return results
+
+# ------------------------------------------------------------------------------------------------------------
+# Compare two result files, returns the number of regressions
+
+def compare(old, new, threshold):
+    regressions = 0
+
+    print("%-12s %6s %12s %12s %8s" % ("case", "size", "old ms", "new ms", "change"))
+
+    for size, cases in sorted(new['results'].items(), key=lambda x: int(x[0])):
+        for case, result in sorted(cases.items()):
+            oldResult = old['results'].get(size, {}).get(case)
+
+            if oldResult is None or oldResult['status'] != "ok" or result['status'] != "ok":
+                continue
+
+            change = (result['median'] - oldResult['median']) * 100.0 / max(oldResult['median'], 0.001)
+            flag   = ""
+
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+
+            print("%-12s %6s %12.1f %12.1f %+7.1f%%%s" % (case, size, oldResult['median'], result['median'], change, flag))
+
+    return regressions
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line
+
+if __name__ == '__main__':
+    if len(sys.argv) == 5 and sys.argv[1] == "--worker":
+        sys.path.insert(0, CWD)
+        run_worker(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="MOD-App pedalboard library benchmarks")
+    parser.add_argument("--sizes",     type=lambda s: [int(x) for x in s.split(",")], default=list(DEFAULT_SIZES),
+                        help="comma-separated library sizes (default: %s)" % ",".join(str(s) for s in DEFAULT_SIZES))
+    parser.add_argument("--cases",     type=lambda s: s.split(","), default=list(CASES.keys()),
+                        help="comma-separated cases to run (default: all of %s)" % ",".join(CASES.keys()))
+    parser.add_argument("--repeat",    type=int, default=DEFAULT_REPEAT, help="runs per case")
+    parser.add_argument("--sample",    type=int, default=DEFAULT_SAMPLE, help="bundles timed by bundle_info and ttl_info")
+    parser.add_argument("--blocks",    type=int, default=6, help="average plugins per generated pedalboard")
+    parser.add_argument("--timeout",   type=int, default=600, help="timeout for a single run, in seconds")
+    parser.add_argument("--workdir",   default=os.path.join(tempfile.gettempdir(), "mod-app-benchmark"),
+                        help="where generated libraries are kept between runs")
+    parser.add_argument("--output",    default="benchmark-results.json", help="JSON results file")
+    parser.add_argument("--compare",   metavar="OLD_JSON", help="compare against a previous results file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown in %% reported as a regression (default: %.0f)" % DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    for case in args.cases:
+        if case not in CASES:
+            parser.error("unknown case '%s'" % case)
+
+    sys.path.insert(0, CWD)
+    new = run_suite(args)
+
+    if args.compare:
+        with open(args.compare, 'r') as fh:
+            old = json.load(fh)
+
+        if compare(old, new, args.threshold) > 0:
+            sys.exit(1)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Pedalboard deduplication tests
+# Checks that ContentStore (mod_dedup.py) links identical files of pedalboard bundles to a single store object,
+# leaves recently modified files alone and removes unused objects, and that unshareBundle gives a bundle its own
+# copies again, so a shared file is never changed in place in every bundle.
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# ------------------------------------------------------------------------------------------------------------
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.dirname(CWD)
+
+# ------------------------------------------------------------------------------------------------------------
+
+# Write @a files (name -> content) into a new bundle, dated @a age seconds ago
+def make_bundle(tmpdir, name, files, age=3600):
+    bundle = os.path.join(tmpdir, "pedalboards", name + ".pedalboard")
+    mtime  = time.time() - age
+    os.makedirs(bundle)
+
+    for filename, data in files.items():
+        path = os.path.join(bundle, filename)
+
+        with open(path, 'wb') as fh:
+            fh.write(data)
+
+        os.utime(path, (mtime, mtime))
+
+    return bundle
+
+def make_store(tmpdir):
+    from mod_dedup import ContentStore
+    return ContentStore(os.path.join(tmpdir, "pedalboards", ".store"))
+
+def get_inode(path):
+    st = os.stat(path)
+    return (st.st_dev, st.st_ino)
+
+def check(errors, what, value, expected):
+    if value != expected:
+        errors.append("%s is %r, expected %r" % (what, value, expected))
+
+# content that is big enough to be deduplicated
+def make_data(seed):
+    return (("%s\n" % seed) * 200).encode("utf-8")
+
+# ------------------------------------------------------------------------------------------------------------
+
+# Identical files of different bundles become links to one store object, unique files stay as they are
+def test_link(tmpdir):
+    store  = make_store(tmpdir)
+    errors = []
+
+    shared  = make_data("shared")
+    bundles = [make_bundle(tmpdir, "pb%i" % i, { "thumbnail.png": shared, "pb.ttl": make_data("x" * (i + 1)) })
+               for i in range(3)]
+
+    report = store.compact(bundles)
+
+    check(errors, "linked files", report['linked'], 2)
+    check(errors, "store objects", report['objects'], 1)
+    check(errors, "distinct thumbnail inodes",
+          len(set(get_inode(os.path.join(bundle, "thumbnail.png")) for bundle in bundles)), 1)
+    check(errors, "links to the thumbnail", os.stat(os.path.join(bundles[0], "thumbnail.png")).st_nlink, 4)
+    check(errors, "links to a unique file", os.stat(os.path.join(bundles[0], "pb.ttl")).st_nlink, 1)
+
+    for bundle in bundles:
+        with open(os.path.join(bundle, "thumbnail.png"), 'rb') as fh:
+            check(errors, "content of %s" % os.path.basename(bundle), fh.read() == shared, True)
+
+    # a second run finds nothing new
+    report = store.compact(bundles)
+    check(errors, "linked files on the second run", report['linked'], 0)
+    check(errors, "hashed files on the second run", report['hashed'], 0)
+
+    return errors, "3 bundles sharing a file"
+
+# Unsharing gives a bundle its own copies, writing to them leaves the other bundles and the store unchanged
+def test_unshare(tmpdir):
+    from mod_dedup import unshareBundle
+
+    store  = make_store(tmpdir)
+    errors = []
+
+    shared  = make_data("shared")
+    bundles = [make_bundle(tmpdir, "pb%i" % i, { "pb.ttl": shared, "manifest.ttl": make_data("manifest") })
+               for i in range(2)]
+
+    store.compact(bundles)
+
+    check(errors, "files unshared", unshareBundle(bundles[0]), 2)
+    check(errors, "files unshared the second time", unshareBundle(bundles[0]), 0)
+
+    for filename in ("pb.ttl", "manifest.ttl"):
+        check(errors, "links to %s after unsharing" % filename,
+              os.stat(os.path.join(bundles[0], filename)).st_nlink, 1)
+
+    with open(os.path.join(bundles[0], "pb.ttl"), 'wb') as fh:
+        fh.write(make_data("edited"))
+
+    with open(os.path.join(bundles[1], "pb.ttl"), 'rb') as fh:
+        check(errors, "other bundle unchanged", fh.read() == shared, True)
+
+    return errors, "unshare and write in place"
+
+# Files modified within the settle time may still be being written, they are left for the next run
+def test_settle(tmpdir):
+    from mod_dedup import DEDUP_SETTLE_TIME
+
+    store  = make_store(tmpdir)
+    errors = []
+
+    shared = make_data("shared")
+    old    = make_bundle(tmpdir, "old", { "pb.ttl": shared })
+    old2   = make_bundle(tmpdir, "old2", { "pb.ttl": shared })
+    new    = make_bundle(tmpdir, "new", { "pb.ttl": shared }, age=DEDUP_SETTLE_TIME / 2)
+
+    report = store.compact([old, old2, new])
+
+    check(errors, "linked files", report['linked'], 1)
+    check(errors, "links to the new file", os.stat(os.path.join(new, "pb.ttl")).st_nlink, 1)
+    check(errors, "links to the old file", os.stat(os.path.join(old, "pb.ttl")).st_nlink, 3)
+
+    return errors, "a file within %i s" % DEDUP_SETTLE_TIME
+
+# Objects are removed once no bundle links to them anymore
+def test_garbage(tmpdir):
+    store  = make_store(tmpdir)
+    errors = []
+
+    bundles  = [make_bundle(tmpdir, "pb%i" % i, { "pb.ttl": make_data("shared") }) for i in range(2)]
+    bundles += [make_bundle(tmpdir, "other%i" % i, { "pb.ttl": make_data("other") }) for i in range(2)]
+
+    check(errors, "store objects", store.compact(bundles)['objects'], 2)
+
+    for bundle in bundles[:2]:
+        shutil.rmtree(bundle)
+
+    report = store.compact(bundles[2:])
+
+    check(errors, "objects removed", report['removed'], 1)
+    check(errors, "store objects after removing", report['objects'], 1)
+    check(errors, "links to the remaining object", os.stat(os.path.join(bundles[2], "pb.ttl")).st_nlink, 3)
+
+    return errors, "2 of 4 bundles deleted"
+
+TESTS = {
+    'link':    test_link,
+    'unshare': test_unshare,
+    'settle':  test_settle,
+    'garbage': test_garbage,
+}
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MOD-App pedalboard deduplication tests")
+    parser.add_argument("tests", nargs="*", help="tests to run (default: all of %s)" % ", ".join(sorted(TESTS)))
+    args = parser.parse_args()
+
+    for name in args.tests:
+        if name not in TESTS:
+            parser.error("unknown test '%s'" % name)
+
+    sys.path.insert(0, SOURCE_DIR)
+
+    failed = False
+
+    for name in args.tests or sorted(TESTS):
+        tmpdir = tempfile.mkdtemp(prefix="mod-deduptest-")
+
+        try:
+            errors, info = TESTS[name](tmpdir)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        print("%-8s %s (%s)" % (name, "FAILED" if errors else "ok", info))
+
+        for error in errors[:10]:
+            print("    " + error)
+
+        failed = failed or len(errors) > 0
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# DSP monitor tests
+# Runs DspMonitor (mod_dsp.py) against jackd's dummy driver: checks the load samples and the size of the history,
+# that xruns caused by a slow client right after a (simulated) pedalboard switch are flagged, and that the monitor
+# stops when the server goes away.
+#
+# Needs jackd and libjack. Every run uses its own JACK server name, so a JACK server that is already running on
+# the machine is not touched.
+
+import os
+import subprocess
+import sys
+import time
+
+# ------------------------------------------------------------------------------------------------------------
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.dirname(CWD)
+
+DUMMY_SERVER = ["jackd", "--no-realtime", "-d", "dummy", "-r", "48000", "-p", "256"]
+
+# the slow client sleeps this long (in s) every HOG_EVERY cycles, a cycle is 5.3 ms
+HOG_SLEEP = 0.02
+HOG_EVERY = 50
+
+# time between samples during the tests (in ms)
+SAMPLE_INTERVAL = 100
+
+# ------------------------------------------------------------------------------------------------------------
+
+def wait_for_server(timeout):
+    return subprocess.call(["jack_wait", "-w", "-t", str(timeout)], stdout=subprocess.DEVNULL) == 0
+
+# A client that sleeps in its process callback now and then, which makes the server xrun
+class SlowClient(object):
+    def __init__(self):
+        from mod_dsp import JackNoStartServer, libjack
+        from ctypes import CFUNCTYPE, c_int, c_uint32, c_void_p
+
+        # the monitor itself has no process callback
+        JackProcessCallback = CFUNCTYPE(c_int, c_uint32, c_void_p)
+        libjack.jack_set_process_callback.argtypes = [c_void_p, JackProcessCallback, c_void_p]
+
+        self.fLib      = libjack
+        self.fCycles   = 0
+        self.fEnabled  = False
+        self.fCallback = JackProcessCallback(self.process)
+        self.fClient   = libjack.jack_client_open(b"mod-app-slow-client", JackNoStartServer, c_int(0))
+
+        libjack.jack_set_process_callback(self.fClient, self.fCallback, None)
+        libjack.jack_activate(self.fClient)
+
+    def process(self, frames, arg):
+        self.fCycles += 1
+        if self.fEnabled and self.fCycles % HOG_EVERY == 0:
+            time.sleep(HOG_SLEEP)
+        return 0
+
+    def close(self):
+        self.fLib.jack_deactivate(self.fClient)
+        self.fLib.jack_client_close(self.fClient)
+
+# Run the Qt event loop for @a duration ms, calling monitor.sample() every SAMPLE_INTERVAL ms
+def run_monitor(app, monitor, duration, callback=None):
+    from PyQt5.QtCore import QTimer
+
+    timer = QTimer()
+    timer.timeout.connect(monitor.sample)
+    timer.start(SAMPLE_INTERVAL)
+
+    if callback is not None:
+        QTimer.singleShot(duration // 2, callback)
+
+    QTimer.singleShot(duration, app.quit)
+    app.exec_()
+    timer.stop()
+
+# ------------------------------------------------------------------------------------------------------------
+
+def test_load(app, monitor, server):
+    from mod_dsp import DSP_HISTORY_SIZE
+
+    errors = []
+    run_monitor(app, monitor, 2000)
+
+    history = monitor.getHistory()
+
+    if len(history) < 2000 // SAMPLE_INTERVAL // 2:
+        errors.append("only %i samples in 2 s" % len(history))
+
+    for sampleTime, load, xruns in history:
+        if not 0.0 <= load <= 100.0:
+            errors.append("load out of range: %f" % load)
+            break
+
+    if monitor.getEngineInfo() != (48000, 256):
+        errors.append("unexpected engine info %s" % (monitor.getEngineInfo(),))
+
+    # the history never grows past its size
+    for i in range(DSP_HISTORY_SIZE * 2):
+        monitor.sample()
+
+    if len(monitor.getHistory()) != DSP_HISTORY_SIZE:
+        errors.append("history has %i samples, expected %i" % (len(monitor.getHistory()), DSP_HISTORY_SIZE))
+
+    return errors, "%.1f%% peak, %i xruns" % (monitor.getPeakLoad(), monitor.getXrunCount())
+
+def test_switch(app, monitor, server):
+    from mod_dsp import DSP_SWITCH_WINDOW
+
+    errors   = []
+    flagged  = []
+    slow     = SlowClient()
+    duration = int(DSP_SWITCH_WINDOW * 1000) * 2
+
+    monitor.switchXruns.connect(flagged.append)
+
+    # a quiet switch first, nothing to report
+    monitor.markSwitch()
+    run_monitor(app, monitor, duration)
+
+    quiet = list(flagged)
+
+    def startSwitch():
+        monitor.markSwitch()
+        slow.fEnabled = True
+
+    run_monitor(app, monitor, duration, startSwitch)
+    slow.close()
+
+    if len(quiet) > 0:
+        errors.append("quiet switch flagged with %i xruns" % quiet[0])
+
+    if monitor.getXrunCount() == 0:
+        errors.append("the slow client caused no xruns")
+    elif len(flagged) == len(quiet):
+        errors.append("%i xruns but the switch was not flagged" % monitor.getXrunCount())
+
+    return errors, "%i xruns, flagged %s" % (monitor.getXrunCount(), flagged[len(quiet):])
+
+def test_shutdown(app, monitor, server):
+    errors = []
+
+    run_monitor(app, monitor, 500, server.terminate)
+    server.wait()
+
+    if monitor.isRunning():
+        errors.append("still running after the server went away")
+
+    return errors, "server exit code %i" % server.returncode
+
+TESTS = {
+    'load':     test_load,
+    'switch':   test_switch,
+    'shutdown': test_shutdown,
+}
+
+def run_test(name):
+    from PyQt5.QtCore import QCoreApplication
+    from mod_dsp import DspMonitor
+
+    os.environ['JACK_DEFAULT_SERVER'] = "mod-app-test-%i-%s" % (os.getpid(), name)
+
+    server = subprocess.Popen(DUMMY_SERVER, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    if not wait_for_server(10):
+        server.kill()
+        return ["could not start the JACK server for the test"], ""
+
+    app     = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    monitor = DspMonitor(None)
+
+    if not monitor.start():
+        errors, info = ["could not connect to the JACK server"], ""
+    else:
+        errors, info = TESTS[name](app, monitor, server)
+        monitor.stop()
+
+    if server.poll() is None:
+        server.terminate()
+        server.wait()
+
+    return errors, info
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MOD-App DSP monitor tests")
+    parser.add_argument("tests", nargs="*", help="tests to run (default: all of %s)" % ", ".join(sorted(TESTS)))
+    args = parser.parse_args()
+
+    for name in args.tests:
+        if name not in TESTS:
+            parser.error("unknown test '%s'" % name)
+
+    for tool in ("jackd", "jack_wait"):
+        if subprocess.call(["which", tool], stdout=subprocess.DEVNULL) != 0:
+            print("%s not found, skipping" % tool)
+            sys.exit(0)
+
+    sys.path.insert(0, SOURCE_DIR)
+
+    from mod_dsp import libjack
+
+    if libjack is None:
+        print("libjack not found, skipping")
+        sys.exit(0)
+
+    failures = 0
+
+    for name in args.tests or sorted(TESTS):
+        errors, info = run_test(name)
+
+        print("%-10s %s  %s" % (name, "FAIL" if errors else "ok  ", info))
+
+        for error in errors:
+            print("    %s" % error)
+
+        if errors:
+            failures += 1
+
+        # let the test server go away before the next one
+        time.sleep(0.5)
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Scriptable stand-in for mod-host
+# Listens on the same command and feedback ports as the real thing and answers every command with "resp 0", so
+# that mod-ui and the app can run without JACK or any plugins.
+#
+# Its behaviour follows a scenario, which is a JSON object with any of these keys:
+#   boot_delay            seconds to wait before listening and printing "mod-host ready!"
+#   never_ready           listen, but never print the ready line
+#   latency, jitter       delay for each response, in ms (jitter is random, added on top of latency)
+#   log_rate              lines per second printed to stdout, to flood the app's log reader
+#   crash_after           seconds after being ready to crash with SIGSEGV
+#   crash_after_commands  number of commands to handle before crashing with SIGSEGV
+#   hang_after_commands   number of commands to handle before no longer responding
+#   exit_after            seconds after being ready to exit normally, with exit_code
+#   exit_code             exit code used by exit_after
+#   stop_delay            seconds to wait after SIGTERM before exiting, to exercise the forced-kill path
+#
+# The scenario is taken from --scenario or from the MOD_FAKEHOST_SCENARIO environment variable, either as a path
+# to a JSON file or as inline JSON. Using the environment makes it possible to run this as the app's backend
+# (see MOD_APP_HOST_PATH in mod_common.py), which always gets mod-host's own arguments.
+
+import json
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+
+# ------------------------------------------------------------------------------------------------------------
+
+DEFAULT_COMMAND_PORT  = 5555
+DEFAULT_FEEDBACK_PORT = 5556
+
+DEFAULT_SCENARIO = {
+    'boot_delay':           0.0,
+    'never_ready':          False,
+    'latency':              0.0,
+    'jitter':               0.0,
+    'log_rate':             0,
+    'crash_after':          None,
+    'crash_after_commands': None,
+    'hang_after_commands':  None,
+    'exit_after':           None,
+    'exit_code':            0,
+    'stop_delay':           0.0,
+}
+
+# ------------------------------------------------------------------------------------------------------------
+# Parse a scenario from a file path or inline JSON, unknown keys are an error to catch typos early
+
+def load_scenario(value):
+    scenario = DEFAULT_SCENARIO.copy()
+
+    if not value:
+        return scenario
+
+    if os.path.isfile(value):
+        with open(value, 'r') as fh:
+            value = fh.read()
+
+    data = json.loads(value)
+
+    for key in data:
+        if key not in DEFAULT_SCENARIO:
+            raise ValueError("unknown scenario key '%s'" % key)
+
+    scenario.update(data)
+    return scenario
+
+def crash():
+    sys.stdout.flush()
+    os.kill(os.getpid(), signal.SIGSEGV)
+
+# ------------------------------------------------------------------------------------------------------------
+
+class FakeHost(object):
+    def __init__(self, commandPort=DEFAULT_COMMAND_PORT, feedbackPort=DEFAULT_FEEDBACK_PORT, scenario=None):
+        self.commandPort  = commandPort
+        self.feedbackPort = feedbackPort
+        self.scenario     = scenario if scenario is not None else DEFAULT_SCENARIO.copy()
+        self.commandCount = 0
+        self.lock         = threading.Lock()
+        self.sockets      = []
+
+    def listen(self, port, handler):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", port))
+        sock.listen(5)
+        self.sockets.append(sock)
+
+        def accept():
+            while True:
+                try:
+                    conn, _ = sock.accept()
+                except OSError:
+                    break
+                threading.Thread(target=handler, args=(conn,), daemon=True).start()
+
+        threading.Thread(target=accept, daemon=True).start()
+
+    def start(self):
+        self.listen(self.commandPort, self.handleCommands)
+        self.listen(self.feedbackPort, self.handleFeedback)
+
+    def stop(self):
+        for sock in self.sockets:
+            sock.close()
+        self.sockets = []
+
+    # --------------------------------------------------------------------------------------------------------
+
+    def reply(self, command):
+        scenario = self.scenario
+
+        with self.lock:
+            self.commandCount += 1
+            count = self.commandCount
+
+        if scenario['crash_after_commands'] is not None and count >= scenario['crash_after_commands']:
+            crash()
+
+        if scenario['hang_after_commands'] is not None and count > scenario['hang_after_commands']:
+            return None
+
+        delay = scenario['latency'] + random.random() * scenario['jitter']
+
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+        return "resp 0"
+
+    def handleCommands(self, conn):
+        buf = b""
+
+        while True:
+            try:
+                data = conn.recv(4096)
+            except OSError:
+                break
+            if not data:
+                break
+
+            buf += data
+
+            # commands are null-terminated
+            while b"\0" in buf:
+                command, buf = buf.split(b"\0", 1)
+                resp = self.reply(command.decode("utf-8", errors="replace").strip())
+
+                if resp is None:
+                    continue
+
+                try:
+                    conn.sendall(resp.encode("utf-8") + b"\0")
+                except OSError:
+                    return
+
+        conn.close()
+
+    def handleFeedback(self, conn):
+        # nothing is ever sent back, just keep the connection open until the client goes away
+        while True:
+            try:
+                if not conn.recv(4096):
+                    break
+            except OSError:
+                break
+
+        conn.close()
+
+    # --------------------------------------------------------------------------------------------------------
+    # Follow the timed parts of the scenario, returns the exit code
+
+    def run(self):
+        scenario = self.scenario
+
+        if scenario['boot_delay'] > 0:
+            time.sleep(scenario['boot_delay'])
+
+        self.start()
+
+        if not scenario['never_ready']:
+            print("mod-host ready!")
+            sys.stdout.flush()
+
+        readyTime = time.time()
+        logTime   = readyTime
+        logCount  = 0
+
+        while True:
+            now = time.time()
+
+            if scenario['crash_after'] is not None and now - readyTime >= scenario['crash_after']:
+                crash()
+
+            if scenario['exit_after'] is not None and now - readyTime >= scenario['exit_after']:
+                self.stop()
+                return scenario['exit_code']
+
+            if scenario['log_rate'] > 0:
+                due = int((now - logTime) * scenario['log_rate'])
+
+                for _ in range(due):
+                    logCount += 1
+                    print("\x1b[0;33mfake log line %i, handled %i commands\x1b[0m" % (logCount, self.commandCount))
+
+                if due > 0:
+                    logTime += due / float(scenario['log_rate'])
+                    sys.stdout.flush()
+
+            time.sleep(0.01 if scenario['log_rate'] > 0 else 0.1)
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line, same port arguments as mod-host
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stand-in for mod-host")
+    parser.add_argument("-p", "--socket-port",   type=int, default=DEFAULT_COMMAND_PORT)
+    parser.add_argument("-f", "--feedback-port", type=int, default=DEFAULT_FEEDBACK_PORT)
+    parser.add_argument("-v", "--verbose", action="store_true", help="accepted for compatibility, ignored")
+    parser.add_argument("-n", "--nofork",  action="store_true", help="accepted for compatibility, ignored")
+    parser.add_argument("--scenario", default=os.getenv("MOD_FAKEHOST_SCENARIO", ""),
+                        help="scenario as JSON file or inline JSON")
+    args = parser.parse_args()
+
+    host = FakeHost(args.socket_port, args.feedback_port, load_scenario(args.scenario))
+
+    def signalHandler(sig, frame):
+        if host.scenario['stop_delay'] > 0:
+            time.sleep(host.scenario['stop_delay'])
+        host.stop()
+        print("handled %i commands" % host.commandCount)
+        sys.stdout.flush()
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, signalHandler)
+    signal.signal(signal.SIGINT,  signalHandler)
+
+    sys.exit(host.run())
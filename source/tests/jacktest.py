@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# JACK lifecycle tests
+# Runs JackManager (mod_jack.py) against jackd's dummy driver in a few situations and checks the outcome, how
+# long it took, and that the Qt event loop never stalled while waiting.
+#
+# Needs jackd, jack_wait and jack_load. Every run uses its own JACK server name, so a JACK server that is
+# already running on the machine is not touched.
+
+import os
+import subprocess
+import sys
+import time
+
+# ------------------------------------------------------------------------------------------------------------
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.dirname(CWD)
+
+DUMMY_SERVER = ["jackd", "--no-realtime", "-d", "dummy", "-r", "48000", "-p", "256"]
+
+# event loop ticks later than this count as a stall (in ms)
+MAX_STALL = 100
+
+# Each scenario has:
+#   running  start a JACK server before the manager
+#   command  server command given to the manager
+#   clients  internal clients to load
+#   wait     manager wait timeout, in s
+#   expect   "ready" or "failed"
+#   max      maximum time for the outcome, in ms
+SCENARIOS = {
+    'start-dummy': {
+        'running': False,
+        'command': DUMMY_SERVER,
+        'clients': [],
+        'wait':    10,
+        'expect':  "ready",
+        'max':     10000,
+    },
+    'already-running': {
+        'running': True,
+        'command': [],
+        'clients': [],
+        'wait':    10,
+        'expect':  "ready",
+        'max':     2000,
+    },
+    'no-server': {
+        'running': False,
+        'command': [],
+        'clients': [],
+        'wait':    2,
+        'expect':  "failed",
+        'max':     8000,
+    },
+    'bad-server': {
+        'running': False,
+        'command': ["jackd", "--no-realtime", "-d", "no-such-driver"],
+        'clients': [],
+        'wait':    5,
+        'expect':  "failed",
+        'max':     11000,
+    },
+    'bad-client': {
+        'running': True,
+        'command': [],
+        'clients': ["no-such-client"],
+        'wait':    10,
+        'expect':  "ready",
+        'max':     12000,
+    },
+}
+
+# ------------------------------------------------------------------------------------------------------------
+
+def wait_for_server(timeout):
+    return subprocess.call(["jack_wait", "-w", "-t", str(timeout)], stdout=subprocess.DEVNULL) == 0
+
+def run_scenario(name, scenario):
+    from PyQt5.QtCore import QCoreApplication, QElapsedTimer, QTimer
+    from mod_jack import JackManager
+
+    os.environ['JACK_DEFAULT_SERVER'] = "mod-app-test-%i-%s" % (os.getpid(), name)
+
+    server = None
+
+    if scenario['running']:
+        server = subprocess.Popen(DUMMY_SERVER, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not wait_for_server(10):
+            server.kill()
+            return ["could not start the JACK server for the test"], 0, 0
+
+    app     = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    manager = JackManager(None)
+    result  = []
+    stalls  = [0]
+
+    manager.setServerCommand(scenario['command'])
+    manager.setTimeouts(scenario['wait'], 5)
+    manager.progress.connect(lambda text: print("    | " + text))
+    manager.ready.connect(lambda: result.append(("ready", "")))
+    manager.failed.connect(lambda error: result.append(("failed", error)))
+
+    # a tick every 10 ms, the longest gap between two of them is the worst stall
+    clock = QElapsedTimer()
+    clock.start()
+    last  = [0]
+
+    def tick():
+        now = clock.elapsed()
+        stalls[0] = max(stalls[0], now - last[0] - 10)
+        last[0] = now
+        if result:
+            app.quit()
+
+    ticker = QTimer()
+    ticker.timeout.connect(tick)
+    ticker.start(10)
+
+    QTimer.singleShot(scenario['max'] + 5000, app.quit)
+    manager.start(scenario['clients'])
+    app.exec_()
+
+    ticker.stop()
+    elapsed = manager.getElapsed()
+    manager.abort()
+    manager.stopServer()
+
+    if server is not None:
+        server.terminate()
+        server.wait()
+
+    errors = []
+
+    if not result:
+        errors.append("no outcome")
+    elif result[0][0] != scenario['expect']:
+        errors.append("expected %s, got %s %s" % (scenario['expect'], result[0][0], result[0][1]))
+
+    if elapsed > scenario['max']:
+        errors.append("took %i ms > %i ms" % (elapsed, scenario['max']))
+
+    if stalls[0] > MAX_STALL:
+        errors.append("event loop stalled for %i ms" % stalls[0])
+
+    return errors, elapsed, stalls[0]
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MOD-App JACK lifecycle tests")
+    parser.add_argument("scenarios", nargs="*", help="scenarios to run (default: all of %s)" % ", ".join(sorted(SCENARIOS)))
+    args = parser.parse_args()
+
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error("unknown scenario '%s'" % name)
+
+    for tool in ("jackd", "jack_wait", "jack_load"):
+        if subprocess.call(["which", tool], stdout=subprocess.DEVNULL) != 0:
+            print("%s not found, skipping" % tool)
+            sys.exit(0)
+
+    sys.path.insert(0, SOURCE_DIR)
+
+    failures = 0
+
+    for name in args.scenarios or sorted(SCENARIOS):
+        errors, elapsed, stall = run_scenario(name, SCENARIOS[name])
+
+        print("%-16s %s  %i ms, worst stall %i ms" % (name, "FAIL" if errors else "ok  ", elapsed, stall))
+
+        for error in errors:
+            print("    %s" % error)
+
+        if errors:
+            failures += 1
+
+        # let the test server go away before the next one
+        time.sleep(0.5)
+
+    sys.exit(1 if failures else 0)
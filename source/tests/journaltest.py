@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Pedalboard journal tests
+# Checks how PedalboardJournal (mod_journal.py) folds edits into net changes against the base bundle, reads a
+# journal back after a crash, and orders the replay of those changes.
+
+import os
+import shutil
+import sys
+import tempfile
+
+# ------------------------------------------------------------------------------------------------------------
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.dirname(CWD)
+
+# ------------------------------------------------------------------------------------------------------------
+
+def make_journal(tmpdir, name="journal"):
+    from mod_journal import PedalboardJournal
+    return PedalboardJournal(os.path.join(tmpdir, name + ".journal"))
+
+def check(errors, what, value, expected):
+    if value != expected:
+        errors.append("%s is %r, expected %r" % (what, value, expected))
+
+# ------------------------------------------------------------------------------------------------------------
+
+# Adding and then removing a plugin, or connecting and then disconnecting, leaves nothing to restore
+def test_cancel(tmpdir):
+    journal = make_journal(tmpdir)
+    errors  = []
+
+    journal.record(["load", "/pedalboards/base.pedalboard"])
+    journal.record(["add", "/graph/delay", "urn:delay", 10.0, 20.0])
+    journal.record(["pos", "/graph/delay", 30.0, 40.0])
+    journal.record(["param", "/graph/delay/time", 0.5])
+    journal.record(["connect", "/graph/capture_1", "/graph/delay/in"])
+    journal.record(["remove", "/graph/delay"])
+    journal.record(["connect", "/graph/capture_1", "/graph/playback_1"])
+    journal.record(["disconnect", "/graph/capture_1", "/graph/playback_1"])
+
+    check(errors, "hasChanges()", journal.hasChanges(), False)
+    check(errors, "getChangeCount()", journal.getChangeCount(), 0)
+    check(errors, "getEditCount()", journal.getEditCount(), 7)
+    check(errors, "getReplay()", journal.getReplay(), [])
+
+    journal.close()
+    return errors, "add/remove and connect/disconnect"
+
+# Connections of the base bundle that are removed and put back again cancel out too, in both directions
+def test_connections(tmpdir):
+    journal = make_journal(tmpdir)
+    errors  = []
+
+    journal.record(["disconnect", "/graph/reverb/out", "/graph/playback_1"])
+    journal.record(["connect", "/graph/reverb/out", "/graph/playback_1"])
+    check(errors, "state after disconnect + connect", (journal.fConnected, journal.fDisconnected), ([], []))
+
+    journal.record(["disconnect", "/graph/reverb/out", "/graph/playback_2"])
+    journal.record(["disconnect", "/graph/reverb/out", "/graph/playback_2"])
+    journal.record(["connect", "/graph/capture_1", "/graph/reverb/in"])
+    journal.record(["connect", "/graph/capture_1", "/graph/reverb/in"])
+
+    check(errors, "connected", journal.fConnected, [["/graph/capture_1", "/graph/reverb/in"]])
+    check(errors, "disconnected", journal.fDisconnected, [["/graph/reverb/out", "/graph/playback_2"]])
+    check(errors, "getChangeCount()", journal.getChangeCount(), 2)
+
+    journal.close()
+    return errors, "connect/disconnect undo lists"
+
+# Removing a plugin of the base bundle drops everything recorded for its params and ports
+def test_remove(tmpdir):
+    journal = make_journal(tmpdir)
+    errors  = []
+
+    journal.record(["param", "/graph/fuzz/gain", 3.0])
+    journal.record(["param", "/graph/fuzzy/gain", 1.0])
+    journal.record(["pos", "/graph/fuzz", 5.0, 6.0])
+    journal.record(["connect", "/graph/fuzz/out", "/graph/playback_1"])
+    journal.record(["disconnect", "/graph/capture_1", "/graph/fuzz/in"])
+    journal.record(["remove", "/graph/fuzz"])
+    journal.record(["remove", "/graph/fuzz"])
+
+    check(errors, "removed", journal.fRemoved, ["/graph/fuzz"])
+    check(errors, "params", journal.fParams, { "/graph/fuzzy/gain": 1.0 })
+    check(errors, "positions", journal.fPositions, {})
+    check(errors, "connections", (journal.fConnected, journal.fDisconnected), ([], []))
+    check(errors, "getChangeCount()", journal.getChangeCount(), 2)
+
+    journal.close()
+    return errors, "params and ports of a removed plugin"
+
+# A journal left behind by a crash is a snapshot, edits appended after it, and maybe a cut short last line
+def test_reload(tmpdir):
+    journal = make_journal(tmpdir)
+    errors  = []
+
+    journal.record(["load", "/pedalboards/base.pedalboard"])
+    journal.record(["add", "/graph/delay", "urn:delay", 10.0, 20.0])
+    journal.record(["param", "/graph/gain/level", -6.0])
+    journal.compact()
+    journal.record(["remove", "/graph/reverb"])
+    journal.record(["pos", "/graph/delay", 30.0, 40.0])
+    journal.record(["param", "/graph/gain/level", -3.0])
+
+    expected = journal.getSnapshot()
+    journal.fFile.close()
+    journal.fFile = None
+
+    with open(journal.fFilename, 'a') as fh:
+        fh.write('["param", "/graph/gain/le')
+
+    recovered = make_journal(tmpdir)
+    check(errors, "load()", recovered.load(), True)
+    check(errors, "recovered state", recovered.getSnapshot(), expected)
+    check(errors, "getBundle()", recovered.getBundle(), "/pedalboards/base.pedalboard")
+
+    recovered.close()
+    check(errors, "journal left after close()", os.path.exists(journal.fFilename), False)
+    return errors, "snapshot, edits and a truncated line"
+
+# Removes go first so added plugins can take their place, then connections, then values
+def test_replay(tmpdir):
+    journal = make_journal(tmpdir)
+    errors  = []
+
+    journal.record(["param", "/graph/gain/level", 0.5])
+    journal.record(["pos", "/graph/gain", 1.0, 2.0])
+    journal.record(["connect", "/graph/delay/out", "/graph/playback_1"])
+    journal.record(["disconnect", "/graph/gain/out", "/graph/playback_1"])
+    journal.record(["add", "/graph/delay", "urn:delay", 10.0, 20.0])
+    journal.record(["remove", "/graph/reverb"])
+
+    replay = journal.getReplay()
+    kinds  = [step[2].split("/")[2] if step[0] == "request" else step[1].split(" ")[0] for step in replay]
+
+    check(errors, "replay order", kinds, ["remove", "add", "disconnect", "connect", "param_set", "plugin_pos"])
+    check(errors, "replay length", len(replay), journal.getChangeCount())
+
+    # and replaying it into a fresh journal gives the same changes
+    from mod_journal import parseMessage, parseRequest
+
+    replayed = make_journal(tmpdir, "replayed")
+
+    for step in replay:
+        if step[0] == "request":
+            replayed.record(parseRequest(step[1], step[2], step[3]))
+        else:
+            replayed.record(parseMessage(step[1]))
+
+    for name in ("removed", "added", "connected", "disconnected", "params", "positions"):
+        check(errors, "replayed " + name, replayed.getSnapshot()[name], journal.getSnapshot()[name])
+
+    journal.close()
+    replayed.close()
+    return errors, "%i steps" % len(replay)
+
+TESTS = {
+    'cancel':      test_cancel,
+    'connections': test_connections,
+    'remove':      test_remove,
+    'reload':      test_reload,
+    'replay':      test_replay,
+}
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MOD-App pedalboard journal tests")
+    parser.add_argument("tests", nargs="*", help="tests to run (default: all of %s)" % ", ".join(sorted(TESTS)))
+    args = parser.parse_args()
+
+    for name in args.tests:
+        if name not in TESTS:
+            parser.error("unknown test '%s'" % name)
+
+    sys.path.insert(0, SOURCE_DIR)
+
+    failed = False
+
+    for name in args.tests or sorted(TESTS):
+        tmpdir = tempfile.mkdtemp(prefix="mod-journaltest-")
+
+        try:
+            errors, info = TESTS[name](tmpdir)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        print("%-12s %s (%s)" % (name, "FAILED" if errors else "ok", info))
+
+        for error in errors[:10]:
+            print("    " + error)
+
+        failed = failed or len(errors) > 0
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Backend lifecycle tests
+# Runs MOD-App with fakehost.py as its backend, once for each scenario below, and checks the lifecycle phases
+# HostWindow prints ("lifecycle: <phase> <ms> ms") against what the scenario should cause. Timings of every
+# phase are reported, and can be written as JSON for comparing runs.
+#
+# Works on a plain Linux box, no JACK or plugins needed. The app runs with the offscreen Qt platform unless
+# QT_QPA_PLATFORM is already set.
+
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+# ------------------------------------------------------------------------------------------------------------
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.dirname(CWD)
+
+LIFECYCLE_PREFIX = "lifecycle: "
+
+# Each scenario has:
+#   host     fakehost scenario
+#   expect   phases that must show up, in this order
+#   forbid   phases that must not show up
+#   until    phase after which the app is asked to quit (None waits for the timeout)
+#   timeout  seconds to wait for 'until'
+#   min      minimum time for a phase, in ms since start
+#   stop     maximum (or minimum, if negative) time between 'stop' and 'stopped', in ms
+SCENARIOS = {
+    'normal': {
+        'host':    {},
+        'expect':  ["start", "process", "ready", "webserver", "ui", "stop", "stopped"],
+        'forbid':  ["crashed", "error", "ui-failed"],
+        'until':   "ui",
+        'timeout': 30,
+        'stop':    2500,
+    },
+    'slow-boot': {
+        'host':    { 'boot_delay': 3.0 },
+        'expect':  ["start", "process", "ready", "webserver", "ui", "stop", "stopped"],
+        'forbid':  ["crashed", "error"],
+        'until':   "ui",
+        'timeout': 40,
+        'min':     { 'ready': 3000 },
+    },
+    'slow-responses': {
+        'host':    { 'latency': 20, 'jitter': 10 },
+        'expect':  ["start", "process", "ready", "webserver", "ui", "stop", "stopped"],
+        'forbid':  ["crashed", "error"],
+        'until':   "ui",
+        'timeout': 60,
+    },
+    'log-flood': {
+        'host':    { 'log_rate': 5000 },
+        'expect':  ["start", "process", "ready", "webserver", "ui", "stop", "stopped"],
+        'forbid':  ["crashed", "error"],
+        'until':   "ui",
+        'timeout': 40,
+    },
+    'never-ready': {
+        'host':    { 'never_ready': True },
+        'expect':  ["start", "process", "stop", "stopped"],
+        'forbid':  ["ready", "webserver", "ui"],
+        'until':   None,
+        'timeout': 5,
+    },
+    'crash-at-boot': {
+        'host':    { 'crash_after_commands': 1 },
+        'expect':  ["start", "process", "ready", "crashed"],
+        'forbid':  ["ui"],
+        'until':   "crashed",
+        'timeout': 30,
+    },
+    'crash-running': {
+        'host':    { 'crash_after': 8.0 },
+        'expect':  ["start", "process", "ready", "webserver", "ui", "crashed"],
+        'until':   "crashed",
+        'timeout': 40,
+    },
+    'exit-running': {
+        'host':    { 'exit_after': 8.0, 'exit_code': 1 },
+        'expect':  ["start", "process", "ready", "webserver", "ui", "finished"],
+        'forbid':  ["crashed"],
+        'until':   "finished",
+        'timeout': 40,
+    },
+    'slow-stop': {
+        'host':    { 'stop_delay': 10.0 },
+        'expect':  ["start", "process", "ready", "webserver", "ui", "stop", "stopped"],
+        'until':   "ui",
+        'timeout': 30,
+        # must be killed after the 2 s grace period instead of waiting for the backend
+        'stop':    5000,
+    },
+}
+
+# ------------------------------------------------------------------------------------------------------------
+
+def read_lines(stream, lines):
+    for line in iter(stream.readline, b""):
+        lines.put(line.decode("utf-8", errors="replace").rstrip())
+    lines.put(None)
+
+def run_scenario(name, scenario, libdir, verbose):
+    env = os.environ.copy()
+    env['MOD_APP_HOST_PATH']     = os.path.join(CWD, "fakehost.py")
+    env['MOD_FAKEHOST_SCENARIO'] = json.dumps(scenario['host'])
+    env['LV2_PATH']              = libdir
+    env['PYTHONUNBUFFERED']      = "1"
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    proc  = subprocess.Popen([sys.executable, os.path.join(SOURCE_DIR, "mod-app")], cwd=SOURCE_DIR, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    lines = queue.Queue()
+    threading.Thread(target=read_lines, args=(proc.stdout, lines), daemon=True).start()
+
+    phases   = []
+    deadline = time.time() + scenario['timeout']
+    quitting = False
+    closed   = False
+
+    while True:
+        timeout = deadline - time.time()
+
+        if timeout <= 0:
+            if not quitting:
+                quitting = True
+                deadline = time.time() + 15
+                proc.send_signal(signal.SIGTERM)
+                continue
+            proc.kill()
+            break
+
+        try:
+            line = lines.get(timeout=timeout)
+        except queue.Empty:
+            continue
+
+        if line is None:
+            closed = True
+            break
+
+        if verbose:
+            print("    | " + line)
+
+        if not line.startswith(LIFECYCLE_PREFIX):
+            continue
+
+        phase, ms, _ = line[len(LIFECYCLE_PREFIX):].split(" ")
+        phases.append((phase, int(ms)))
+
+        if phase == scenario['until'] and not quitting:
+            quitting = True
+            deadline = time.time() + 15
+            proc.send_signal(signal.SIGTERM)
+
+    proc.wait()
+
+    return check_scenario(scenario, phases, closed), phases
+
+def check_scenario(scenario, phases, closed):
+    errors = []
+    names  = [p[0] for p in phases]
+    times  = dict(reversed(phases))
+
+    if not closed:
+        errors.append("app did not quit")
+
+    # expected phases, in order
+    index = 0
+    for phase in scenario['expect']:
+        try:
+            index = names.index(phase, index) + 1
+        except ValueError:
+            errors.append("missing or out of order: %s" % phase)
+
+    for phase in scenario.get('forbid', []):
+        if phase in names:
+            errors.append("unexpected: %s" % phase)
+
+    for phase, minimum in scenario.get('min', {}).items():
+        if phase in times and times[phase] < minimum:
+            errors.append("%s too early: %i ms < %i ms" % (phase, times[phase], minimum))
+
+    if 'stop' in scenario and "stop" in times and "stopped" in times:
+        stopTime = times["stopped"] - times["stop"]
+        if stopTime > scenario['stop']:
+            errors.append("stopping took %i ms > %i ms" % (stopTime, scenario['stop']))
+
+    return errors
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line
+
+if __name__ == '__main__':
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="MOD-App backend lifecycle tests")
+    parser.add_argument("scenarios", nargs="*", help="scenarios to run (default: all of %s)" % ", ".join(sorted(SCENARIOS)))
+    parser.add_argument("--repeat",  type=int, default=1, help="runs per scenario")
+    parser.add_argument("--output",  help="write phase timings as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show the app output")
+    args = parser.parse_args()
+
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error("unknown scenario '%s'" % name)
+
+    sys.path.insert(0, CWD)
+    from pedalboardgen import generate_library
+
+    libdir = os.path.join(tempfile.gettempdir(), "mod-app-benchmark", "library-20")
+    generate_library(libdir, 20)
+
+    results  = {}
+    failures = 0
+
+    for name in args.scenarios or sorted(SCENARIOS):
+        results[name] = []
+
+        for run in range(args.repeat):
+            errors, phases = run_scenario(name, SCENARIOS[name], libdir, args.verbose)
+            results[name].append({ 'errors': errors, 'phases': phases })
+
+            print("%-16s %s  %s" % (name, "FAIL" if errors else "ok  ", ", ".join("%s %i" % p for p in phases)))
+
+            for error in errors:
+                print("    %s" % error)
+
+            if errors:
+                failures += 1
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+
+    sys.exit(1 if failures else 0)
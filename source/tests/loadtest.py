@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Load test for the embedded webserver
+# Runs the mod-ui webserver the same way MOD-App does (WebServerThread inside a Qt process) against the fake
+# mod-host from fakehost.py, then drives N concurrent simulated clients from a separate process. Each client
+# keeps a websocket open and does a random mix of parameter changes, page loads, pings and pedalboard loads,
+# like a tablet on stage would.
+#
+# Reported are throughput and latency percentiles per operation, plus how much the Qt main thread of the
+# server process was stalled while under load.
+#
+# Parameter changes are fire-and-forget websocket messages in mod-ui, their latency is the time until the
+# message was written out.
+
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+# ------------------------------------------------------------------------------------------------------------
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.dirname(CWD)
+MOD_UI_DIR = os.path.join(SOURCE_DIR, "modules", "mod-ui")
+
+DEFAULT_CLIENTS  = 8
+DEFAULT_DURATION = 30
+DEFAULT_THINK    = 50
+
+# operation -> relative weight, parameter changes are by far the most common thing clients do
+DEFAULT_MIX = {
+    'param': 70,
+    'ping':  15,
+    'page':  10,
+    'load':  5,
+}
+
+# Qt main thread is checked this often, anything later than STALL_THRESHOLD counts as a stall (both in ms)
+STALL_CHECK_INTERVAL = 10
+STALL_THRESHOLD      = 20
+
+RESULT_PREFIX = "@@loadtest "
+
+# ------------------------------------------------------------------------------------------------------------
+
+def get_percentile(sortedValues, pct):
+    if len(sortedValues) == 0:
+        return 0.0
+
+    index = int(round((len(sortedValues) - 1) * pct / 100.0))
+    return sortedValues[index]
+
+# ------------------------------------------------------------------------------------------------------------
+# Client side, runs in its own process so it doesn't compete with the server for the GIL
+
+def run_clients(addr, nclients, duration, think, mix, bundles, seed):
+    from urllib.parse import urlencode
+
+    from tornado import gen
+    from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+    from tornado.ioloop import IOLoop
+    from tornado.websocket import websocket_connect
+
+    AsyncHTTPClient.configure(None, max_clients=nclients * 2)
+
+    http      = AsyncHTTPClient()
+    latencies = dict((op, []) for op in mix)
+    errors    = dict((op, 0) for op in mix)
+    received  = [0]
+    ops       = list(mix.keys())
+    weights   = [mix[op] for op in ops]
+
+    async def read_messages(ws):
+        while True:
+            msg = await ws.read_message()
+            if msg is None:
+                break
+            received[0] += 1
+
+    async def client(index, deadline):
+        rng = random.Random("%i-%i" % (seed, index))
+
+        try:
+            ws = await websocket_connect(addr.replace("http://", "ws://") + "/websocket")
+        except Exception:
+            errors['param'] += 1
+            return
+
+        IOLoop.current().spawn_callback(read_messages, ws)
+
+        while time.time() < deadline:
+            op = rng.choices(ops, weights)[0]
+            t0 = time.perf_counter()
+
+            try:
+                if op == 'param':
+                    await ws.write_message("param_set /graph/lt_%i/gain %f" % (rng.randrange(8), rng.random()))
+                elif op == 'ping':
+                    await http.fetch(addr + "/ping")
+                elif op == 'page':
+                    await http.fetch(addr + "/")
+                elif op == 'load':
+                    body = urlencode({ 'bundlepath': rng.choice(bundles), 'isDefault': "0" })
+                    await http.fetch(HTTPRequest(addr + "/pedalboard/load_bundle/", method="POST", body=body,
+                                                 request_timeout=60))
+            except Exception:
+                errors[op] += 1
+            else:
+                latencies[op].append((time.perf_counter() - t0) * 1000)
+
+            await gen.sleep(rng.expovariate(1000.0 / think) if think > 0 else 0)
+
+        ws.close()
+
+    async def main():
+        deadline = time.time() + duration
+        await gen.multi([client(i, deadline) for i in range(nclients)])
+
+    start = time.time()
+    IOLoop.current().run_sync(main)
+    elapsed = time.time() - start
+
+    results = {
+        'clients':  nclients,
+        'elapsed':  elapsed,
+        'received': received[0],
+        'ops':      {},
+    }
+
+    for op in ops:
+        values = sorted(latencies[op])
+        results['ops'][op] = {
+            'count':  len(values),
+            'errors': errors[op],
+            'rate':   len(values) / elapsed if elapsed > 0 else 0.0,
+            'p50':    get_percentile(values, 50),
+            'p95':    get_percentile(values, 95),
+            'p99':    get_percentile(values, 99),
+            'max':    values[-1] if len(values) > 0 else 0.0,
+        }
+
+    print(RESULT_PREFIX + json.dumps(results))
+
+# ------------------------------------------------------------------------------------------------------------
+# Server side
+
+def run_server(args):
+    from pedalboardgen import generate_library
+
+    libdir  = os.path.join(args.workdir, "library-%i" % args.library)
+    bundles = generate_library(libdir, args.library)
+
+    if len(bundles) == 0:
+        args.mix.pop('load', None)
+
+    os.environ['LV2_PATH'] = libdir
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    # fake backend, must be running before the webserver connects to it
+    fakehost = subprocess.Popen([sys.executable, os.path.join(CWD, "fakehost.py")], stdout=subprocess.PIPE)
+
+    if fakehost.stdout.readline().decode("utf-8").strip() != "mod-host ready!":
+        fakehost.kill()
+        print("fake mod-host failed to start")
+        return 1
+
+    sys.path = [SOURCE_DIR, MOD_UI_DIR] + sys.path
+
+    from PyQt5.QtCore import QElapsedTimer, QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication(sys.argv[:1])
+
+    from mod_host import config, WebServerThread
+
+    state = {
+        'clients':   None,
+        'result':    None,
+        'lateness':  [],
+        'stalled':   0.0,
+        'monitor':   False,
+    }
+
+    clock = QElapsedTimer()
+    clock.start()
+    last  = [0]
+
+    def slot_checkStall():
+        now  = clock.elapsed()
+        late = now - last[0] - STALL_CHECK_INTERVAL
+        last[0] = now
+
+        if not state['monitor']:
+            return
+
+        state['lateness'].append(max(0, late))
+
+        if late > STALL_THRESHOLD:
+            state['stalled'] += late
+
+    def slot_pollClients():
+        proc = state['clients']
+
+        if proc is None or proc.poll() is None:
+            return
+
+        state['monitor'] = False
+        pollTimer.stop()
+
+        for line in proc.stdout.read().decode("utf-8", errors="replace").splitlines():
+            if line.startswith(RESULT_PREFIX):
+                state['result'] = json.loads(line[len(RESULT_PREFIX):])
+
+        app.quit()
+
+    def slot_serverRunning():
+        print("webserver running at %s, starting %i clients for %i s..." % (config["addr"], args.clients, args.duration))
+
+        last[0] = clock.elapsed()
+        state['monitor'] = True
+        state['clients'] = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--run-clients",
+                                             config["addr"], str(args.clients), str(args.duration), str(args.think),
+                                             json.dumps(args.mix), json.dumps(bundles), str(args.seed)],
+                                            stdout=subprocess.PIPE)
+        pollTimer.start(100)
+
+    def slot_serverTimeout():
+        if state['clients'] is None:
+            print("webserver did not start in time")
+            app.quit()
+
+    stallTimer = QTimer()
+    stallTimer.timeout.connect(slot_checkStall)
+    stallTimer.start(STALL_CHECK_INTERVAL)
+
+    pollTimer = QTimer()
+    pollTimer.timeout.connect(slot_pollClients)
+
+    thread = WebServerThread()
+    thread.running.connect(slot_serverRunning)
+    thread.start()
+
+    QTimer.singleShot(30000, slot_serverTimeout)
+
+    app.exec_()
+
+    stallTimer.stop()
+    thread.stopWait()
+    fakehost.kill()
+
+    if state['result'] is None:
+        print("no results from clients")
+        return 1
+
+    lateness = sorted(state['lateness'])
+    result   = state['result']
+    result['gui'] = {
+        'checks':     len(lateness),
+        'stalled_ms': state['stalled'],
+        'stalled':    state['stalled'] / (result['elapsed'] * 1000) if result['elapsed'] > 0 else 0.0,
+        'late_p95':   get_percentile(lateness, 95),
+        'late_max':   lateness[-1] if len(lateness) > 0 else 0,
+    }
+
+    print_report(result)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(result, fh, indent=2, sort_keys=True)
+        print("results written to %s" % args.output)
+
+    return 0
+
+def print_report(result):
+    print("")
+    print("%i clients, %.1f s, %i websocket messages received" % (result['clients'], result['elapsed'], result['received']))
+    print("")
+    print("%-6s %8s %7s %9s %9s %9s %9s %9s" % ("op", "count", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms"))
+
+    for op, stats in sorted(result['ops'].items()):
+        print("%-6s %8i %7i %9.1f %9.1f %9.1f %9.1f %9.1f" % (op, stats['count'], stats['errors'], stats['rate'],
+                                                             stats['p50'], stats['p95'], stats['p99'], stats['max']))
+
+    gui = result['gui']
+    print("")
+    print("GUI thread: stalled %.0f ms in total (%.1f%% of the run), lateness p95 %i ms, max %i ms" % (
+          gui['stalled_ms'], gui['stalled'] * 100, gui['late_p95'], gui['late_max']))
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line
+
+if __name__ == '__main__':
+    if len(sys.argv) == 9 and sys.argv[1] == "--run-clients":
+        run_clients(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5]),
+                    json.loads(sys.argv[6]), json.loads(sys.argv[7]), int(sys.argv[8]))
+        sys.exit(0)
+
+    import argparse
+    import tempfile
+
+    def parse_mix(value):
+        mix = {}
+        for item in value.split(","):
+            op, weight = item.split("=")
+            if op not in DEFAULT_MIX:
+                raise argparse.ArgumentTypeError("unknown operation '%s'" % op)
+            mix[op] = int(weight)
+        return mix
+
+    parser = argparse.ArgumentParser(description="MOD-App webserver load test")
+    parser.add_argument("--clients",  type=int, default=DEFAULT_CLIENTS, help="concurrent clients")
+    parser.add_argument("--duration", type=int, default=DEFAULT_DURATION, help="test duration in seconds")
+    parser.add_argument("--think",    type=int, default=DEFAULT_THINK, help="average pause between operations, in ms")
+    parser.add_argument("--mix",      type=parse_mix, default=DEFAULT_MIX,
+                        help="operation weights (default: %s)" % ",".join("%s=%i" % x for x in DEFAULT_MIX.items()))
+    parser.add_argument("--library",  type=int, default=20, help="pedalboards generated for the load operations")
+    parser.add_argument("--seed",     type=int, default=0, help="random seed for the clients")
+    parser.add_argument("--workdir",  default=os.path.join(tempfile.gettempdir(), "mod-app-benchmark"),
+                        help="where generated pedalboards are kept between runs")
+    parser.add_argument("--output",   help="also write results as JSON")
+    args = parser.parse_args()
+
+    sys.path.insert(0, CWD)
+    sys.exit(run_server(args))
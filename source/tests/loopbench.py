@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Event loop mode benchmark
+# Compares the webserver running its asyncio loop in a thread of its own (WebServerThread) against it being
+# driven from the Qt event loop in the GUI thread (AsyncioDriver in mod_eventloop.py), on two kinds of messages:
+#   socket  a line sent from the GUI thread over TCP to an asyncio echo server, like the web view talking to
+#           the webserver
+#   call    a call from the GUI thread into the loop and back, like the app calling into the webserver's session
+# For each, the round-trip latency, CPU time and context switches per message are reported.
+# Every mode runs in a fresh process. Needs PyQt5.
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+# ------------------------------------------------------------------------------------------------------------
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.dirname(CWD)
+
+MODES = ("thread", "integrated")
+TESTS = ("socket", "call")
+
+DEFAULT_MESSAGES = 5000
+
+# printed before the worker result, same as in benchmark.py
+RESULT_PREFIX = "@@bench "
+
+# ------------------------------------------------------------------------------------------------------------
+# Worker side
+
+def get_usage():
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return (usage.ru_utime + usage.ru_stime, usage.ru_nvcsw + usage.ru_nivcsw)
+
+def summarize(latencies, usage0, usage1):
+    latencies = sorted(latencies)
+    count     = len(latencies)
+
+    return {
+        'messages':   count,
+        'median_us':  latencies[count // 2] * 1e6,
+        'p99_us':     latencies[min(count - 1, int(count * 0.99))] * 1e6,
+        'cpu_us':     (usage1[0] - usage0[0]) * 1e6 / count,
+        'switches':   (usage1[1] - usage0[1]) / count,
+    }
+
+def run_worker(mode, messages):
+    import asyncio
+
+    from PyQt5.QtCore import pyqtSignal, QCoreApplication, QObject, QThread, QTimer
+    from PyQt5.QtNetwork import QHostAddress, QTcpSocket
+
+    app = QCoreApplication(sys.argv[:1])
+
+    # --------------------------------------------------------------------------------------------------------
+    # the loop, and how the GUI thread runs things in it
+
+    if mode == "thread":
+        class LoopThread(QThread):
+            def run(self):
+                asyncio.set_event_loop(self.loop)
+                self.loop.run_forever()
+
+        thread = LoopThread()
+        thread.loop = asyncio.new_event_loop()
+        thread.start()
+
+        loop = thread.loop
+        callInLoop = loop.call_soon_threadsafe
+
+        def runInLoop(coroutine):
+            return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    else:
+        from mod_eventloop import ASYNCIO_DRIVER_SUPPORTED, AsyncioDriver
+
+        if not ASYNCIO_DRIVER_SUPPORTED:
+            return { 'status': "skipped", 'reason': "no pollable selector on this platform" }
+
+        driver = AsyncioDriver(None)
+        driver.start()
+
+        loop = driver.getLoop()
+        callInLoop = loop.call_soon
+
+        def runInLoop(coroutine):
+            task = loop.create_task(coroutine)
+            while not task.done():
+                app.processEvents()
+            return task.result()
+
+    # --------------------------------------------------------------------------------------------------------
+    # echo server in the loop
+
+    async def echo(reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            writer.write(line)
+
+    async def startServer():
+        server = await asyncio.start_server(echo, "127.0.0.1", 0)
+        return server.sockets[0].getsockname()[1]
+
+    port = runInLoop(startServer())
+
+    # --------------------------------------------------------------------------------------------------------
+    # replies come back to the GUI thread through a signal, queued when coming from the loop thread
+
+    class Receiver(QObject):
+        reply = pyqtSignal()
+
+    receiver  = Receiver()
+    latencies = []
+    results   = {}
+    state     = { 'test': None, 'sent': 0.0, 'left': 0 }
+
+    socket = QTcpSocket()
+    socket.connectToHost(QHostAddress.LocalHost, port)
+
+    if not socket.waitForConnected(5000):
+        return { 'status': "error", 'reason': "could not connect to the echo server" }
+
+    def send():
+        state['sent'] = time.perf_counter()
+
+        if state['test'] == "socket":
+            socket.write(b"ping\n")
+        else:
+            callInLoop(receiver.reply.emit)
+
+    def received():
+        latencies.append(time.perf_counter() - state['sent'])
+        state['left'] -= 1
+
+        if state['left'] > 0:
+            send()
+        else:
+            finish()
+
+    def socketRead():
+        while socket.canReadLine():
+            socket.readLine()
+            received()
+
+    def begin(test):
+        del latencies[:]
+        state['test']   = test
+        state['left']   = messages
+        state['usage0'] = get_usage()
+        send()
+
+    def finish():
+        results[state['test']] = summarize(latencies, state['usage0'], get_usage())
+
+        remaining = [test for test in TESTS if test not in results]
+
+        if remaining:
+            QTimer.singleShot(0, lambda: begin(remaining[0]))
+        else:
+            app.quit()
+
+    socket.readyRead.connect(socketRead)
+    receiver.reply.connect(received)
+
+    QTimer.singleShot(0, lambda: begin(TESTS[0]))
+    app.exec_()
+
+    results['status'] = "ok"
+    return results
+
+def worker_main(mode, messages):
+    sys.path.insert(0, SOURCE_DIR)
+
+    try:
+        result = run_worker(mode, messages)
+    except ImportError as e:
+        result = { 'status': "skipped", 'reason': "PyQt5 not available: %s" % e }
+    except Exception as e:
+        result = { 'status': "error", 'reason': "%s: %s" % (type(e).__name__, e) }
+
+    sys.stdout.flush()
+    print(RESULT_PREFIX + json.dumps(result))
+    sys.stdout.flush()
+
+    # don't spend time tearing down Qt and the loop thread
+    os._exit(0)
+
+# ------------------------------------------------------------------------------------------------------------
+# Runner side
+
+def run_mode(mode, messages, timeout):
+    try:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", mode, str(messages)],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return { 'status': "error", 'reason': "timed out after %i s" % timeout }
+
+    for line in reversed(proc.stdout.decode("utf-8", errors="replace").splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+
+    stderr = proc.stderr.decode("utf-8", errors="replace").strip().splitlines()
+    return { 'status': "error", 'reason': stderr[-1] if stderr else "exit code %i" % proc.returncode }
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        worker_main(sys.argv[2], int(sys.argv[3]))
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MOD-App event loop mode benchmark")
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES, help="round trips per test")
+    parser.add_argument("--timeout",  type=int, default=300, help="timeout for a single mode, in seconds")
+    parser.add_argument("--output",   help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    failed  = False
+
+    print("%-11s %-7s %10s %10s %10s %10s" % ("mode", "test", "median us", "p99 us", "cpu us", "switches"))
+
+    for mode in MODES:
+        result = results[mode] = run_mode(mode, args.messages, args.timeout)
+
+        if result['status'] != "ok":
+            print("%-11s %s (%s)" % (mode, result['status'], result.get('reason', "")))
+            failed = failed or result['status'] == "error"
+            continue
+
+        for test in TESTS:
+            r = result[test]
+            print("%-11s %-7s %10.1f %10.1f %10.1f %10.2f" % (mode, test, r['median_us'], r['p99_us'], r['cpu_us'],
+                                                             r['switches']))
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+
+    sys.exit(1 if failed else 0)
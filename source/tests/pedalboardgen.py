@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Synthetic pedalboard library generator, used for benchmarking
+# Writes N pedalboard bundles (manifest, ttl with ingen:block entries and a thumbnail) into a directory that can
+# be used as LV2_PATH.
+
+import os
+import random
+import struct
+import zlib
+
+# ------------------------------------------------------------------------------------------------------------
+
+# plugins are picked from a fixed-size pool, so the same plugin is used in many pedalboards (like in real libraries)
+PLUGIN_URI_POOL_SIZE = 200
+
+MANIFEST_TEMPLATE = """\
+@prefix ingen: <http://drobilla.net/ns/ingen#> .
+@prefix lv2:   <http://lv2plug.in/ns/lv2core#> .
+@prefix pedal: <http://moddevices.com/ns/modpedal#> .
+@prefix rdfs:  <http://www.w3.org/2000/01/rdf-schema#> .
+
+<%(name)s.ttl>
+    lv2:prototype ingen:GraphPrototype ;
+    a lv2:Plugin ,
+        ingen:Graph ,
+        pedal:Pedalboard ;
+    rdfs:seeAlso <%(name)s.ttl> .
+"""
+
+TTL_HEADER = """\
+@prefix doap:   <http://usefulinc.com/ns/doap#> .
+@prefix ingen:  <http://drobilla.net/ns/ingen#> .
+@prefix lv2:    <http://lv2plug.in/ns/lv2core#> .
+@prefix modgui: <http://moddevices.com/ns/modgui#> .
+@prefix pedal:  <http://moddevices.com/ns/modpedal#> .
+@prefix rdfs:   <http://www.w3.org/2000/01/rdf-schema#> .
+
+"""
+
+# ------------------------------------------------------------------------------------------------------------
+# URI of a plugin in the synthetic pool
+
+def get_plugin_uri(index):
+    return "urn:mod-bench:plugin:%i" % index
+
+# ------------------------------------------------------------------------------------------------------------
+# Minimal solid-color RGB PNG
+
+def make_png(width, height, color):
+    def chunk(ctype, data):
+        return struct.pack(">I", len(data)) + ctype + data + struct.pack(">I", zlib.crc32(ctype + data) & 0xffffffff)
+
+    row = b"\x00" + bytes(color) * width
+    raw = zlib.compress(row * height, 9)
+
+    return (b"\x89PNG\r\n\x1a\n" +
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) +
+            chunk(b"IDAT", raw) +
+            chunk(b"IEND", b""))
+
+# ------------------------------------------------------------------------------------------------------------
+# Write the ttl of a single pedalboard
+# @a plugins has one URI per ingen:block entry, @a ports is the number of control ports per block
+
+def make_pedalboard_ttl(title, plugins, ports, rng):
+    lines  = [TTL_HEADER]
+    blocks = ["block%i" % i for i in range(len(plugins))]
+
+    for i, block in enumerate(blocks):
+        lines.append("<%s>\n" % block)
+        lines.append("    ingen:canvasX %.1f ;\n" % (100.0 + 200.0 * i))
+        lines.append("    ingen:canvasY 200.0 ;\n")
+        lines.append("    ingen:enabled true ;\n")
+        lines.append("    lv2:prototype <%s> ;\n" % plugins[i])
+        lines.append("    lv2:port <%s/in> , <%s/out>%s ;\n" % (block, block,
+                     "".join(" , <%s/param%i>" % (block, j) for j in range(ports))))
+        lines.append("    a ingen:Block .\n\n")
+
+        lines.append("<%s/in>\n    a lv2:AudioPort , lv2:InputPort .\n\n" % block)
+        lines.append("<%s/out>\n    a lv2:AudioPort , lv2:OutputPort .\n\n" % block)
+
+        for j in range(ports):
+            lines.append("<%s/param%i>\n    ingen:value %.3f ;\n    a lv2:ControlPort , lv2:InputPort .\n\n" % (block, j, rng.random()))
+
+    # chain everything between the capture and playback ports
+    chain = ["capture_1"] + ["%s/in" % b for b in blocks] + ["playback_1"]
+    tails = ["capture_1"] + ["%s/out" % b for b in blocks]
+    heads = chain[1:]
+
+    for i, (tail, head) in enumerate(zip(tails, heads)):
+        lines.append("_:b%i\n    ingen:tail <%s> ;\n    ingen:head <%s> .\n\n" % (i, tail, head))
+
+    lines.append("<capture_1>\n    lv2:index 0 ;\n    a lv2:AudioPort , lv2:InputPort .\n\n")
+    lines.append("<playback_1>\n    lv2:index 1 ;\n    a lv2:AudioPort , lv2:OutputPort .\n\n")
+
+    lines.append("<>\n")
+    lines.append("    doap:name \"%s\" ;\n" % title)
+    lines.append("    modgui:thumbnail <thumbnail.png> ;\n")
+    lines.append("    modgui:screenshot <screenshot.png> ;\n")
+
+    if len(blocks) > 0:
+        lines.append("    ingen:block %s ;\n" % " ,\n        ".join("<%s>" % b for b in blocks))
+
+    lines.append("    ingen:arc %s ;\n" % " , ".join("_:b%i" % i for i in range(len(heads))))
+    lines.append("    lv2:port <capture_1> , <playback_1> ;\n")
+    lines.append("    lv2:prototype ingen:GraphPrototype ;\n")
+    lines.append("    a lv2:Plugin , ingen:Graph , pedal:Pedalboard .\n")
+
+    return "".join(lines)
+
+# ------------------------------------------------------------------------------------------------------------
+# Generate @a count pedalboards inside @a outdir, returns the list of bundle paths
+# Bundles that already exist are kept as-is, so a library can be grown from a smaller one.
+
+def generate_library(outdir, count, blocks=6, ports=4, seed=0):
+    thumbnail = make_png(64, 64, (0x30, 0x30, 0x30))
+    bundles   = []
+
+    os.makedirs(outdir, exist_ok=True)
+
+    for i in range(count):
+        name   = "bench-%05i" % i
+        bundle = os.path.join(outdir, name + ".pedalboard")
+        bundles.append(bundle)
+
+        # one generator per bundle, so the contents don't depend on which bundles already exist
+        rng = random.Random("%i-%i" % (seed, i))
+
+        # complexity varies a bit around the requested block count
+        nblocks = max(0, blocks + rng.randint(-(blocks // 2), blocks // 2))
+        plugins = [get_plugin_uri(rng.randrange(PLUGIN_URI_POOL_SIZE)) for _ in range(nblocks)]
+
+        if os.path.exists(os.path.join(bundle, "manifest.ttl")):
+            continue
+
+        os.makedirs(bundle, exist_ok=True)
+
+        with open(os.path.join(bundle, name + ".ttl"), 'w') as fh:
+            fh.write(make_pedalboard_ttl("Bench Pedalboard %i" % i, plugins, ports, rng))
+
+        with open(os.path.join(bundle, "thumbnail.png"), 'wb') as fh:
+            fh.write(thumbnail)
+
+        with open(os.path.join(bundle, "screenshot.png"), 'wb') as fh:
+            fh.write(thumbnail)
+
+        # written last, an interrupted run leaves bundles that are regenerated next time
+        with open(os.path.join(bundle, "manifest.ttl"), 'w') as fh:
+            fh.write(MANIFEST_TEMPLATE % { 'name': name })
+
+    return bundles
+
+# ------------------------------------------------------------------------------------------------------------
+# Generate via command line
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic pedalboard library")
+    parser.add_argument("outdir", help="output directory, usable as LV2_PATH")
+    parser.add_argument("count", type=int, help="number of pedalboards")
+    parser.add_argument("--blocks", type=int, default=6, help="average number of plugins per pedalboard")
+    parser.add_argument("--ports",  type=int, default=4, help="control ports per plugin")
+    parser.add_argument("--seed",   type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    bundles = generate_library(args.outdir, args.count, args.blocks, args.ports, args.seed)
+    print("%i pedalboards in %s" % (len(bundles), args.outdir))
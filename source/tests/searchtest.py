@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Pedalboard search tests
+# Checks that PedalboardSearchIndex (mod_catalog.py) gives the same results when a query is typed one key at a
+# time, which narrows each search down to the previous matches, as when the same query is searched from scratch.
+
+import os
+import random
+import sys
+
+# ------------------------------------------------------------------------------------------------------------
+
+CWD = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.dirname(CWD)
+
+# no search may stop early because of its time budget during the tests
+NO_BUDGET = 60.0
+
+# ------------------------------------------------------------------------------------------------------------
+
+def make_pedalboards(titles):
+    return [{ 'uri': "file:///pedalboards/%i.pedalboard/%i.ttl" % (i, i),
+              'bundle': "/pedalboards/%i.pedalboard" % i,
+              'title': title } for i, title in enumerate(titles)]
+
+def get_titles(results):
+    return [pedalboard['title'] for pedalboard in results]
+
+# Type @a query key by key, comparing each search against one from scratch
+def compare_typing(pedalboards, query):
+    from mod_catalog import PedalboardSearchIndex
+
+    typed  = PedalboardSearchIndex(pedalboards)
+    errors = []
+
+    for end in range(1, len(query) + 1):
+        results, complete = typed.search(query[:end], budget=NO_BUDGET)
+        expected, complete = PedalboardSearchIndex(pedalboards).search(query[:end], budget=NO_BUDGET)
+
+        if get_titles(results) != get_titles(expected):
+            errors.append("'%s' typed gives %s, searched from scratch %s" % (query[:end], get_titles(results),
+                                                                             get_titles(expected)))
+
+    return errors
+
+# ------------------------------------------------------------------------------------------------------------
+
+# A title that was a substring match for the previous query and is only a fuzzy match for the next one
+def test_fuzzy(rng):
+    pedalboards = make_pedalboards(["xab yc", "other"])
+    errors = compare_typing(pedalboards, "abc")
+
+    return errors, "'ab' then 'abc'"
+
+def test_narrowing(rng):
+    words  = ["delay", "reverb", "clean", "crunch", "lead", "bass", "ambient", "live", "studio", "fuzz"]
+    titles = [" ".join(rng.choice(words) for w in range(rng.randint(1, 3))) for i in range(500)]
+    errors = []
+
+    pedalboards = make_pedalboards(titles)
+    queries     = ["".join(rng.choice("abcdeilnrstuvz ") for c in range(6)) for i in range(50)]
+    queries    += ["delay rev", "cln", "ambient live", "fz", "bass lead"]
+
+    for query in queries:
+        errors += compare_typing(pedalboards, query)
+
+    return errors, "%i queries over %i pedalboards" % (len(queries), len(pedalboards))
+
+TESTS = {
+    'fuzzy':     test_fuzzy,
+    'narrowing': test_narrowing,
+}
+
+# ------------------------------------------------------------------------------------------------------------
+# Run via command line
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MOD-App pedalboard search tests")
+    parser.add_argument("tests", nargs="*", help="tests to run (default: all of %s)" % ", ".join(sorted(TESTS)))
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated titles and queries")
+    args = parser.parse_args()
+
+    for name in args.tests:
+        if name not in TESTS:
+            parser.error("unknown test '%s'" % name)
+
+    sys.path.insert(0, SOURCE_DIR)
+
+    failed = False
+
+    for name in args.tests or sorted(TESTS):
+        errors, info = TESTS[name](random.Random(args.seed))
+
+        print("%-10s %s (%s)" % (name, "FAILED" if errors else "ok", info))
+
+        for error in errors[:10]:
+            print("    " + error)
+
+        failed = failed or len(errors) > 0
+
+    sys.exit(1 if failed else 0)